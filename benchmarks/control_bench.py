@@ -0,0 +1,291 @@
+# benchmarks/control_bench.py
+"""
+Бенчмарк управляющего тракта: ServoController/RP2040Controller против симуляторов.
+
+Симуляторы сервопривода и RP2040 запускаются отдельными процессами на
+pty (simulators/), контроллеры подключаются к ним как к COM-портам.
+Измеряются:
+- задержка команд привода (JOG, скорость, блочное чтение, проверка связи)
+  и их пропускная способность;
+- время отправки команд ШИМ на RP2040;
+- блокировка потока GUI: цикл 60 Гц отправляет команды напрямую
+  (как раньше) и через DeviceWorker при работающей телеметрии —
+  сравниваются время вызова и запаздывание тиков.
+
+Запуск из корня репозитория:
+    python -m benchmarks.control_bench --output control.json
+    python -m benchmarks.control_bench --compare control.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from modules.device_worker import DeviceWorker
+from modules.modbus_control import ServoController
+from modules.servo_telemetry import ServoTelemetry
+from modules.uart_control import RP2040Controller
+from modules.utils import load_config, setup_logging
+
+logger = logging.getLogger(__name__)
+
+FRAME_INTERVAL = 1 / 60  # Период цикла событий GUI (сек)
+
+
+def percentiles(values_ms):
+    """p50/p95/p99/max для списка задержек (мс)."""
+    if not values_ms:
+        return None
+    data = np.asarray(values_ms)
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(data.max())}
+
+
+def start_simulator(module, link, *args):
+    """Процесс симулятора; возвращается после создания порта (путь печатается первой строкой)."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", module, "--link", link, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    if not process.stdout.readline().strip():
+        process.kill()
+        raise RuntimeError(f"Симулятор {module} не запустился")
+    return process
+
+
+def timed(func, *args):
+    """Время вызова (мс) и результат."""
+    started = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def bench_servo(servo, iterations):
+    """Задержки и пропускная способность команд привода (вызовы напрямую)."""
+    block = [servo.REGISTERS["ERROR"], 9, 10]  # Как у телеметрии: ошибка, скорость, нагрузка
+    speeds = [100, 150]
+    operations = {
+        "jog": lambda i: servo.jog("forward" if i % 2 == 0 else "stop"),
+        # Чередование значений: одинаковая скорость пропускается без обмена
+        "set_speed": lambda i: servo.set_speed(speeds[i % 2]),
+        "read_block": lambda i: servo.registers.read_block(block),
+        "check_connection": lambda i: servo.check_connection(),
+    }
+    results = {}
+    for name, operation in operations.items():
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for i in range(iterations):
+            elapsed_ms, result = timed(operation, i)
+            latencies.append(elapsed_ms)
+            errors += result is False
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "latency_ms": percentiles(latencies),
+            "ops_per_s": iterations / elapsed if elapsed > 0 else 0.0,
+            "errors": errors,
+        }
+    servo.stop()
+    return results
+
+
+def bench_uart(uart, iterations):
+    """Время отправки команд ШИМ (контроллер ответа не ждёт)."""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        elapsed_ms, _ = timed(uart.vib_on, 10 + i % 20, 50)
+        latencies.append(elapsed_ms)
+    elapsed = time.perf_counter() - started
+    uart.vib_off()
+    return {
+        "latency_ms": percentiles(latencies),
+        "ops_per_s": iterations / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def gui_loop(seconds, command):
+    """
+    Цикл 60 Гц, имитирующий поток GUI: на каждом тике вызывается command(tick).
+    Возвращает длительности вызовов и запаздывание тиков относительно расписания.
+    """
+    call_ms, lag_ms = [], []
+    started = time.perf_counter()
+    tick = 0
+    while True:
+        due = started + tick * FRAME_INTERVAL
+        now = time.perf_counter()
+        if now - started >= seconds:
+            break
+        if due > now:
+            time.sleep(due - now)
+            now = time.perf_counter()
+        lag_ms.append(max(0.0, (now - due) * 1000))
+        elapsed_ms, _ = timed(command, tick)
+        call_ms.append(elapsed_ms)
+        tick += 1
+        # Пропуск тиков, на которые уже опоздали (как у таймера Qt)
+        behind = int((time.perf_counter() - started) / FRAME_INTERVAL)
+        tick = max(tick, behind)
+    return {
+        "ticks": len(call_ms),
+        "call_ms": percentiles(call_ms),
+        "tick_lag_ms": percentiles(lag_ms),
+        "missed_ticks": max(0, int(seconds / FRAME_INTERVAL) - len(call_ms)),
+    }
+
+
+def bench_gui_blocking(servo, config, seconds, command_every):
+    """Тики GUI с командами скорости: прямые вызовы и через DeviceWorker, телеметрия включена."""
+    telemetry = ServoTelemetry(servo, config)
+    telemetry.start()
+    speeds = [120, 180]
+
+    def speed(tick):
+        return speeds[(tick // command_every) % 2]
+
+    def direct(tick):
+        if tick % command_every == 0:
+            servo.set_speed(speed(tick))
+
+    worker = DeviceWorker("servo")
+    worker.start()
+
+    def queued(tick):
+        if tick % command_every == 0:
+            worker.submit("set_speed", servo.set_speed, speed(tick), coalesce_key="speed")
+
+    try:
+        results = {
+            "direct": gui_loop(seconds, direct),
+            "worker": gui_loop(seconds, queued),
+        }
+    finally:
+        worker.stop()
+        telemetry.stop()
+    results["worker"]["commands"] = worker.stats()
+    results["telemetry"] = {"polls": telemetry.polls, "failures": telemetry.failures}
+    return results
+
+
+def compare(report, baseline, tolerance):
+    """Список регрессий p95 задержек относительно baseline (пустой — регрессий нет)."""
+    problems = []
+    for name, current in report["servo"].items():
+        previous = baseline.get("servo", {}).get(name)
+        if not previous or not previous.get("latency_ms") or not current.get("latency_ms"):
+            continue
+        now, was = current["latency_ms"]["p95"], previous["latency_ms"]["p95"]
+        if now > was * (1.0 + tolerance):
+            problems.append(f"servo.{name}: p95 {now:.1f} мс > {was:.1f} мс")
+    now = report["gui"]["worker"]["call_ms"]["p95"]
+    was = baseline.get("gui", {}).get("worker", {}).get("call_ms", {}).get("p95")
+    if was is not None and now > max(was * (1.0 + tolerance), was + 1.0):
+        problems.append(f"gui.worker: p95 вызова {now:.2f} мс > {was:.2f} мс")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк управляющего тракта (сервопривод, RP2040)")
+    parser.add_argument("--config", default="config.yaml", help="Файл конфигурации")
+    parser.add_argument("--output", default="control.json", help="JSON с результатами")
+    parser.add_argument("--iterations", type=int, default=50, help="Повторов каждой команды")
+    parser.add_argument("--gui-seconds", type=float, default=3.0, help="Длительность каждого режима GUI")
+    parser.add_argument("--command-every", type=int, default=6, help="Команда скорости каждые N тиков GUI")
+    parser.add_argument("--response-ms", type=float, default=2.0, help="Время обработки запроса приводом")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимый рост p95 (доля)")
+    args = parser.parse_args()
+
+    setup_logging()
+    logging.getLogger("modules").setLevel(logging.WARNING)
+
+    config = load_config(args.config)
+    modbus = config["modbus"]
+    workdir = tempfile.mkdtemp(prefix="control_bench_")
+    servo_link = os.path.join(workdir, "servo")
+    uart_link = os.path.join(workdir, "rp2040")
+
+    simulators = [
+        start_simulator(
+            "simulators.servo_sim", servo_link,
+            "--address", str(modbus["slave_address"]),
+            "--baudrate", str(modbus["baudrate"]),
+            "--parity", str(modbus["parity"]),
+            "--response-ms", str(args.response_ms),
+        ),
+        start_simulator("simulators.rp2040_sim", uart_link, "--baudrate", str(config["uart"]["baudrate"])),
+    ]
+    # Паритет на линии учитывает симулятор; pty его не поддерживает
+    modbus.update(port=servo_link, parity="N")
+    config["uart"]["port"] = uart_link
+
+    servo = ServoController(config)
+    uart = RP2040Controller(config)
+    try:
+        if not (servo.connect() and servo.check_connection()):
+            raise RuntimeError("Нет связи с симулятором сервопривода")
+        if not uart.connect():
+            raise RuntimeError("Нет связи с симулятором RP2040")
+
+        logger.info("Команды сервопривода...")
+        servo_results = bench_servo(servo, args.iterations)
+        logger.info("Команды RP2040...")
+        uart_results = bench_uart(uart, args.iterations)
+        logger.info("Блокировка потока GUI...")
+        gui_results = bench_gui_blocking(servo, config, args.gui_seconds, args.command_every)
+        bus = servo.bus_stats()
+    finally:
+        servo.close()
+        uart.close()
+        for process in simulators:
+            process.terminate()
+            process.wait(timeout=5)
+
+    for name, result in servo_results.items():
+        latency = result["latency_ms"]
+        logger.info(f"{name}: p50 {latency['p50']:.1f} мс, p95 {latency['p95']:.1f} мс, {result['ops_per_s']:.1f} оп/с")
+    for mode in ("direct", "worker"):
+        result = gui_results[mode]
+        logger.info(
+            f"GUI ({mode}): вызов p99 {result['call_ms']['p99']:.2f} мс, "
+            f"запаздывание тика p99 {result['tick_lag_ms']['p99']:.2f} мс, пропущено {result['missed_ticks']}"
+        )
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "baudrate": modbus["baudrate"],
+        "response_ms": args.response_ms,
+        "servo": servo_results,
+        "uart": uart_results,
+        "gui": gui_results,
+        "bus": bus,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"Результаты сохранены: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            logger.error(f"Регрессия: {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
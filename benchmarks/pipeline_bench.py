@@ -0,0 +1,207 @@
+# benchmarks/pipeline_bench.py
+"""
+Сквозной бенчмарк: синтетическая камера → детекция/подсчёт → подготовка изображения для экрана.
+
+Все сценарии из benchmarks/scenarios.yaml прогоняются без GUI; результат —
+JSON с частотой кадров, процентилями задержек по этапам, пиковым RSS
+и ошибкой счёта относительно истинного. С --compare результат сравнивается
+с сохранённым ранее и при регрессии процесс завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.pipeline_bench --output bench.json
+    python -m benchmarks.pipeline_bench --scenario dense --compare bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+from modules.camera import get_camera
+from modules.counter import PartCounter
+from modules.overlay import OverlayRenderer
+from modules.pipeline import FramePipeline
+from modules.processing import build_processors, find_processor
+from modules.utils import load_config, merge_config, setup_logging
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS_PATH = os.path.join(os.path.dirname(__file__), "scenarios.yaml")
+
+
+def peak_rss_mb():
+    """Пиковый размер резидентной памяти процесса (МБ) или None, если недоступно."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — килобайты, macOS — байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles(values_ms):
+    """p50/p95/p99/max для списка задержек (мс)."""
+    if not values_ms:
+        return None
+    data = np.asarray(values_ms)
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(data.max())}
+
+
+def run_scenario(config, display_size, max_seconds):
+    """Прогон одного сценария до конца синтетической сцены (или max_seconds)."""
+    camera = get_camera(config)
+    processors = build_processors(config)
+    counter = find_processor(processors, PartCounter)
+    pipeline = FramePipeline(camera, config, processors)
+    overlay = OverlayRenderer(config)
+
+    processed_ms, render_ms, end_to_end_ms = [], [], []
+    started = time.monotonic()
+    pipeline.start()
+    try:
+        while time.monotonic() - started < max_seconds:
+            packet = pipeline.output.get(timeout=0.2)
+            if packet is None:
+                if getattr(camera, "finished", False) and not len(pipeline.process_queue):
+                    break
+                continue
+            received = time.monotonic()
+            try:
+                render_started = time.perf_counter()
+                overlay.render(packet, display_size)
+                if pipeline.timing is not None:
+                    packet.lease.timing.mark("render", render_started)
+                    pipeline.timing.record(packet.lease.timing, ("render",))
+            finally:
+                packet.release()
+            done = time.monotonic()
+            processed_ms.append((received - packet.timestamp) * 1000)
+            render_ms.append((done - received) * 1000)
+            end_to_end_ms.append((done - packet.timestamp) * 1000)
+    finally:
+        elapsed = time.monotonic() - started
+        pipeline.stop()
+
+    stats = pipeline.stats()
+    frames = stats["capture"]["processed"]
+    process_stats = stats["process"]
+    truth = getattr(camera, "ground_truth", None)
+    counted = counter.count if counter is not None else None
+    result = {
+        "elapsed_s": elapsed,
+        "frames": frames,
+        "capture_fps": frames / elapsed if elapsed > 0 else 0.0,
+        "process_fps": process_stats["processed"] / elapsed if elapsed > 0 else 0.0,
+        "display_fps": len(render_ms) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "capture_to_processed": percentiles(processed_ms),
+            "render": percentiles(render_ms),
+            "end_to_end": percentiles(end_to_end_ms),
+        },
+        "process_busy_ms_per_frame": (
+            process_stats["busy_time"] * 1000 / process_stats["processed"] if process_stats["processed"] else None
+        ),
+        "dropped": {
+            "capture": stats["capture"]["dropped"],
+            "process": process_stats["dropped"],
+            "display": stats["display"]["dropped"],
+        },
+        "ground_truth": truth,
+        "counted": counted,
+        "count_error": counted - truth if truth is not None and counted is not None else None,
+        "count_error_pct": (
+            abs(counted - truth) * 100.0 / truth if truth and counted is not None else None
+        ),
+        "peak_rss_mb": peak_rss_mb(),
+        "stage_ms": pipeline.timing.summary() if pipeline.timing is not None else None,
+    }
+    if not getattr(camera, "finished", True):
+        result["timed_out"] = True
+    return result
+
+
+def compare(results, baseline, fps_tolerance, error_tolerance):
+    """Список регрессий относительно baseline (пустой — регрессий нет)."""
+    problems = []
+    for name, current in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["process_fps"] < previous["process_fps"] * (1.0 - fps_tolerance):
+            problems.append(
+                f"{name}: FPS обработки {current['process_fps']:.1f} < {previous['process_fps']:.1f}"
+            )
+        now_error, was_error = current.get("count_error_pct"), previous.get("count_error_pct")
+        if now_error is not None and was_error is not None and now_error > was_error + error_tolerance:
+            problems.append(f"{name}: ошибка счёта {now_error:.2f}% > {was_error:.2f}%")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк конвейера подсчёта")
+    parser.add_argument("--config", default="config.yaml", help="Базовый файл конфигурации")
+    parser.add_argument("--scenarios", default=SCENARIOS_PATH, help="Файл сценариев")
+    parser.add_argument("--scenario", action="append", help="Только указанные сценарии (можно несколько)")
+    parser.add_argument("--output", default="bench.json", help="JSON с результатами")
+    parser.add_argument("--display-size", default="800x600", help="Размер изображения для экрана")
+    parser.add_argument("--max-seconds", type=float, default=120.0, help="Ограничение на сценарий (сек)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для поиска регрессий")
+    parser.add_argument("--fps-tolerance", type=float, default=0.1, help="Допустимое падение FPS (доля)")
+    parser.add_argument("--error-tolerance", type=float, default=1.0, help="Допустимый рост ошибки счёта (п.п.)")
+    args = parser.parse_args()
+
+    setup_logging()
+    logging.getLogger("modules").setLevel(logging.WARNING)
+
+    with open(args.scenarios, "r", encoding="utf-8") as f:
+        suite = yaml.safe_load(f)
+    base = merge_config(load_config(args.config), suite.get("base"))
+    names = args.scenario or list(suite["scenarios"])
+    display_size = tuple(int(v) for v in args.display_size.lower().split("x"))
+
+    results = {}
+    for name in names:
+        config = merge_config(base, suite["scenarios"][name])
+        logger.info(f"Сценарий {name}...")
+        result = run_scenario(config, display_size, args.max_seconds)
+        results[name] = result
+        logger.info(
+            f"{name}: {result['process_fps']:.1f} кадр/с, e2e p95 "
+            f"{(result['latency_ms']['end_to_end'] or {}).get('p95', 0):.1f} мс, "
+            f"счёт {result['counted']} из {result['ground_truth']}"
+        )
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scenarios": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"Результаты сохранены: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.fps_tolerance, args.error_tolerance)
+        for problem in problems:
+            logger.error(f"Регрессия: {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
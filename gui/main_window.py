@@ -1,4 +1,6 @@
 # gui/main_window.py
+import logging
+
 from PySide6.QtWidgets import QMainWindow, QHBoxLayout, QVBoxLayout, QWidget
 from PySide6.QtCore import Qt, QTimer
 
@@ -6,7 +8,18 @@ from gui.panels.conveyor_panel import ConveyorPanel
 from gui.panels.vibro_panel import VibroPanel
 from gui.panels.status_panel import StatusPanel
 from gui.panels.video_panel import VideoPanel
+from gui.threads.device_bridge import DeviceBridge
 from gui.threads.video_thread import VideoThread
+from modules.belt_control import DensityMeter, create_belt_controller
+from modules.counter import PartCounter
+from modules.device_worker import DeviceWorker
+from modules.modbus_control import JOG_STEP, ServoController
+from modules.processing import build_processors, find_processor
+from modules.recorder import FrameRecorder
+from modules.servo_telemetry import create_servo_telemetry
+from modules.vibro_control import create_feed_controller
+
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(QMainWindow):
@@ -19,6 +32,11 @@ class MainWindow(QMainWindow):
         self.servo = servo
         self.rp2040 = rp2040
 
+        # Обработчики кадров (детекция, подсчёт) — до создания панелей
+        self.processors = build_processors(self.config, self._belt_speed)
+        self.counter = find_processor(self.processors, PartCounter)
+        self.recorder = find_processor(self.processors, FrameRecorder)
+
         self.setWindowTitle("Конвейер: Подсчёт деталей")
         self.resize(1280, 720)
 
@@ -27,6 +45,7 @@ class MainWindow(QMainWindow):
 
         # 2. Затем создаем потоки
         self._create_threads()
+        self._create_device_workers()
 
         # 3. Компоновка
         self._setup_layout()
@@ -41,12 +60,21 @@ class MainWindow(QMainWindow):
         self.setFocusPolicy(Qt.StrongFocus)
         self.setFocus()
 
+    def _belt_speed(self):
+        """Текущая скорость ленты (об/мин), 0 — лента стоит."""
+        snapshot = self.telemetry.snapshot if getattr(self, "telemetry", None) else None
+        if snapshot is not None and snapshot.connected:
+            return abs(snapshot.speed)
+        if self.servo and self.servo.connected and self.servo.current_direction:
+            return self.servo.current_speed
+        return 0
+
     def _create_panels(self):
         """Создание панелей интерфейса."""
         self.video_panel = VideoPanel()
         self.conveyor_panel = ConveyorPanel(self.servo)
         self.vibro_panel = VibroPanel(self.rp2040)
-        self.status_panel = StatusPanel(self.servo, self.rp2040)
+        self.status_panel = StatusPanel(self.servo, self.rp2040, self.counter)
 
         # Отключаем фокус у всех панелей
         for panel in [self.conveyor_panel, self.vibro_panel, self.status_panel]:
@@ -64,7 +92,7 @@ class MainWindow(QMainWindow):
 
     def _create_threads(self):
         """Создание потоков."""
-        self.video_thread = VideoThread(self.camera)
+        self.video_thread = VideoThread(self.camera, self.config, self.processors)
 
     def _setup_layout(self):
         """Компоновка интерфейса."""
@@ -115,60 +143,153 @@ class MainWindow(QMainWindow):
         self.vibro_panel.vibro_on_requested.connect(self._on_vib_on)
         self.vibro_panel.vibro_off_requested.connect(self._on_vib_off)
 
+        # Результаты команд устройств
+        self.device_bridge.command_finished.connect(self._on_command_finished)
+
         # Сигналы от потока видео
-        self.video_thread.change_pixmap_signal.connect(self.video_panel.update_image)
+        self.video_thread.frame_ready.connect(self._on_frame_ready)
+        self.video_panel.display_size_changed.connect(self.video_thread.set_display_size)
 
     def _start_threads(self):
         """Запуск потоков."""
+        self.video_thread.set_display_size(self.video_panel.width(), self.video_panel.height())
         self.video_thread.start()
 
-    def _on_forward(self):
+    def _on_frame_ready(self):
+        self.video_panel.update_image(self.video_thread.take_image())
+        self.video_thread.mark_painted()
+
+    def _create_device_workers(self):
+        """Потоки шин: команды устройств не выполняются в потоке GUI."""
+        self.device_bridge = DeviceBridge(self)
+        self.servo_worker = DeviceWorker("modbus")
+        self.rp2040_worker = DeviceWorker("uart")
+        self.servo_worker.start()
+        self.rp2040_worker.start()
+        self.telemetry = create_servo_telemetry(self.config, self.servo)
+        self.status_panel.telemetry = self.telemetry
+        self.status_panel.timing = self.video_thread.timing
+        if self.telemetry and self.recorder:
+            self.telemetry.add_fault_listener(
+                lambda snapshot: self.recorder.trigger(f"fault{snapshot.error_code}")
+            )
+
+        # Регулятор вибробункера: свой ключ объединения, чтобы не вытеснять вкл/выкл оператора
+        self.feed_controller = create_feed_controller(
+            self.config,
+            self.counter,
+            self.rp2040,
+            lambda name, func, *args: self.device_bridge.submit(
+                self.rp2040_worker, name, func, *args, coalesce_key="vibro_duty"
+            ),
+        )
+
+        # Автоматическая скорость ленты: тот же ключ объединения, что и у ручной
+        self.belt_controller = create_belt_controller(
+            self.config,
+            find_processor(self.processors, DensityMeter),
+            self.servo,
+            lambda name, func, *args: self.device_bridge.submit(
+                self.servo_worker, name, func, *args, coalesce_key="speed"
+            ),
+        )
+
+        # Целевая скорость с учётом ещё не выполненных команд «скорость ±»
+        self._speed_target = None
+        self._speed_pending = 0
+
+    def _servo_command(self, name, func, *args, coalesce_key="jog", urgent=False):
+        self.device_bridge.submit(
+            self.servo_worker, name, func, *args, coalesce_key=coalesce_key, urgent=urgent
+        )
+        self.setFocus()
+
+    def _rp2040_command(self, name, func, *args):
+        self.device_bridge.submit(self.rp2040_worker, name, func, *args, coalesce_key="vibro")
+        self.setFocus()
+
+    def _on_command_finished(self, name, result):
+        """Обновление панелей по завершении команды устройства (поток GUI)."""
+        if isinstance(result, Exception):
+            logger.warning(f"Команда {name} завершилась ошибкой: {result}")
+
+        if name == "set_speed":
+            self._speed_pending -= 1
+            if self._speed_pending <= 0:
+                self._speed_pending = 0
+                self._speed_target = None
+
         if self.servo:
-            self.servo.jog_forward()
             self.status_panel.update_conveyor_status(self.servo)
-            self.conveyor_panel.update_speed_display(self.servo.current_speed)
-            self.setFocus()
+            self.conveyor_panel.update_speed_display(
+                self._speed_target if self._speed_target is not None else self.servo.current_speed
+            )
+        if self.rp2040:
+            self.status_panel.update_vibro_status(self.rp2040)
+            self.vibro_panel.update_status()
+
+    def _on_forward(self):
+        if self.servo:
+            self._servo_command("jog_forward", self.servo.jog_forward)
 
     def _on_reverse(self):
         if self.servo:
-            self.servo.jog_reverse()
-            self.status_panel.update_conveyor_status(self.servo)
-            self.conveyor_panel.update_speed_display(self.servo.current_speed)
-            self.setFocus()
+            self._servo_command("jog_reverse", self.servo.jog_reverse)
 
     def _on_stop(self):
         if self.servo:
-            self.servo.stop()
-            self.status_panel.update_conveyor_status(self.servo)
-            self.conveyor_panel.update_speed_display(self.servo.current_speed)
-            self.setFocus()
+            # Останов вытесняет ещё не выполненные команды направления и идёт первым
+            self._servo_command("stop", self.servo.stop, urgent=True)
+
+    def _change_speed(self, delta):
+        """Изменение скорости на delta; быстрые повторы объединяются в одну запись."""
+        if self.belt_controller:
+            # Ручное изменение скорости отключает автоматический режим
+            self.belt_controller.set_enabled(False)
+        base = self._speed_target if self._speed_target is not None else self.servo.current_speed
+        self._speed_target = max(
+            ServoController.MIN_SPEED, min(ServoController.MAX_SPEED, base + delta)
+        )
+        self._speed_pending += 1
+        self.conveyor_panel.update_speed_display(self._speed_target)
+        self._servo_command(
+            "set_speed", self.servo.set_speed, self._speed_target, coalesce_key="speed"
+        )
 
     def _on_increase_speed(self):
         if self.servo:
-            self.servo.increase_speed()
-            self.status_panel.update_conveyor_status(self.servo)
-            self.conveyor_panel.update_speed_display(self.servo.current_speed)
-            self.setFocus()
+            self._change_speed(JOG_STEP)
 
     def _on_decrease_speed(self):
         if self.servo:
-            self.servo.decrease_speed()
-            self.status_panel.update_conveyor_status(self.servo)
-            self.conveyor_panel.update_speed_display(self.servo.current_speed)
-            self.setFocus()
+            self._change_speed(-JOG_STEP)
 
     def _on_vib_on(self):
         if self.rp2040:
-            self.rp2040.vib_on()
-            self.status_panel.update_vibro_status(self.rp2040)
-            self.vibro_panel.update_status()
-            self.setFocus()
+            self._rp2040_command("vib_on", self.rp2040.vib_on)
 
     def _on_vib_off(self):
         if self.rp2040:
-            self.rp2040.vib_off()
-            self.status_panel.update_vibro_status(self.rp2040)
-            self.vibro_panel.update_status()
+            self._rp2040_command("vib_off", self.rp2040.vib_off)
+
+    def _on_toggle_auto_speed(self):
+        if self.belt_controller:
+            self.belt_controller.set_enabled(not self.belt_controller.enabled)
+            self.setFocus()
+
+    def _on_record(self):
+        if self.recorder:
+            self.recorder.trigger("manual")
+            self.setFocus()
+
+    def _on_dump_timing(self):
+        if self.video_thread.timing is not None:
+            self.video_thread.timing.dump()
+
+    def _on_reset_count(self):
+        if self.counter:
+            self.counter.reset()
+            self.status_panel.update_count()
             self.setFocus()
 
     def keyPressEvent(self, event):
@@ -192,6 +313,14 @@ class MainWindow(QMainWindow):
             self._on_vib_on()
         elif text == self.keys.get("vib_off", "b"):
             self._on_vib_off()
+        elif text == self.keys.get("reset_count", "r"):
+            self._on_reset_count()
+        elif text == self.keys.get("auto_speed", "g"):
+            self._on_toggle_auto_speed()
+        elif text == self.keys.get("record", "k"):
+            self._on_record()
+        elif text == self.keys.get("dump_timing", "t"):
+            self._on_dump_timing()
         elif text == self.keys.get("quit", "q"):
             self.close()
         else:
@@ -204,6 +333,15 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         if hasattr(self, "video_thread"):
             self.video_thread.stop()
+        if self.telemetry:
+            self.telemetry.stop()
+        if self.feed_controller:
+            self.feed_controller.stop()
+        if self.belt_controller:
+            self.belt_controller.stop()
+        # Дожидаемся выполнения поставленных команд до закрытия портов
+        self.servo_worker.stop()
+        self.rp2040_worker.stop()
         if self.servo:
             self.servo.close()
         if self.rp2040:
@@ -6,10 +6,13 @@ from PySide6.QtCore import Qt, QTimer
 class StatusPanel(QGroupBox):
     """Панель отображения статуса."""
 
-    def __init__(self, servo, rp2040, parent=None):
+    def __init__(self, servo, rp2040, counter=None, parent=None):
         super().__init__("Текущее состояние", parent)
         self.servo = servo
         self.rp2040 = rp2040
+        self.counter = counter
+        self.telemetry = None  # ServoTelemetry: фактическое состояние привода
+        self.timing = None  # FrameTimingStats: задержки кадра по этапам
         self.setStyleSheet(
             """
             QGroupBox {
@@ -71,6 +74,40 @@ class StatusPanel(QGroupBox):
         )
         layout.addWidget(self.lbl_vibro)
 
+        self.lbl_count = QLabel("Детали: —")
+        self.lbl_count.setAlignment(Qt.AlignCenter)
+        self.lbl_count.setStyleSheet(
+            """
+            QLabel {
+                font-size: 16px;
+                font-weight: bold;
+                color: #2c3e50;
+                padding: 8px;
+                border: 1px solid #ccc;
+                border-radius: 3px;
+                background-color: white;
+            }
+        """
+        )
+        layout.addWidget(self.lbl_count)
+
+        self.lbl_latency = QLabel("")
+        self.lbl_latency.setStyleSheet(
+            """
+            QLabel {
+                font-family: monospace;
+                font-size: 11px;
+                color: #555;
+                padding: 6px;
+                border: 1px solid #ccc;
+                border-radius: 3px;
+                background-color: white;
+            }
+        """
+        )
+        self.lbl_latency.hide()
+        layout.addWidget(self.lbl_latency)
+
         self.setLayout(layout)
 
         self.update_all()
@@ -79,6 +116,8 @@ class StatusPanel(QGroupBox):
         """Обновление всех статусов."""
         self.update_conveyor_status()
         self.update_vibro_status()
+        self.update_count()
+        self.update_latency()
 
     def update_conveyor_status(self, servo=None):
         """Обновление статуса конвейера."""
@@ -89,10 +128,23 @@ class StatusPanel(QGroupBox):
             direction = self.servo.current_direction or "Остановлен"
             speed = getattr(self.servo, "current_speed", 0)
             status_text = f"Конвейер: {direction.capitalize()}\n({speed} об/мин)"
+            status_text += self._telemetry_text()
             self.lbl_conveyor.setText(status_text)
         else:
             self.lbl_conveyor.setText("Конвейер: Нет связи")
 
+    def _telemetry_text(self):
+        """Фактическое состояние привода по последнему снимку телеметрии."""
+        if self.telemetry is None:
+            return ""
+        snapshot = self.telemetry.snapshot
+        if not snapshot.connected:
+            return "\nПривод: нет ответа"
+        text = f"\nФакт: {snapshot.speed:.0f} об/мин, нагрузка {snapshot.load}%"
+        if snapshot.error_code:
+            text += f"\nОШИБКА ПРИВОДА: {snapshot.error_code}"
+        return text
+
     def update_vibro_status(self, rp2040=None):
         """Обновление статуса вибробункера."""
         if rp2040:
@@ -102,3 +154,26 @@ class StatusPanel(QGroupBox):
             self.lbl_vibro.setText(f"Вибробункер:\n{self.rp2040.get_status()}")
         else:
             self.lbl_vibro.setText("Вибробункер: Нет связи")
+
+    def update_count(self):
+        """Обновление счётчика деталей."""
+        if self.counter is None:
+            self.lbl_count.setText("Детали: подсчёт отключён")
+            return
+        self.lbl_count.setText(
+            f"Детали: {self.counter.count}\n({self.counter.rate_per_minute():.0f} шт/мин)"
+        )
+
+    def update_latency(self):
+        """Процентили задержек кадра по этапам (мс) за окно статистики."""
+        if self.timing is None:
+            self.lbl_latency.hide()
+            return
+        summary = self.timing.summary()
+        lines = ["Задержки, мс   p50    p95    p99"]
+        for name, values in summary.items():
+            lines.append(f"{name:<12}{values['p50']:>7.1f}{values['p95']:>7.1f}{values['p99']:>7.1f}")
+        if not summary:
+            lines.append("нет данных")
+        self.lbl_latency.setText("\n".join(lines))
+        self.lbl_latency.show()
@@ -1,9 +1,7 @@
 # gui/panels/video_panel.py
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QImage, QPixmap
-import cv2
-import numpy as np
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QPixmap
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +10,9 @@ logger = logging.getLogger(__name__)
 class VideoPanel(QWidget):
     """Панель отображения видео."""
 
+    # Размер области изображения изменился: (ширина, высота)
+    display_size_changed = Signal(int, int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -25,34 +26,15 @@ class VideoPanel(QWidget):
 
         layout.addWidget(self.image_label)
 
-    def update_image(self, cv_img):
-        """Обновление изображения."""
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.display_size_changed.emit(self.width(), self.height())
+
+    def update_image(self, qt_img):
+        """Обновление изображения (уже уменьшенного и преобразованного в RGB)."""
         try:
-            if cv_img is None:
+            if qt_img is None:
                 return
-
-            h, w, _ = cv_img.shape
-
-            # Масштабирование с сохранением пропорций
-            available_width = self.width()
-            available_height = self.height()
-
-            if available_width > 0 and available_height > 0:
-                scale = min(available_width / w, available_height / h, 1.0)
-                new_w, new_h = int(w * scale), int(h * scale)
-
-                if scale < 1.0:
-                    resized = cv2.resize(cv_img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-                else:
-                    resized = cv_img
-                    new_w, new_h = w, h
-
-                # Конвертация в QImage
-                rgb_image = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-                bytes_per_line = 3 * new_w
-                qt_img = QImage(rgb_image.data, new_w, new_h, bytes_per_line, QImage.Format_RGB888)
-
-                self.image_label.setPixmap(QPixmap.fromImage(qt_img))
-
+            self.image_label.setPixmap(QPixmap.fromImage(qt_img))
         except Exception as e:
             logger.error(f"Ошибка обновления изображения: {e}")
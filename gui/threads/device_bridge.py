@@ -0,0 +1,22 @@
+# gui/threads/device_bridge.py
+from PySide6.QtCore import QObject, Signal
+
+
+class DeviceBridge(QObject):
+    """
+    Передача результатов команд DeviceWorker в поток GUI.
+    Future завершается в потоке шины; сигнал доставляется в GUI очередью Qt.
+    """
+
+    # (имя команды, результат или исключение)
+    command_finished = Signal(str, object)
+
+    def submit(self, worker, name, func, *args, coalesce_key=None, urgent=False):
+        """Постановка команды в очередь шины с уведомлением GUI по завершении."""
+        future = worker.submit(name, func, *args, coalesce_key=coalesce_key, urgent=urgent)
+        future.add_done_callback(lambda f: self._notify(name, f))
+        return future
+
+    def _notify(self, name, future):
+        error = future.exception()
+        self.command_finished.emit(name, error if error is not None else future.result())
@@ -1,32 +1,131 @@
 # gui/threads/video_thread.py
+import threading
+import time
+
 from PySide6.QtCore import QThread, Signal
-import numpy as np
+from PySide6.QtGui import QImage
+
+from modules.overlay import OverlayRenderer
+from modules.pipeline import FramePipeline
+
+
+class ImageMailbox:
+    """Почтовый ящик на одно изображение: хранится только последнее."""
+
+    def __init__(self):
+        self._item = None
+        self._lock = threading.Lock()
+        self._empty = threading.Event()
+        self._empty.set()
+
+    def put(self, item):
+        with self._lock:
+            self._item = item
+            self._empty.clear()
+
+    def take(self):
+        """Извлечение изображения (None, если ящик пуст)."""
+        with self._lock:
+            item, self._item = self._item, None
+            self._empty.set()
+            return item
+
+    def wait_empty(self, timeout):
+        """Ожидание, пока GUI заберёт предыдущее изображение."""
+        return self._empty.wait(timeout)
 
 
 class VideoThread(QThread):
-    """Поток для захвата видео."""
+    """
+    Стадия отображения конвейера кадров.
+
+    Захват и обработка идут в собственных потоках FramePipeline; этот поток
+    уменьшает кадр до размера виджета, переводит его в RGB QImage
+    и рисует поверх служебную информацию (OverlayRenderer).
+    В GUI через почтовый ящик передаётся только это небольшое изображение.
+    Пока GUI не забрал предыдущее изображение, новые кадры не преобразуются,
+    а вытесняются в очереди отображения.
+
+    Задержки render пишет этот поток, paint и возраст кадра на экране —
+    GUI через mark_painted() (гистограммы pipeline.timing).
+    """
     
-    change_pixmap_signal = Signal(np.ndarray)
+    # Новое изображение в почтовом ящике (забрать через take_image())
+    frame_ready = Signal()
     
-    def __init__(self, camera):
+    def __init__(self, camera, config, processors=None):
         super().__init__()
         self.camera = camera
+        self.pipeline = FramePipeline(camera, config, processors)
+        self.mailbox = ImageMailbox()
+        self.overlay = OverlayRenderer(config)
+        self.timing = self.pipeline.timing
+        self._shown = None  # (получен, отрисован) — отметки изображения, забранного GUI
         self.running = True
+
+        width, height = config.get("display", {}).get("window_size", [800, 600])
+        self.display_size = (width, height)
     
     def run(self):
         """Запуск потока."""
-        self.camera.open()
-        self.camera.start()
+        self.pipeline.start()
         
         while self.running:
-            ret, frame = self.camera.read()
-            if ret:
-                self.change_pixmap_signal.emit(frame)
+            # Не преобразуем кадр, пока GUI не забрал предыдущее изображение
+            if not self.mailbox.wait_empty(0.1):
+                continue
+            packet = self.pipeline.output.get(timeout=0.1)
+            if packet is None:
+                continue
+            try:
+                started = time.perf_counter()
+                image, rgb = self._render(packet)
+                timing = packet.lease.timing
+                timing.mark("render", started)
+                if self.timing is not None:
+                    self.timing.record(timing, ("render",))
+                # Аренда возвращается в пул: отметки для paint копируются
+                marks = (timing.received, timing.finished("render"))
+            finally:
+                packet.release()
+            self.mailbox.put((image, rgb) + marks)
+            self.frame_ready.emit()
         
-        self.camera.stop()
-        self.camera.release()
+        self.pipeline.stop()
+
+    def _render(self, packet):
+        """Кадр в размере виджета → (QImage RGB888, массив с его данными)."""
+        rgb, _ = self.overlay.render(packet, self.display_size, fps=self.pipeline.capture.fps())
+        new_h, new_w = rgb.shape[:2]
+        image = QImage(rgb.data, new_w, new_h, 3 * new_w, QImage.Format_RGB888)
+        # QImage не копирует данные: массив живёт вместе с изображением
+        return image, rgb
+
+    def take_image(self):
+        """Последнее готовое изображение (QImage) или None. Вызывается из GUI."""
+        item = self.mailbox.take()
+        if item is None:
+            return None
+        self._shown = item[2:]
+        return item[0]
+
+    def mark_painted(self):
+        """Изображение, забранное take_image(), выведено на экран. Вызывается из GUI."""
+        if self._shown is None or self.timing is None:
+            return
+        received, rendered = self._shown
+        self._shown = None
+        now = time.perf_counter()
+        self.timing.histograms["paint"].add((now - rendered) * 1000)
+        if received:
+            self.timing.histograms["displayed"].add((now - received) * 1000)
+
+    def set_display_size(self, width, height):
+        """Размер области отображения, сообщаемый панелью видео."""
+        if width > 0 and height > 0:
+            self.display_size = (width, height)
     
     def stop(self):
         """Остановка потока."""
         self.running = False
-        self.wait()
\ No newline at end of file
+        self.wait()
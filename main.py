@@ -1,45 +1,79 @@
 # main.py
-import sys
+import argparse
+import json
 import logging
-
-from PySide6.QtWidgets import QApplication
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from modules.utils import load_config, setup_logging
-from modules.camera import get_camera
-from modules.modbus_control import ServoController
-from modules.uart_control import RP2040Controller
-from gui.main_window import MainWindow
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Конвейер: подсчёт деталей")
+    parser.add_argument("--config", default="config.yaml", help="Файл конфигурации")
+    parser.add_argument("--headless", action="store_true", help="Режим без GUI (PySide6 не загружается)")
+    parser.add_argument(
+        "--exec", dest="startup", action="append", default=[], metavar="CMD",
+        help="Команда после запуска в режиме без GUI (можно несколько): forward, vib_on 15 50, ...",
+    )
+    parser.add_argument(
+        "--send", nargs="+", metavar="CMD",
+        help="Отправить команду работающему экземпляру без GUI (через headless.socket) и выйти",
+    )
+    return parser.parse_args()
 
 
 def main():
     """Главная функция приложения."""
+    args = parse_args()
+
+    if args.send:
+        # Клиент управляющего сокета: устройства и камера не открываются
+        from modules.headless import send_command
+
+        config = load_config(args.config)
+        reply = send_command(config.get("headless", {}).get("socket"), " ".join(args.send))
+        print(json.dumps(reply, ensure_ascii=False, indent=2))
+        sys.exit(0 if reply.get("ok") else 1)
+
     # Настройка логирования
+    started = time.perf_counter()
     setup_logging()
     logger = logging.getLogger(__name__)
 
     # Загрузка конфигурации
-    config = load_config()
+    config = load_config(args.config)
+
+    # Камера, сервопривод и RP2040 запускаются параллельно (отчёт о времени — в лог),
+    # а для GUI тем временем загружается PySide6
+    from modules.startup import bring_up
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        startup = pool.submit(bring_up, config)
+        if not args.headless:
+            from PySide6.QtWidgets import QApplication
 
-    # Инициализация устройств
-    camera = get_camera(config)
-    servo = ServoController(config)
-    rp2040 = RP2040Controller(config)
+            from gui.main_window import MainWindow
+        devices = startup.result()
+    camera = devices["camera"].device
+    if camera is None:
+        # Неподключённая камера открывается повторно в CaptureStage, но без объекта камеры работать нечем
+        logger.error(f"Камера не создана: {devices['camera'].detail}")
+        sys.exit(1)
+    servo = devices["servo"].device
+    rp2040 = devices["rp2040"].device
 
-    # Подключение устройств
-    if servo.connect():
-        logger.info("Сервопривод подключён")
-    else:
-        logger.warning("Сервопривод не подключён")
+    if args.headless:
+        from modules.headless import run_headless
 
-    if rp2040.connect():
-        logger.info(f"RP2040 подключён: {rp2040.default_freq} Гц, {rp2040.default_duty}%")
-    else:
-        logger.warning("RP2040 не подключён")
+        sys.exit(run_headless(config, camera, servo, rp2040, args.startup))
 
     # Запуск GUI
     app = QApplication(sys.argv)
     window = MainWindow(config, camera, servo, rp2040)
     window.show()
+    logger.info(f"Окно открыто через {(time.perf_counter() - started) * 1000:.0f} мс после запуска")
 
     sys.exit(app.exec())
 
@@ -0,0 +1,70 @@
+# modules/backends.py
+"""
+Реестры реализаций (камеры, сервопривод, вибробункер) по типу из конфигурации.
+
+Реализация задаётся строкой "модуль:Класс" и импортируется только при
+первом обращении: выбранный тип не тянет за собой чужие зависимости
+(например, SDK камеры Hikrobot при работе с веб-камерой).
+"""
+
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackendRegistry:
+    """Тип из конфигурации → класс реализации с отложенным импортом."""
+
+    def __init__(self, kind, backends=None):
+        self.kind = kind  # Название для сообщений: "камеры", "сервопривода"...
+        self._paths = dict(backends or {})
+        self._classes = {}
+
+    def register(self, name, backend):
+        """Регистрация реализации: класс или строка "модуль:Класс" (".модуль" — относительно modules)."""
+        self._paths[name] = backend
+        self._classes.pop(name, None)
+
+    def types(self):
+        return list(self._paths)
+
+    def resolve(self, name):
+        """Класс реализации типа name (импорт модуля при первом обращении)."""
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        backend = self._paths.get(name)
+        if backend is None:
+            raise ValueError(f"Неизвестный тип {self.kind}: {name}. Доступны: {self.types()}")
+        if isinstance(backend, str):
+            module_name, _, class_name = backend.partition(":")
+            cls = getattr(importlib.import_module(module_name, __package__), class_name)
+        else:
+            cls = backend
+        self._classes[name] = cls
+        return cls
+
+    def create(self, name, *args, **kwargs):
+        return self.resolve(name)(*args, **kwargs)
+
+
+SERVO_BACKENDS = BackendRegistry(
+    "сервопривода",
+    {"delta_asda": ".modbus_control:ServoController"},
+)
+
+VIBRO_BACKENDS = BackendRegistry(
+    "вибробункера",
+    {"rp2040": ".uart_control:RP2040Controller"},
+)
+
+
+def get_servo(config):
+    """Контроллер сервопривода по modbus.type (по умолчанию Delta ASDA)."""
+    return SERVO_BACKENDS.create(config.get("modbus", {}).get("type", "delta_asda"), config)
+
+
+def get_vibro(config):
+    """Контроллер вибробункера по rp2040.type (по умолчанию RP2040 по UART)."""
+    return VIBRO_BACKENDS.create(config.get("rp2040", {}).get("type", "rp2040"), config)
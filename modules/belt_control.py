@@ -0,0 +1,200 @@
+# modules/belt_control.py
+"""
+Автоматическая скорость ленты по плотности деталей в ROI.
+
+Трекер надёжно сопоставляет детали, пока смещение детали за кадр
+заметно меньше промежутка до соседней. Поэтому допустимая скорость
+определяется отношением минимального промежутка между деталями в ROI
+к смещению за кадр: детали идут плотно — лента замедляется, редко —
+разгоняется до верхней границы. Так число засчитанных деталей в час
+растёт без потери точности.
+
+DensityMeter — обработчик стадии обработки (после PartCounter),
+BeltSpeedController — поток, который с заданным периодом выбирает
+скорость и отправляет её сервоприводу не чаще min_command_interval.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .counter import centers
+from .modbus_control import ServoController
+from .roi import Roi
+
+logger = logging.getLogger(__name__)
+
+# parts — деталей в ROI, min_gap — минимальный промежуток между соседними (px сенсора),
+# step — смещение детали за кадр (px сенсора), timestamp — время кадра
+DensitySample = namedtuple("DensitySample", ["parts", "min_gap", "step", "timestamp"])
+
+
+class DensityMeter:
+    """Измерение плотности деталей в ROI по дорожкам трекера (сглаженное)."""
+
+    def __init__(self, config, counter):
+        self.counter = counter
+        # Плотность считается в roi.coords независимо от roi.crop (None — по всему кадру)
+        coords = config.get("roi", {}).get("coords")
+        self.roi = Roi(*coords) if coords else None
+        self.axis = 0 if config.get("counting", {}).get("line_axis", "x") == "x" else 1
+        self.smoothing = config.get("belt_control", {}).get("smoothing", 0.2)
+
+        self._parts = 0.0
+        self._min_gap = None
+        self._step = 0.0
+        self.snapshot = None  # Последний DensitySample (присваивание атомарно)
+
+    def process(self, packets):
+        tracker = self.counter.tracker
+        for packet in packets:
+            if not len(tracker):
+                parts, min_gap, step = 0, None, self._step
+            else:
+                inside = tracker.confirmed
+                if self.roi is not None:
+                    inside &= self.roi.contains(centers(tracker.boxes))
+                parts = int(inside.sum())
+                min_gap = self._min_gap_of(tracker.boxes[inside])
+                moving = np.abs(tracker.velocity[inside & (tracker.hits > 2), self.axis])
+                step = float(np.median(moving)) if moving.size else self._step
+            self._smooth(parts, min_gap, step)
+            self.snapshot = DensitySample(self._parts, self._min_gap, self._step, packet.timestamp)
+
+    def _min_gap_of(self, boxes):
+        """Минимальный промежуток между соседними деталями вдоль оси движения (None — меньше двух)."""
+        if len(boxes) < 2:
+            return None
+        order = np.argsort(boxes[:, self.axis])
+        start = boxes[order, self.axis]
+        end = boxes[order, self.axis + 2]
+        return float(np.clip(start[1:] - end[:-1], 0.0, None).min())
+
+    def _smooth(self, parts, min_gap, step):
+        a = self.smoothing
+        self._parts += a * (parts - self._parts)
+        self._step += a * (step - self._step)
+        if min_gap is None:
+            # Нет пар деталей — промежуток не ограничивает скорость
+            self._min_gap = None
+        elif self._min_gap is None:
+            self._min_gap = min_gap
+        else:
+            # Сужение промежутка учитывается сразу, расширение — плавно
+            self._min_gap = min(min_gap, self._min_gap + a * (min_gap - self._min_gap))
+
+    def stats(self):
+        sample = self.snapshot
+        if sample is None:
+            return {}
+        return {"parts": sample.parts, "min_gap": sample.min_gap, "step": sample.step}
+
+
+class BeltSpeedController(threading.Thread):
+    """Выбор скорости ленты по плотности деталей (работает, пока лента идёт вперёд)."""
+
+    def __init__(self, config, meter, servo, submit=None):
+        """submit(name, func, *args) — выполнение команды сервопривода (по умолчанию прямой вызов)."""
+        super().__init__(name="belt-control", daemon=True)
+        belt_config = config.get("belt_control", {})
+        self.meter = meter
+        self.servo = servo
+        self.submit = submit or (lambda name, func, *args: func(*args))
+
+        self.speed_min = max(ServoController.MIN_SPEED, belt_config.get("speed_min", 50))
+        self.speed_max = min(ServoController.MAX_SPEED, belt_config.get("speed_max", ServoController.MAX_SPEED))
+        self.gap_frames = belt_config.get("gap_frames", 4.0)
+        self.max_parts = belt_config.get("max_parts", 8)
+        self.max_step = belt_config.get("max_step", 0.15)
+        self.speed_quantum = max(1, int(belt_config.get("speed_quantum", 5)))
+        self.min_change = belt_config.get("min_change", 10)
+        self.period = belt_config.get("period", 0.5)
+        self.min_command_interval = belt_config.get("min_command_interval", 2.0)
+        self.max_sample_age = belt_config.get("max_sample_age", 1.0)
+
+        self.enabled = belt_config.get("auto_start", True)
+        self.target_speed = None
+        self.commands = 0
+        self._last_command_time = float("-inf")
+        self._stop_event = threading.Event()
+
+    def set_enabled(self, enabled):
+        """Включение/выключение автоматического режима (например, оператором)."""
+        if enabled != self.enabled:
+            self.enabled = enabled
+            logger.info(f"Автоматическая скорость ленты {'включена' if enabled else 'выключена'}")
+
+    def run(self):
+        logger.info(
+            f"Автоматическая скорость ленты: {self.speed_min}–{self.speed_max} об/мин, "
+            f"не менее {self.gap_frames} кадров на промежуток между деталями"
+        )
+        while not self._stop_event.wait(self.period):
+            try:
+                self.step()
+            except Exception:
+                logger.exception("Ошибка шага автоматической скорости ленты")
+
+    def desired_speed(self, sample, current):
+        """Скорость, при которой самый узкий промежуток проходится не быстрее чем за gap_frames кадров."""
+        if sample.parts > self.max_parts:
+            desired = current * (1.0 - self.max_step)
+        elif sample.min_gap is None or sample.step <= 0.5:
+            # Пар деталей нет или движение ещё не измерено — можно разгоняться
+            desired = self.speed_max
+        else:
+            # Смещение за кадр пропорционально скорости ленты
+            desired = current * sample.min_gap / (sample.step * self.gap_frames)
+
+        desired = max(current * (1.0 - self.max_step), min(current * (1.0 + self.max_step), desired))
+        desired = round(desired / self.speed_quantum) * self.speed_quantum
+        return int(max(self.speed_min, min(self.speed_max, desired)))
+
+    def step(self, now=None):
+        """Один шаг: при необходимости отправляет новую скорость."""
+        now = time.monotonic() if now is None else now
+        if not self.enabled or not self.servo.connected or self.servo.current_direction != "forward":
+            return
+        sample = self.meter.snapshot
+        if sample is None or now - sample.timestamp > self.max_sample_age:
+            return  # Нет свежих кадров — скорость не трогаем
+        if now - self._last_command_time < self.min_command_interval:
+            return
+
+        current = self.servo.current_speed
+        speed = self.desired_speed(sample, current)
+        # Мелкие изменения не стоят транзакции Modbus и перезапуска JOG
+        if abs(speed - current) < self.min_change and self.speed_min <= current <= self.speed_max:
+            return
+
+        self.target_speed = speed
+        self.commands += 1
+        self._last_command_time = now
+        logger.debug(
+            f"Лента: {current} → {speed} об/мин (деталей {sample.parts:.1f}, "
+            f"промежуток {sample.min_gap}, смещение {sample.step:.1f} px/кадр)"
+        )
+        self.submit("auto_speed", self.servo.set_speed, speed)
+
+    def stats(self):
+        return {"enabled": self.enabled, "target_speed": self.target_speed, "commands": self.commands}
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def create_belt_controller(config, meter, servo, submit=None):
+    """Создание и запуск регулятора, если есть измеритель плотности и связь с приводом (иначе None)."""
+    if meter is None:
+        return None
+    if not (servo and servo.connected):
+        logger.warning("Автоматическая скорость ленты не запущена: сервопривод не подключён")
+        return None
+    controller = BeltSpeedController(config, meter, servo, submit)
+    controller.start()
+    return controller
@@ -0,0 +1,154 @@
+# modules/blob_detector.py
+"""
+Быстрая детекция деталей без нейросети (при yolo.enable_detection: false).
+
+Для контрастных деталей на однотонной ленте: внутри ROI кадр переводится
+в одноканальное изображение, уменьшается, бинаризуется порогом или
+вычитанием фона, после чего связные области (cv2.connectedComponentsWithStats)
+становятся детекциями. Результат совместим с YoloDetector, поэтому
+дальше работает тот же трекер и счётчик.
+"""
+
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from .detector import EMPTY_DETECTIONS
+from .roi import Roi
+from .utils import RateMeter
+
+logger = logging.getLogger(__name__)
+
+
+class BlobDetector:
+    """Обработчик стадии обработки: детекция связных областей в ROI."""
+
+    METHODS = ("threshold", "background")
+    timing_stage = "detect"  # Этап в задержках кадра (FrameTiming)
+
+    def __init__(self, config):
+        """Инициализация из раздела blob."""
+        blob_config = config.get("blob", {})
+        self.method = blob_config.get("method", "threshold")
+        self.threshold = blob_config.get("threshold", 0)  # 0 — порог Оцу
+        self.invert = blob_config.get("invert", False)
+        self.scale = blob_config.get("scale", 0.5)
+        self.min_area = blob_config.get("min_area", 200)  # В пикселях полного кадра сенсора
+        self.max_area = blob_config.get("max_area", 200000)
+        self.morph_kernel = blob_config.get("morph_kernel", 3)
+        self.class_id = config.get("yolo", {}).get("target_class", 0)
+
+        if self.method not in self.METHODS:
+            raise ValueError(
+                f"Неизвестный метод blob: {self.method}. Доступны: {list(self.METHODS)}"
+            )
+
+        self.roi = Roi.from_config(config)
+        self.kernel = (
+            cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (self.morph_kernel, self.morph_kernel))
+            if self.morph_kernel > 1
+            else None
+        )
+        self.subtractor = None
+        if self.method == "background":
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=blob_config.get("history", 300),
+                varThreshold=blob_config.get("var_threshold", 32),
+                detectShadows=False,
+            )
+
+        # Буферы уменьшенного изображения и маски переиспользуются между кадрами
+        self._small = None
+        self._mask = None
+
+        self.frames_meter = RateMeter()
+        self.detections_meter = RateMeter()
+
+    def _plane(self, image):
+        """Одноканальная плоскость: Mono8/Bayer/серый — как есть, BGR — яркость."""
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def _downscale(self, plane):
+        h, w = plane.shape[:2]
+        size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        if self.scale == 1.0:
+            return plane
+        if self._small is None or self._small.shape != (size[1], size[0]):
+            self._small = np.empty((size[1], size[0]), dtype=np.uint8)
+        return cv2.resize(plane, size, dst=self._small, interpolation=cv2.INTER_AREA)
+
+    def _binarize(self, small):
+        if self._mask is None or self._mask.shape != small.shape:
+            self._mask = np.empty(small.shape, dtype=np.uint8)
+
+        if self.subtractor is not None:
+            self.subtractor.apply(small, self._mask)
+        else:
+            flags = cv2.THRESH_BINARY_INV if self.invert else cv2.THRESH_BINARY
+            if self.threshold <= 0:
+                flags |= cv2.THRESH_OTSU
+            cv2.threshold(small, self.threshold, 255, flags, dst=self._mask)
+
+        if self.kernel is not None:
+            cv2.morphologyEx(self._mask, cv2.MORPH_OPEN, self.kernel, dst=self._mask)
+        return self._mask
+
+    def detect(self, image, frame_scale=1.0):
+        """
+        Детекции (N, 6) в координатах переданного изображения.
+        frame_scale — масштаб изображения относительно сенсора (для фильтра площади).
+        """
+        small = self._downscale(self._plane(image))
+        mask = self._binarize(small)
+
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if n <= 1:
+            return EMPTY_DETECTIONS
+
+        stats = stats[1:]  # Метка 0 — фон
+        area = stats[:, cv2.CC_STAT_AREA] / (self.scale * frame_scale) ** 2
+        keep = (area >= self.min_area) & (area <= self.max_area)
+        if not keep.any():
+            return EMPTY_DETECTIONS
+
+        stats = stats[keep].astype(np.float32) / self.scale
+        x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        count = len(x)
+        return np.column_stack(
+            (x, y, x + w, y + h, np.ones(count, np.float32), np.full(count, self.class_id, np.float32))
+        )
+
+    def process(self, packets):
+        """Детекция для порции пакетов конвейера (в пределах ROI, если она задана)."""
+        detections = 0
+        for packet in packets:
+            if self.roi is None:
+                dets = self.detect(packet.frame, packet.scale)
+                packet.detections = Roi.to_frame(dets, (0, 0), packet.scale)
+            else:
+                crop, offset = self.roi.crop(packet.frame, packet.scale)
+                dets = self.detect(crop, packet.scale)
+                packet.detections = Roi.to_frame(dets, offset, packet.scale)
+            detections += len(packet.detections)
+
+        now = time.monotonic()
+        self.frames_meter.add(len(packets), now)
+        self.detections_meter.add(detections, now)
+
+    def stats(self):
+        return {
+            "frames_per_sec": self.frames_meter.rate(),
+            "detections_per_sec": self.detections_meter.rate(),
+        }
+
+
+def create_blob_detector(config):
+    """Создание детектора связных областей, если он включён в конфигурации (иначе None)."""
+    if not config.get("blob", {}).get("enable", False):
+        return None
+    return BlobDetector(config)
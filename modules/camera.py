@@ -1,13 +1,15 @@
 # modules/camera.py: Factory для выбора камеры по config
+# Модуль камеры импортируется только для выбранного camera.type (SDK Hikrobot — только для hikrobot)
 
-from .hik_camera import HikCamera
-from .opencv_camera import OpenCVCamera
+from .backends import BackendRegistry
+
+CAMERA_BACKENDS = BackendRegistry('камеры', {
+    'hikrobot': '.hik_camera:HikCamera',
+    'opencv': '.opencv_camera:OpenCVCamera',
+    'replay': '.replay_camera:ReplayCamera',
+    'synthetic': '.synthetic_camera:SyntheticCamera',
+})
 
 def get_camera(config):
     cam_type = config['camera']['type']
-    if cam_type == 'hikrobot':
-        return HikCamera(config)
-    elif cam_type == 'opencv':
-        return OpenCVCamera(config)
-    else:
-        raise ValueError(f"Неизвестный тип камеры: {cam_type}")
\ No newline at end of file
+    return CAMERA_BACKENDS.create(cam_type, config)
@@ -0,0 +1,287 @@
+# modules/counter.py
+"""
+Подсчёт деталей по пересечению линии внутри ROI.
+
+Трекер в духе SORT/ByteTrack: каждая дорожка (track) — рамка детали
+с постоянной скоростью. Сопоставление детекций и дорожек выполняется
+по матрицам IoU и расстояний между центрами (NumPy, без циклов
+по объектам). Деталь засчитывается один раз — когда подтверждённая
+дорожка оказывается по другую сторону линии подсчёта, чем была
+при появлении.
+"""
+
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+from .utils import RateMeter
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(a, b):
+    """Матрица IoU (M, N) между рамками a (M, 4) и b (N, 4) в формате x1, y1, x2, y2."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def centers(boxes):
+    """Центры рамок (N, 2)."""
+    return np.column_stack(((boxes[:, 0] + boxes[:, 2]) * 0.5, (boxes[:, 1] + boxes[:, 3]) * 0.5))
+
+
+def match(score, threshold, max_rounds=8):
+    """
+    Жадное сопоставление по матрице сходства (M, N): на каждом раунде
+    одновременно принимаются все пары, взаимно лучшие друг для друга.
+    Возвращает массивы индексов строк и столбцов.
+    """
+    rows_out, cols_out = [], []
+    if score.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    score = np.where(score > threshold, score, -1.0)
+    all_rows = np.arange(score.shape[0])
+    for _ in range(max_rounds):
+        if score.max() <= threshold:
+            break
+        best_col = score.argmax(axis=1)
+        best_row = score.argmax(axis=0)
+        mutual = (best_row[best_col] == all_rows) & (score[all_rows, best_col] > threshold)
+        rows, cols = all_rows[mutual], best_col[mutual]
+        if rows.size == 0:
+            break
+        rows_out.append(rows)
+        cols_out.append(cols)
+        score[rows, :] = -1.0
+        score[:, cols] = -1.0
+
+    if not rows_out:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    return np.concatenate(rows_out), np.concatenate(cols_out)
+
+
+class Tracker:
+    """
+    Многообъектный трекер с моделью постоянной скорости.
+    Состояние хранится столбцами NumPy, по одной строке на дорожку.
+    """
+
+    def __init__(self, iou_threshold=0.2, max_distance=80.0, min_hits=2, max_age=10):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.min_hits = min_hits
+        self.max_age = max_age
+
+        self._next_id = 1
+        self.boxes = np.zeros((0, 4), dtype=np.float32)  # Текущие (предсказанные) рамки
+        self.velocity = np.zeros((0, 2), dtype=np.float32)  # Скорость центра, px/кадр
+        self.last_center = np.zeros((0, 2), dtype=np.float32)  # Центр при последнем измерении
+        self.origin = np.zeros((0, 2), dtype=np.float32)  # Центр при появлении
+        self.since = np.zeros(0, dtype=np.int32)  # Кадров с последнего измерения
+        self.hits = np.zeros(0, dtype=np.int32)  # Количество измерений
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.counted = np.zeros(0, dtype=bool)
+        self.area = np.zeros(0, dtype=np.float32)  # Площадь рамки при последнем измерении
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def confirmed(self):
+        """Маска подтверждённых дорожек."""
+        return self.hits >= self.min_hits
+
+    def predict(self, frames=1):
+        """Сдвиг всех дорожек по их скорости на frames кадров."""
+        if len(self):
+            shift = self.velocity * frames
+            self.boxes += np.hstack((shift, shift))
+            self.since += frames
+            self._prune()
+
+    def update(self, detections):
+        """Шаг трекера по детекциям (N, >=4) текущего кадра."""
+        self.predict()
+        dets = np.asarray(detections, dtype=np.float32)[:, :4] if len(detections) else np.zeros((0, 4), np.float32)
+
+        rows, cols = self._associate(dets)
+
+        if rows.size:
+            det_centers = centers(dets[cols])
+            frames = np.maximum(self.since[rows], 1)[:, None]
+            measured = (det_centers - self.last_center[rows]) / frames
+            # Сглаживание скорости; у новых дорожек берётся измеренная
+            alpha = np.where(self.hits[rows] > 1, 0.5, 1.0)[:, None]
+            self.velocity[rows] = alpha * measured + (1 - alpha) * self.velocity[rows]
+            self.boxes[rows] = dets[cols]
+            self.last_center[rows] = det_centers
+            self.area[rows] = (dets[cols, 2] - dets[cols, 0]) * (dets[cols, 3] - dets[cols, 1])
+            self.since[rows] = 0
+            self.hits[rows] += 1
+
+        unmatched = np.ones(len(dets), dtype=bool)
+        unmatched[cols] = False
+        if unmatched.any():
+            self._spawn(dets[unmatched])
+
+    def _associate(self, dets):
+        """Сопоставление дорожек и детекций по IoU, с запасным критерием по расстоянию."""
+        if not len(self) or not len(dets):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        iou = iou_matrix(self.boxes, dets)
+        diff = centers(self.boxes)[:, None, :] - centers(dets)[None, :, :]
+        dist = np.sqrt((diff ** 2).sum(axis=2))
+        # Быстрые детали могут не перекрываться с предсказанием — учитываем близость центров
+        closeness = np.clip(1.0 - dist / self.max_distance, 0.0, 1.0) * self.iou_threshold
+        score = np.maximum(iou, closeness)
+        return match(score, threshold=self.iou_threshold * 0.5)
+
+    def _spawn(self, dets):
+        n = len(dets)
+        c = centers(dets)
+        self.boxes = np.vstack((self.boxes, dets))
+        self.velocity = np.vstack((self.velocity, np.zeros((n, 2), np.float32)))
+        self.last_center = np.vstack((self.last_center, c))
+        self.origin = np.vstack((self.origin, c))
+        self.since = np.concatenate((self.since, np.zeros(n, np.int32)))
+        self.hits = np.concatenate((self.hits, np.ones(n, np.int32)))
+        self.ids = np.concatenate((self.ids, np.arange(self._next_id, self._next_id + n)))
+        self.counted = np.concatenate((self.counted, np.zeros(n, bool)))
+        self.area = np.concatenate(
+            (self.area, (dets[:, 2] - dets[:, 0]) * (dets[:, 3] - dets[:, 1]))
+        )
+        self._next_id += n
+
+    def _prune(self):
+        """Удаление дорожек, не получавших измерений дольше max_age кадров."""
+        keep = self.since <= self.max_age
+        if keep.all():
+            return
+        for name in ("boxes", "velocity", "last_center", "origin", "since", "hits", "ids", "counted", "area"):
+            setattr(self, name, getattr(self, name)[keep])
+
+
+class PartCounter:
+    """
+    Обработчик стадии обработки: трекинг детекций и подсчёт пересечений линии.
+
+    Для пакетов с detections=None (детекция пропущена) дорожки только
+    предсказываются. В пакет записываются tracks (рамки и ID) и count.
+    """
+
+    timing_stage = "count"  # Этап в задержках кадра (FrameTiming)
+
+    def __init__(self, config):
+        """Инициализация из разделов counting и roi."""
+        count_config = config.get("counting", {})
+        self.tracker = Tracker(
+            iou_threshold=count_config.get("iou_threshold", 0.2),
+            max_distance=count_config.get("max_distance", 80.0),
+            min_hits=count_config.get("min_hits", 2),
+            max_age=count_config.get("max_age", 10),
+        )
+
+        self.axis = 0 if count_config.get("line_axis", "x") == "x" else 1
+        self.direction = count_config.get("direction", 1)
+
+        line = count_config.get("line_position")
+        if line is None:
+            # По умолчанию — середина ROI вдоль оси движения
+            coords = config.get("roi", {}).get("coords", [0, 0, 0, 0])
+            line = (coords[self.axis] + coords[self.axis + 2]) / 2
+        self.line = float(line)
+
+        self.count = 0
+        self.rate_meter = RateMeter(window=count_config.get("rate_window", 60.0))
+
+        # Слипшиеся детали: рамка заметно больше типичной (медиана последних засчитанных)
+        self.clump_area_ratio = count_config.get("clump_area_ratio", 1.8)
+        self.clumps = 0
+        self._areas = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+        logger.info(
+            f"Линия подсчёта: {'x' if self.axis == 0 else 'y'} = {self.line:.0f}, "
+            f"направление {self.direction}"
+        )
+
+    def process(self, packets):
+        for packet in packets:
+            if packet.detections is None:
+                self.tracker.predict()
+            else:
+                self.tracker.update(packet.detections)
+
+            crossed = self._count_crossings()
+            packet.tracks = (self.tracker.boxes.copy(), self.tracker.ids.copy())
+            packet.count = self.count
+            packet.meta["new_counts"] = crossed
+
+    def _count_crossings(self):
+        """
+        Засчитывание подтверждённых дорожек, перешедших линию. Учитываются только
+        дорожки, сопоставленные с детекцией в этом кадре: предсказанная рамка
+        потерянной дорожки может «перейти» линию без детали. Возвращает число новых.
+        """
+        tracker = self.tracker
+        if not len(tracker):
+            return 0
+
+        start = tracker.origin[:, self.axis] - self.line
+        current = centers(tracker.boxes)[:, self.axis] - self.line
+        if self.direction > 0:
+            crossed = (start < 0) & (current >= 0)
+        elif self.direction < 0:
+            crossed = (start >= 0) & (current < 0)
+        else:
+            crossed = np.sign(start) != np.sign(current)
+
+        new = crossed & tracker.confirmed & (tracker.since == 0) & ~tracker.counted
+        n = int(new.sum())
+        if n:
+            tracker.counted |= new
+            clumps = self._count_clumps(tracker.area[new])
+            with self._lock:
+                self.count += n
+                self.clumps += clumps
+            self.rate_meter.add(n)
+        return n
+
+    def _count_clumps(self, areas):
+        """Число слипшихся среди новых засчитанных (по площади относительно медианы)."""
+        clumps = 0
+        if len(self._areas) >= 10:
+            typical = float(np.median(self._areas))
+            clumps = int((areas > typical * self.clump_area_ratio).sum())
+        self._areas.extend(areas.tolist())
+        return clumps
+
+    def reset(self):
+        """Сброс счётчика (уже засчитанные дорожки повторно не считаются)."""
+        with self._lock:
+            self.count = 0
+            self.clumps = 0
+        logger.info("Счётчик деталей сброшен")
+
+    def rate_per_minute(self):
+        """Скорость подсчёта, деталей/мин, по скользящему окну."""
+        return self.rate_meter.rate() * 60.0
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "clumps": self.clumps,
+            "tracks": len(self.tracker),
+            "parts_per_min": self.rate_per_minute(),
+        }
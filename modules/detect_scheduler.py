@@ -0,0 +1,118 @@
+# modules/detect_scheduler.py
+"""
+Планирование детекции по скорости конвейера.
+
+Детектор запускается не на каждом кадре, а так часто, чтобы каждая
+деталь была увидена не менее min_sightings раз за время прохождения ROI.
+Время прохождения рассчитывается по скорости сервопривода (об/мин),
+пути ленты за оборот (px/об) и длине ROI вдоль движения. На пропущенных
+кадрах трекер только предсказывает положение дорожек.
+"""
+
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionScheduler:
+    """Расчёт шага детекции (каждый N-й кадр) по скорости ленты."""
+
+    def __init__(self, config, speed_provider):
+        """
+        speed_provider — функция без аргументов, возвращающая текущую
+        скорость ленты в об/мин (0, если лента стоит).
+        """
+        sched_config = config.get("detect_schedule", {})
+        self.px_per_rev = sched_config.get("px_per_rev", 400.0)
+        self.min_sightings = max(1, sched_config.get("min_sightings", 4))
+        self.max_stride = max(1, sched_config.get("max_stride", 8))
+        self.speed_provider = speed_provider
+
+        count_config = config.get("counting", {})
+        axis = 0 if count_config.get("line_axis", "x") == "x" else 1
+        coords = config.get("roi", {}).get("coords", [0, 0, 0, 0])
+        self.roi_length = abs(coords[axis + 2] - coords[axis])
+
+        max_age = count_config.get("max_age", 10)
+        if self.max_stride >= max_age:
+            logger.warning(
+                f"detect_schedule.max_stride ({self.max_stride}) >= counting.max_age ({max_age}): "
+                f"дорожки будут удаляться между детекциями"
+            )
+
+        self.fps = 0.0
+        self._last_timestamp = None
+
+    def observe(self, timestamp):
+        """Уточнение оценки FPS по времени очередного кадра."""
+        if self._last_timestamp is not None:
+            dt = timestamp - self._last_timestamp
+            if dt > 0:
+                fps = 1.0 / dt
+                self.fps = fps if self.fps == 0.0 else 0.9 * self.fps + 0.1 * fps
+        self._last_timestamp = timestamp
+
+    def stride(self):
+        """Каждый какой кадр отдавать детектору."""
+        speed = self.speed_provider() or 0
+        if speed <= 0 or self.fps <= 0 or self.roi_length <= 0:
+            return self.max_stride
+
+        px_per_sec = speed / 60.0 * self.px_per_rev
+        dwell = self.roi_length / px_per_sec  # Время прохождения ROI, сек
+        interval = dwell / self.min_sightings
+        return max(1, min(self.max_stride, int(math.floor(interval * self.fps))))
+
+
+class ScheduledDetector:
+    """
+    Обёртка детектора: детекция только на кадрах, выбранных планировщиком.
+    На остальных кадрах detections остаётся None.
+    """
+
+    timing_stage = "detect"  # Этап в задержках кадра (FrameTiming)
+
+    def __init__(self, detector, scheduler):
+        self.detector = detector
+        self.scheduler = scheduler
+        self.batch_size = getattr(detector, "batch_size", 1)
+        self._since_detect = None
+        self.detected = 0
+        self.skipped = 0
+
+    @property
+    def method(self):
+        return getattr(self.detector, "method", type(self.detector).__name__)
+
+    def start(self):
+        if hasattr(self.detector, "start"):
+            self.detector.start()
+
+    def process(self, packets):
+        stride = self.scheduler.stride()
+        selected = []
+        for packet in packets:
+            self.scheduler.observe(packet.timestamp)
+            if self._since_detect is None or self._since_detect + 1 >= stride:
+                selected.append(packet)
+                self._since_detect = 0
+            else:
+                self._since_detect += 1
+            packet.meta["detect_stride"] = stride
+
+        if selected:
+            self.detector.process(selected)
+        self.detected += len(selected)
+        self.skipped += len(packets) - len(selected)
+
+    def stats(self):
+        stats = self.detector.stats() if hasattr(self.detector, "stats") else {}
+        stats.update(
+            {
+                "stride": self.scheduler.stride(),
+                "detected": self.detected,
+                "skipped": self.skipped,
+            }
+        )
+        return stats
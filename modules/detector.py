@@ -0,0 +1,159 @@
+# modules/detector.py
+"""
+Детекция деталей моделью YOLO (раздел yolo в config.yaml).
+
+Модель загружается один раз и прогревается в потоке стадии обработки,
+инференс выполняется на CPU. Если стадия отстаёт, накопившиеся кадры
+обрабатываются одним пакетным вызовом модели. Если задана ROI, в модель
+передаётся только вырезанная область кадра.
+"""
+
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from .roi import Roi
+from .utils import RateMeter
+
+logger = logging.getLogger(__name__)
+
+# Пустой результат детекции: [x1, y1, x2, y2, confidence, class_id]
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+class YoloDetector:
+    """
+    Обработчик стадии обработки: детекция YOLO для порции кадров.
+
+    Результат записывается в packet.detections в виде массива (N, 6):
+    x1, y1, x2, y2 (координаты кадра), уверенность, класс.
+    """
+
+    timing_stage = "detect"  # Этап в задержках кадра (FrameTiming)
+
+    def __init__(self, config):
+        """Инициализация параметров из раздела yolo."""
+        yolo_config = config.get("yolo", {})
+        self.model_path = yolo_config["model_path"]
+        self.confidence = yolo_config.get("confidence_threshold", 0.5)
+        self.target_class = yolo_config.get("target_class", 0)
+        self.imgsz = yolo_config.get("imgsz", 640)
+        self.device = yolo_config.get("device", "cpu")
+        self.batch_size = yolo_config.get("batch_size", 4)
+        self.stats_interval = yolo_config.get("stats_interval", 10.0)
+        self.roi = Roi.from_config(config)
+
+        self.model = None
+        self.frames_meter = RateMeter()
+        self.detections_meter = RateMeter()
+        self._last_stats_time = 0.0
+
+    def start(self):
+        """Загрузка и прогрев модели (вызывается в потоке стадии обработки)."""
+        if self.model is not None:
+            return
+        try:
+            from ultralytics import YOLO
+        except ImportError as e:
+            raise RuntimeError(
+                "Для детекции требуется пакет ultralytics (pip install -r requirements-yolo.txt)"
+            ) from e
+
+        started = time.perf_counter()
+        self.model = YOLO(self.model_path)
+        logger.info(f"Модель YOLO загружена: {self.model_path}")
+
+        # Прогрев: первый вызов инициализирует граф и выделяет память
+        if self.roi is not None:
+            dummy = np.zeros((self.roi.height, self.roi.width, 3), dtype=np.uint8)
+        else:
+            dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        self._predict([dummy])
+        logger.info(f"Модель YOLO прогрета за {time.perf_counter() - started:.2f} с")
+
+    def _predict(self, images):
+        """Один вызов модели для списка изображений."""
+        return self.model.predict(
+            images,
+            conf=self.confidence,
+            classes=[self.target_class],
+            imgsz=self.imgsz,
+            device=self.device,
+            verbose=False,
+        )
+
+    def detect(self, images):
+        """
+        Детекция на списке BGR-изображений одним вызовом модели.
+        Возвращает список массивов (N, 6) — по одному на изображение.
+        """
+        if not images:
+            return []
+
+        results = self._predict(images)
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                detections.append(EMPTY_DETECTIONS)
+                continue
+            detections.append(
+                np.column_stack(
+                    (
+                        boxes.xyxy.cpu().numpy(),
+                        boxes.conf.cpu().numpy(),
+                        boxes.cls.cpu().numpy(),
+                    )
+                ).astype(np.float32)
+            )
+        return detections
+
+    def process(self, packets):
+        """Детекция для порции пакетов конвейера (в пределах ROI, если она задана)."""
+        if self.roi is None:
+            images = [packet.frame for packet in packets]
+            offsets = [(0, 0)] * len(packets)
+        else:
+            images, offsets = zip(*(self.roi.crop(packet.frame, packet.scale) for packet in packets))
+
+        # Модели нужен 3-канальный вход: одноканальные кадры (gray/green/raw) расширяем
+        # только в пределах вырезанной области
+        images = [
+            cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+            for image in images
+        ]
+
+        detections = self.detect(images)
+        for packet, dets, offset in zip(packets, detections, offsets):
+            packet.detections = Roi.to_frame(dets, offset, packet.scale)
+
+        now = time.monotonic()
+        self.frames_meter.add(len(packets), now)
+        self.detections_meter.add(sum(len(d) for d in detections), now)
+        self._log_stats(now)
+
+    def _log_stats(self, now):
+        if now - self._last_stats_time < self.stats_interval:
+            return
+        self._last_stats_time = now
+        stats = self.stats()
+        logger.info(
+            f"Детекция: {stats['frames_per_sec']:.1f} кадр/с, "
+            f"{stats['detections_per_sec']:.1f} дет/с"
+        )
+
+    def stats(self):
+        """Производительность детекции."""
+        return {
+            "frames_per_sec": self.frames_meter.rate(),
+            "detections_per_sec": self.detections_meter.rate(),
+        }
+
+
+def create_detector(config):
+    """Создание детектора, если детекция включена в конфигурации (иначе None)."""
+    if not config.get("yolo", {}).get("enable_detection", False):
+        return None
+    return YoloDetector(config)
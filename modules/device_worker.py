@@ -0,0 +1,164 @@
+# modules/device_worker.py
+"""
+Асинхронное выполнение команд устройств (сервопривод, RP2040).
+
+На каждую шину — свой поток с очередью команд, поэтому медленный или
+зависший RS-485/UART не блокирует GUI и видео. Команды с одинаковым
+ключом объединения (coalesce_key), ещё не начавшие выполняться,
+заменяются последней: пять быстрых нажатий «скорость +» дают одну
+запись итоговой скорости. Результат каждой команды — concurrent.futures.Future.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceCommand:
+    """Команда в очереди: функция с аргументами и ожидающие её результата Future."""
+
+    __slots__ = ("name", "func", "args", "key", "futures", "submitted")
+
+    def __init__(self, name, func, args, key):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.key = key
+        self.futures = [Future()]
+        self.submitted = time.perf_counter()
+
+
+class CommandStats:
+    """Статистика выполнения команд одного типа."""
+
+    __slots__ = ("count", "coalesced", "errors", "total_ms", "max_ms", "last_ms", "wait_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.wait_ms = 0.0  # Суммарное ожидание в очереди
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "last_ms": self.last_ms,
+            "mean_wait_ms": self.wait_ms / self.count if self.count else 0.0,
+        }
+
+
+class DeviceWorker(threading.Thread):
+    """Поток выполнения команд одной шины."""
+
+    def __init__(self, name):
+        super().__init__(name=f"device-{name}", daemon=True)
+        self.bus_name = name
+        self._queue = deque()
+        self._pending = {}  # coalesce_key → DeviceCommand в очереди
+        self._cond = threading.Condition()
+        self._running = True
+        self._stats = {}
+
+    def submit(self, name, func, *args, coalesce_key=None, urgent=False):
+        """
+        Постановка команды в очередь. Возвращает Future с результатом func(*args).
+        coalesce_key — команды с тем же ключом, ещё не выполненные, заменяются этой.
+        urgent — команда ставится в начало очереди (например, останов).
+        """
+        with self._cond:
+            if not self._running:
+                future = Future()
+                future.set_exception(RuntimeError(f"Шина {self.bus_name} остановлена"))
+                return future
+
+            pending = self._pending.get(coalesce_key) if coalesce_key is not None else None
+            if pending is not None:
+                # Замена ещё не выполненной команды: ожидающие получат итоговый результат
+                pending.name, pending.func, pending.args = name, func, args
+                future = Future()
+                pending.futures.append(future)
+                self._stat(name).coalesced += 1
+                if urgent:
+                    self._queue.remove(pending)
+                    self._queue.appendleft(pending)
+                return future
+
+            command = DeviceCommand(name, func, args, coalesce_key)
+            if urgent:
+                self._queue.appendleft(command)
+            else:
+                self._queue.append(command)
+            if coalesce_key is not None:
+                self._pending[coalesce_key] = command
+            self._cond.notify()
+            return command.futures[0]
+
+    def run(self):
+        logger.debug(f"Поток шины {self.bus_name} запущен")
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                if not self._queue:
+                    break
+                command = self._queue.popleft()
+                if command.key is not None:
+                    self._pending.pop(command.key, None)
+            self._execute(command)
+        logger.debug(f"Поток шины {self.bus_name} остановлен")
+
+    def _execute(self, command):
+        started = time.perf_counter()
+        try:
+            result = command.func(*command.args)
+            error = None
+        except Exception as e:
+            logger.exception(f"Ошибка команды {command.name} ({self.bus_name})")
+            result, error = None, e
+        finished = time.perf_counter()
+
+        with self._cond:
+            stat = self._stat(command.name)
+            elapsed_ms = (finished - started) * 1000
+            stat.count += 1
+            stat.errors += error is not None
+            stat.total_ms += elapsed_ms
+            stat.max_ms = max(stat.max_ms, elapsed_ms)
+            stat.last_ms = elapsed_ms
+            stat.wait_ms += (started - command.submitted) * 1000
+
+        for future in command.futures:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _stat(self, name):
+        stat = self._stats.get(name)
+        if stat is None:
+            stat = self._stats[name] = CommandStats()
+        return stat
+
+    def stats(self):
+        """Статистика задержек по типам команд."""
+        with self._cond:
+            return {name: stat.as_dict() for name, stat in self._stats.items()}
+
+    def stop(self, timeout=3.0):
+        """Остановка: уже поставленные команды выполняются, новые не принимаются."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+        logger.info(f"Шина {self.bus_name}: {self.stats()}")
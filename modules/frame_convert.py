@@ -0,0 +1,112 @@
+# modules/frame_convert.py
+"""
+Преобразование сырых кадров сенсора (Mono8, BayerRG8) в кадры режима выхода.
+
+Используется камерой Hikrobot и воспроизведением записанных сырых кадров,
+поэтому не зависит от SDK: коды форматов — стандартные коды PFNC
+(совпадают с PixelType_Gvsp_* из SDK Hikrobot).
+"""
+
+import cv2
+import numpy as np
+
+PIXEL_MONO8 = 0x01080001
+PIXEL_BAYER_RG8 = 0x01080009
+
+PIXEL_FORMATS = {
+    "Mono8": PIXEL_MONO8,
+    "BayerRG8": PIXEL_BAYER_RG8,
+}
+
+# bgr — полный BGR, bgr_half — BGR половинного разрешения (биннинг Байера 2×2),
+# gray — одноканальная яркость, green — зелёная плоскость Байера (половинное
+# разрешение), raw — сырые данные сенсора без преобразования
+OUTPUT_MODES = ("bgr", "bgr_half", "gray", "green", "raw")
+
+
+class FrameConverter:
+    """
+    Преобразование сырых данных в кадр режима output_mode.
+    Результат пишется в выходной буфер аренды (lease.frame) либо,
+    если преобразование не нужно, кадром становится вид на сырые данные.
+    """
+
+    def __init__(self, pixel_format_name, output_mode):
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Неизвестный режим выхода: {output_mode}. Доступны: {list(OUTPUT_MODES)}")
+        self.pixel_format_name = pixel_format_name
+        self.output_mode = output_mode
+        self._scratch_buffers = {}
+
+    def output_shape(self, w, h):
+        """Форма выходного кадра для режима output_mode (None — кадром служит вид на raw)."""
+        mono = self.pixel_format_name == "Mono8"
+        if self.output_mode == "bgr":
+            return (h, w, 3)
+        if self.output_mode == "bgr_half":
+            return (h // 2, w // 2, 3)
+        if self.output_mode == "gray":
+            return None if mono else (h, w)
+        if self.output_mode == "green":
+            return None if mono else (h // 2, w // 2)
+        return None  # raw
+
+    def convert(self, raw, pixel_type, lease):
+        """Преобразование кадра raw (h, w). Возвращает False для неизвестного формата."""
+        if pixel_type == PIXEL_MONO8:
+            self._convert_mono(raw, lease)
+        elif pixel_type == PIXEL_BAYER_RG8:
+            self._convert_bayer(raw, lease)
+        else:
+            return False
+        return True
+
+    def _convert_mono(self, raw, lease):
+        """Mono8: серый и raw — без копирования, BGR — расширение каналов."""
+        if self.output_mode == "bgr":
+            cv2.cvtColor(raw, cv2.COLOR_GRAY2BGR, dst=lease.frame)
+            lease.scale = 1.0
+        elif self.output_mode == "bgr_half":
+            small = cv2.resize(
+                raw, (raw.shape[1] // 2, raw.shape[0] // 2),
+                dst=self._scratch("mono_half", (raw.shape[0] // 2, raw.shape[1] // 2)),
+                interpolation=cv2.INTER_AREA,
+            )
+            cv2.cvtColor(small, cv2.COLOR_GRAY2BGR, dst=lease.frame)
+            lease.scale = 0.5
+        else:  # gray / green / raw — у монохромной камеры это сам кадр
+            lease.frame = raw
+            lease.scale = 1.0
+
+    def _convert_bayer(self, raw, lease):
+        """BayerRG8 (RGGB): полная/половинная дебайеризация, яркость, зелёный канал или raw."""
+        if self.output_mode == "bgr":
+            cv2.cvtColor(raw, cv2.COLOR_BayerBG2BGR, dst=lease.frame)  # или BayerRG2BGR — зависит от камеры
+            lease.scale = 1.0
+        elif self.output_mode == "bgr_half":
+            # Биннинг 2×2: каждая ячейка RGGB даёт один BGR-пиксель
+            out = lease.frame
+            np.copyto(out[:, :, 2], raw[0::2, 0::2])
+            np.copyto(out[:, :, 0], raw[1::2, 1::2])
+            green = self._scratch("green_sum", out.shape[:2], np.uint16)
+            np.add(raw[0::2, 1::2], raw[1::2, 0::2], out=green, dtype=np.uint16)
+            np.right_shift(green, 1, out=green)
+            np.copyto(out[:, :, 1], green, casting="unsafe")
+            lease.scale = 0.5
+        elif self.output_mode == "gray":
+            cv2.cvtColor(raw, cv2.COLOR_BayerBG2GRAY, dst=lease.frame)
+            lease.scale = 1.0
+        elif self.output_mode == "green":
+            np.copyto(lease.frame, raw[0::2, 1::2])
+            lease.scale = 0.5
+        else:  # raw
+            lease.frame = raw
+            lease.scale = 1.0
+
+    def _scratch(self, name, shape, dtype=np.uint8):
+        """Рабочий буфер преобразования (выделяется один раз; преобразование — в одном потоке)."""
+        buf = self._scratch_buffers.get(name)
+        if buf is None or buf.shape != tuple(shape):
+            buf = np.empty(shape, dtype=dtype)
+            self._scratch_buffers[name] = buf
+        return buf
@@ -0,0 +1,263 @@
+# modules/frame_pool.py
+"""
+Пул заранее выделенных буферов кадров.
+
+Камера захватывает кадры в буферы пула вместо того, чтобы выделять
+новый массив на каждый кадр. Кадр выдаётся потребителю в виде аренды
+(FrameLease): пока аренда не возвращена, буфер не будет перезаписан.
+"""
+
+import ctypes
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .frame_timing import FrameTiming
+
+logger = logging.getLogger(__name__)
+
+
+class FrameLease:
+    """
+    Аренда одного буфера пула.
+
+    Атрибуты:
+    - raw: np.ndarray (uint8) — вид на «сырые» байты кадра из SDK
+    - frame: np.ndarray — кадр после преобразования (BGR, серый и т.п.)
+    - scale: масштаб кадра относительно сенсора (0.5 — половинное разрешение)
+    - frame_num: номер кадра от камеры (nFrameNum), если известен
+    - timestamp: время получения кадра хостом (time.monotonic)
+    - device_timestamp: метка времени камеры (если известна)
+    - info: (width, height, pixel_type, data_len) — параметры сырых данных
+    - timing: FrameTiming — отметки этапов обработки кадра
+
+    Аренду нужно вернуть вызовом release() (или через with).
+    """
+
+    __slots__ = (
+        "pool",
+        "index",
+        "buffer",
+        "raw",
+        "frame",
+        "scale",
+        "frame_num",
+        "timestamp",
+        "device_timestamp",
+        "info",
+        "timing",
+        "_released",
+    )
+
+    def __init__(self, pool=None, index=-1, buffer=None, raw=None, frame=None, timing=None):
+        self.pool = pool
+        self.index = index
+        self.buffer = buffer
+        self.raw = raw
+        self.frame = frame
+        self.scale = 1.0
+        self.frame_num = 0
+        self.timestamp = 0.0
+        self.device_timestamp = 0
+        self.info = None
+        self.timing = timing if timing is not None else FrameTiming()
+        self._released = False
+
+    @classmethod
+    def unpooled(cls, frame, frame_num=0, timestamp=None):
+        """Аренда-обёртка для кадра, не принадлежащего пулу (release ничего не делает)."""
+        lease = cls(frame=frame)
+        lease.frame_num = frame_num
+        lease.timestamp = time.monotonic() if timestamp is None else timestamp
+        return lease
+
+    @property
+    def age(self):
+        """Возраст кадра в секундах относительно момента получения."""
+        return time.monotonic() - self.timestamp
+
+    @property
+    def released(self):
+        return self._released
+
+    def release(self):
+        """Возврат буфера в пул. Повторный вызов безопасен."""
+        if self._released:
+            return
+        self._released = True
+        if self.pool is not None:
+            self.pool._give_back(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FramePool:
+    """
+    Пул из count буферов фиксированного размера.
+
+    Каждый слот содержит:
+    - ctypes-буфер raw_size байт, в который SDK пишет кадр
+      (raw_size=0 — сырые данные хранятся вне пула, например в mmap файла)
+    - выходной массив frame_shape, в который выполняется преобразование цвета
+      (frame_shape=None — выходной буфер не нужен, кадром служит вид на raw)
+
+    В установившемся режиме захват не выделяет память: буферы только
+    арендуются и возвращаются.
+    """
+
+    def __init__(self, count, raw_size, frame_shape, frame_dtype=np.uint8):
+        if count < 1:
+            raise ValueError(f"Размер пула должен быть >= 1, получено {count}")
+
+        self.count = count
+        self.raw_size = raw_size
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+
+        if raw_size:
+            self._buffers = [(ctypes.c_ubyte * raw_size)() for _ in range(count)]
+            self._raw = [np.frombuffer(buf, dtype=np.uint8) for buf in self._buffers]
+        else:
+            self._buffers = self._raw = [None] * count
+        if self.frame_shape is not None:
+            self._frames = [np.empty(self.frame_shape, dtype=frame_dtype) for _ in range(count)]
+        else:
+            self._frames = [None] * count
+
+        self._timings = [FrameTiming() for _ in range(count)]
+        self._free = deque(range(count))
+        self._cond = threading.Condition()
+
+        self.exhausted = 0  # Сколько раз пул оказался пуст при запросе
+
+        logger.debug(
+            f"Пул кадров: {count} x {raw_size} байт, выход {self.frame_shape}"
+        )
+
+    @classmethod
+    def for_format(cls, count, width, height, pixel_format, frame_shape, payload_size=0):
+        """
+        Создание пула по ширине/высоте/формату пикселей из конфигурации.
+        frame_shape — форма выходного кадра (None — без выходного буфера).
+        payload_size — размер полезной нагрузки, сообщённый камерой (если больше расчётного).
+        """
+        bytes_per_pixel = {"Mono8": 1, "BayerRG8": 1}.get(pixel_format)
+        if bytes_per_pixel is None:
+            raise ValueError(f"Неизвестный формат пикселей для пула: {pixel_format}")
+        raw_size = max(width * height * bytes_per_pixel, payload_size)
+        return cls(count, raw_size, frame_shape)
+
+    def acquire(self, timeout=None):
+        """
+        Аренда свободного буфера.
+        timeout=None — ждать бесконечно, 0 — не ждать.
+        Возвращает FrameLease или None, если свободных буферов нет.
+        """
+        with self._cond:
+            if not self._free:
+                self.exhausted += 1
+                if timeout == 0 or not self._cond.wait_for(lambda: self._free, timeout):
+                    return None
+            index = self._free.popleft()
+
+        timing = self._timings[index]
+        timing.reset()
+        return FrameLease(
+            pool=self,
+            index=index,
+            buffer=self._buffers[index],
+            raw=self._raw[index],
+            frame=self._frames[index],
+            timing=timing,
+        )
+
+    def _give_back(self, index):
+        with self._cond:
+            self._free.append(index)
+            self._cond.notify()
+
+    @property
+    def available(self):
+        """Количество свободных буферов."""
+        with self._cond:
+            return len(self._free)
+
+
+class FrameRing:
+    """
+    Ограниченное кольцо аренд с вытеснением самых старых кадров.
+
+    Производитель (callback SDK) кладёт кадры через push(), потребитель
+    забирает только самый свежий через get_latest(); всё, что старше,
+    возвращается в пул и учитывается как отброшенное.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError(f"Размер кольца должен быть >= 1, получено {capacity}")
+        self.capacity = capacity
+        self._items = deque()
+        self._cond = threading.Condition()
+
+        self.pushed = 0  # Всего принято кадров
+        self.dropped = 0  # Вытеснено или пропущено кадров
+
+    def push(self, lease):
+        """Добавление кадра; при переполнении вытесняется самый старый."""
+        evicted = None
+        with self._cond:
+            if len(self._items) >= self.capacity:
+                evicted = self._items.popleft()
+                self.dropped += 1
+            self._items.append(lease)
+            self.pushed += 1
+            self._cond.notify()
+        if evicted is not None:
+            evicted.release()
+
+    def steal_oldest(self):
+        """
+        Изъятие самого старого кадра для повторного использования его буфера
+        (когда пул пуст). Кадр считается отброшенным.
+        """
+        with self._cond:
+            if not self._items:
+                return None
+            self.dropped += 1
+            return self._items.popleft()
+
+    def skip(self):
+        """Учёт кадра, пропущенного производителем (нет свободного буфера)."""
+        with self._cond:
+            self.dropped += 1
+
+    def get_latest(self, timeout=None):
+        """Самый свежий кадр (или None по таймауту); более старые отбрасываются."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            latest = self._items.pop()
+            stale = list(self._items)
+            self._items.clear()
+            self.dropped += len(stale)
+        for lease in stale:
+            lease.release()
+        return latest
+
+    def clear(self):
+        """Возврат всех кадров кольца в пул."""
+        with self._cond:
+            stale = list(self._items)
+            self._items.clear()
+        for lease in stale:
+            lease.release()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
@@ -0,0 +1,236 @@
+# modules/frame_timing.py
+"""
+Задержки кадра по этапам: запись времени на кадре и скользящие гистограммы.
+
+Каждая аренда кадра несёт FrameTiming — отметки начала и конца этапов
+(время perf_counter). Этапы:
+- sensor: экспозиция → получение хостом (по метке времени камеры)
+- grab: получение хостом → начало преобразования (ожидание в кольце SDK)
+- demosaic: преобразование сырых данных (дебайеризация)
+- detect, count: детекция и подсчёт на стадии обработки
+- render: уменьшение и наложение служебной информации для экрана
+- paint: передача изображения в GUI и вывод на экран
+Кроме длительностей этапов учитывается возраст кадра (от получения
+хостом) в момент подсчёта (counted) и вывода на экран (displayed);
+разница с суммой этапов — ожидание в очередях.
+
+FrameTimingStats собирает длительности в гистограммы с логарифмическими
+интервалами за скользящее окно. Каждую гистограмму пишет только один
+поток (захват/обработка — поток обработки, render — поток видео,
+paint — GUI), поэтому запись и чтение идут без блокировок: читатель
+может увидеть слот в момент обнуления, что для статистики допустимо.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("sensor", "grab", "demosaic", "detect", "count", "render", "paint")
+AGES = ("counted", "displayed")  # Возраст кадра в момент подсчёта и вывода на экран
+SERIES = STAGES + AGES
+
+_STAGE_INDEX = {stage: i for i, stage in enumerate(STAGES)}
+_EMPTY_MARKS = [0.0] * (2 * len(STAGES))
+
+
+class FrameTiming:
+    """
+    Отметки этапов одного кадра (секунды perf_counter, 0.0 — этапа не было).
+    received — момент получения кадра хостом, от него считается возраст.
+    """
+
+    __slots__ = ("received", "marks")
+
+    def __init__(self):
+        self.received = 0.0
+        self.marks = list(_EMPTY_MARKS)
+
+    def reset(self):
+        """Очистка для повторного использования (буфер пула выдан заново)."""
+        self.received = 0.0
+        self.marks[:] = _EMPTY_MARKS
+
+    def mark(self, stage, started, finished=None):
+        """Отметка этапа: начало и конец (по умолчанию — сейчас)."""
+        i = 2 * _STAGE_INDEX[stage]
+        self.marks[i] = started
+        self.marks[i + 1] = time.perf_counter() if finished is None else finished
+
+    def duration_ms(self, stage):
+        """Длительность этапа (мс) или None, если этапа не было."""
+        i = 2 * _STAGE_INDEX[stage]
+        started, finished = self.marks[i], self.marks[i + 1]
+        if not finished:
+            return None
+        return (finished - started) * 1000
+
+    def finished(self, stage):
+        """Момент окончания этапа (0.0 — этапа не было)."""
+        return self.marks[2 * _STAGE_INDEX[stage] + 1]
+
+    def age_ms(self, at=None):
+        """Возраст кадра (мс) в момент at (по умолчанию — сейчас)."""
+        if not self.received:
+            return None
+        return ((time.perf_counter() if at is None else at) - self.received) * 1000
+
+
+class DeviceClock:
+    """
+    Сопоставление метки времени камеры со временем хоста.
+
+    Смещение между часами — минимальная разница (хост − камера) по всем
+    кадрам, медленно растущая на допуск дрейфа часов. Задержка sensor —
+    превышение над самым быстрым кадром: постоянная часть передачи
+    (экспозиция, считывание сенсора) в неё не входит, зато видны
+    задержки USB, драйвера и SDK.
+    """
+
+    def __init__(self, tick_ns=1.0, drift_ppm=100.0):
+        self.tick = tick_ns * 1e-9
+        self.drift = drift_ppm * 1e-6
+        self._offset = None
+        self._updated = 0.0
+
+    def transit(self, device_timestamp, host_time):
+        """Момент кадра по часам хоста (или None без метки времени камеры)."""
+        if not device_timestamp:
+            return None
+        device_time = device_timestamp * self.tick
+        offset = host_time - device_time
+        if self._offset is None:
+            self._offset = offset
+        else:
+            # Допуск дрейфа: оценка может расти, но не быстрее drift
+            self._offset = min(offset, self._offset + self.drift * max(0.0, host_time - self._updated))
+        self._updated = host_time
+        return device_time + self._offset
+
+
+class RollingHistogram:
+    """
+    Гистограмма задержек (мс) за скользящее окно.
+
+    Логарифмические интервалы от min_ms до max_ms (bins_per_decade на
+    декаду); окно разбито на slots слотов, устаревший слот обнуляется
+    при первой записи в него. Писать может только один поток.
+    """
+
+    def __init__(self, window=10.0, slots=10, min_ms=0.01, max_ms=100000.0, bins_per_decade=20):
+        self.slot_seconds = window / slots
+        self.min_ms = min_ms
+        self.bins_per_decade = bins_per_decade
+        self.bin_count = int(math.ceil(math.log10(max_ms / min_ms) * bins_per_decade)) + 1
+        self.counts = np.zeros((slots, self.bin_count), dtype=np.int64)
+        self.epochs = np.full(slots, -1, dtype=np.int64)
+        # Верхние границы интервалов: значение процентиля — граница его интервала
+        self.edges = min_ms * 10.0 ** (np.arange(1, self.bin_count + 1) / bins_per_decade)
+        self.total = 0
+
+    def add(self, value_ms, now=None):
+        epoch = int((time.monotonic() if now is None else now) / self.slot_seconds)
+        slot = epoch % len(self.epochs)
+        if self.epochs[slot] != epoch:
+            self.counts[slot] = 0
+            self.epochs[slot] = epoch
+        if value_ms <= self.min_ms:
+            index = 0
+        else:
+            index = min(self.bin_count - 1, int(math.log10(value_ms / self.min_ms) * self.bins_per_decade))
+        self.counts[slot, index] += 1
+        self.total += 1
+
+    def window_counts(self, now=None):
+        """Сумма интервалов по слотам текущего окна."""
+        epoch = int((time.monotonic() if now is None else now) / self.slot_seconds)
+        valid = self.epochs > epoch - len(self.epochs)
+        return self.counts[valid].sum(axis=0)
+
+    def percentiles(self, quantiles=(50, 95, 99), now=None):
+        """{"p50": ..., "count": n} за окно (None, если данных нет)."""
+        counts = self.window_counts(now)
+        n = int(counts.sum())
+        if not n:
+            return None
+        cumulative = np.cumsum(counts)
+        result = {}
+        for q in quantiles:
+            index = int(np.searchsorted(cumulative, n * q / 100.0))
+            result[f"p{q}"] = float(self.edges[min(index, self.bin_count - 1)])
+        result["count"] = n
+        return result
+
+
+class FrameTimingStats:
+    """Гистограммы задержек по этапам и возрасту кадра (раздел timing)."""
+
+    def __init__(self, config):
+        timing_config = config.get("timing", {})
+        self.window = timing_config.get("window", 10.0)
+        self.dump_dir = timing_config.get("dump_dir", "timing")
+        self.histograms = {
+            name: RollingHistogram(window=self.window, slots=timing_config.get("slots", 10))
+            for name in SERIES
+        }
+
+    def record(self, timing, stages):
+        """Длительности указанных этапов кадра (вызывается потоком-владельцем этих этапов)."""
+        for stage in stages:
+            duration = timing.duration_ms(stage)
+            if duration is not None:
+                self.histograms[stage].add(duration)
+
+    def record_age(self, name, timing, at=None):
+        """Возраст кадра в момент at для ряда counted/displayed."""
+        age = timing.age_ms(at)
+        if age is not None:
+            self.histograms[name].add(age)
+
+    def summary(self):
+        """{ряд: {p50, p95, p99, count}} за окно; ряды без данных пропускаются."""
+        now = time.monotonic()
+        result = {}
+        for name, histogram in self.histograms.items():
+            values = histogram.percentiles(now=now)
+            if values is not None:
+                result[name] = values
+        return result
+
+    def dump(self, path=None):
+        """Сохранение процентилей и интервалов гистограмм в JSON. Возвращает путь."""
+        if path is None:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, f"timing_{datetime.now():%Y%m%d_%H%M%S}.json")
+        now = time.monotonic()
+        histograms = {}
+        for name, histogram in self.histograms.items():
+            counts = histogram.window_counts(now)
+            nonzero = np.flatnonzero(counts)
+            histograms[name] = {
+                "total": histogram.total,
+                "bins": [[float(histogram.edges[i]), int(counts[i])] for i in nonzero],
+            }
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "window_s": self.window,
+            "summary": self.summary(),
+            "histograms": histograms,  # [верхняя граница интервала (мс), кадров]
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Задержки кадров сохранены: {path}")
+        return path
+
+
+def create_timing_stats(config):
+    """FrameTimingStats, если учёт задержек включён (иначе None)."""
+    if not config.get("timing", {}).get("enable", True):
+        return None
+    return FrameTimingStats(config)
@@ -0,0 +1,413 @@
+# modules/headless.py
+"""
+Режим без GUI: камера, детекция/подсчёт, сервопривод и RP2040 без PySide6.
+
+Состав обработки тот же, что в GUI (build_processors), кадры после
+обработки сразу возвращаются в пул — изображение для экрана не готовится.
+Управление:
+- сигналы: SIGINT/SIGTERM — остановка, SIGUSR1 — статистика в лог,
+  SIGUSR2 — сохранение гистограмм задержек (где сигналы есть)
+- командная строка: команды при запуске (--exec) и отправка команд
+  работающему экземпляру (python main.py --send stop)
+- локальный сокет (раздел headless.socket): строка команды → строка JSON
+- стандартный ввод, если это терминал
+Команды: forward, reverse, stop, speed N, faster, slower, vib_on [F D],
+vib_off, auto_speed [on|off], reset, record, dump_timing, stats, quit.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from .belt_control import DensityMeter, create_belt_controller
+from .counter import PartCounter
+from .device_worker import DeviceWorker
+from .modbus_control import JOG_STEP, ServoController
+from .pipeline import FramePipeline
+from .processing import build_processors, find_processor
+from .recorder import FrameRecorder
+from .servo_telemetry import create_servo_telemetry
+from .vibro_control import create_feed_controller
+
+logger = logging.getLogger(__name__)
+
+
+def parse_address(address):
+    """Адрес сокета: "host:port" → (AF_INET, (host, port)), путь → (AF_UNIX, путь)."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def send_command(address, command, timeout=5.0):
+    """Отправка команды работающему экземпляру; возвращает ответ (dict)."""
+    family, target = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.sendall(command.encode("utf-8") + b"\n")
+        reply = sock.makefile("r", encoding="utf-8").readline()
+    return json.loads(reply) if reply else {"ok": False, "error": "нет ответа"}
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    """Соединение управляющего сокета: построчно команда → ответ JSON."""
+
+    def handle(self):
+        for line in self.rfile:
+            command = line.decode("utf-8", errors="replace").strip()
+            if not command:
+                continue
+            reply = self.server.app.execute(command)
+            self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+else:  # Windows
+    _UnixServer = None
+
+
+class HeadlessApp:
+    """Связывание конвейера кадров и устройств без GUI (аналог MainWindow)."""
+
+    def __init__(self, config, camera, servo, rp2040):
+        self.config = config
+        self.camera = camera
+        self.servo = servo if servo and servo.connected else None
+        self.rp2040 = rp2040 if rp2040 and rp2040.connected else None
+
+        head_config = config.get("headless", {})
+        self.stats_interval = head_config.get("stats_interval", 10.0)
+        self.socket_address = head_config.get("socket")
+        self.console = head_config.get("console", True)
+        self.stop_when_finished = head_config.get("stop_when_finished", True)
+
+        self.telemetry = None
+        self.processors = build_processors(config, self._belt_speed)
+        self.counter = find_processor(self.processors, PartCounter)
+        self.recorder = find_processor(self.processors, FrameRecorder)
+        self.pipeline = FramePipeline(camera, config, processors=self.processors)
+
+        self.servo_worker = DeviceWorker("modbus")
+        self.rp2040_worker = DeviceWorker("uart")
+        self.feed_controller = None
+        self.belt_controller = None
+        self._speed_target = None
+        self._server = None
+        self._stop_event = threading.Event()
+        self._started = 0.0
+
+        self.commands = {
+            "forward": self._cmd_forward,
+            "reverse": self._cmd_reverse,
+            "stop": self._cmd_stop,
+            "speed": self._cmd_speed,
+            "faster": lambda: self._change_speed(JOG_STEP),
+            "slower": lambda: self._change_speed(-JOG_STEP),
+            "vib_on": self._cmd_vib_on,
+            "vib_off": self._cmd_vib_off,
+            "auto_speed": self._cmd_auto_speed,
+            "reset": self._cmd_reset,
+            "record": self._cmd_record,
+            "dump_timing": self._cmd_dump_timing,
+            "stats": self.stats,
+            "quit": self._cmd_quit,
+        }
+
+    def _belt_speed(self):
+        """Текущая скорость ленты (об/мин), 0 — лента стоит."""
+        snapshot = self.telemetry.snapshot if self.telemetry else None
+        if snapshot is not None and snapshot.connected:
+            return abs(snapshot.speed)
+        if self.servo and self.servo.current_direction:
+            return self.servo.current_speed
+        return 0
+
+    # --- Запуск и остановка ---
+
+    def start(self):
+        self._started = time.monotonic()
+        self.servo_worker.start()
+        self.rp2040_worker.start()
+        self.telemetry = create_servo_telemetry(self.config, self.servo)
+        if self.telemetry and self.recorder:
+            self.telemetry.add_fault_listener(
+                lambda snapshot: self.recorder.trigger(f"fault{snapshot.error_code}")
+            )
+        self.feed_controller = create_feed_controller(
+            self.config,
+            self.counter,
+            self.rp2040,
+            lambda name, func, *args: self.rp2040_worker.submit(name, func, *args, coalesce_key="vibro_duty"),
+        )
+        self.belt_controller = create_belt_controller(
+            self.config,
+            find_processor(self.processors, DensityMeter),
+            self.servo,
+            lambda name, func, *args: self.servo_worker.submit(name, func, *args, coalesce_key="speed"),
+        )
+        self.pipeline.start()
+        self._install_signals()
+        self._start_socket()
+        if self.console and sys.stdin is not None and sys.stdin.isatty():
+            threading.Thread(target=self._console_loop, name="headless-console", daemon=True).start()
+        logger.info("Режим без GUI запущен")
+
+    def run(self):
+        """Основной цикл: кадры после обработки возвращаются в пул, статистика — в лог."""
+        next_stats = time.monotonic() + self.stats_interval
+        while not self._stop_event.is_set():
+            packet = self.pipeline.output.get(timeout=0.2)
+            if packet is not None:
+                packet.release()
+            elif (
+                self.stop_when_finished
+                and getattr(self.camera, "finished", False)
+                and not len(self.pipeline.process_queue)
+            ):
+                logger.info("Источник кадров исчерпан")
+                self._stop_event.set()
+                break
+            if self.stats_interval and time.monotonic() >= next_stats:
+                next_stats += self.stats_interval
+                self.log_stats()
+        self.log_stats()
+
+    def stop(self):
+        """Остановка в порядке MainWindow.closeEvent: конвейер, регуляторы, шины, порты."""
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            family, target = parse_address(self.socket_address)
+            if family == socket.AF_UNIX and os.path.exists(target):
+                os.unlink(target)
+        self.pipeline.stop()
+        for controller in (self.telemetry, self.feed_controller, self.belt_controller):
+            if controller:
+                controller.stop()
+        self.servo_worker.stop()
+        self.rp2040_worker.stop()
+        if self.servo:
+            self.servo.close()
+        if self.rp2040:
+            self.rp2040.close()
+        logger.info("Режим без GUI остановлен")
+
+    @property
+    def stopped(self):
+        """Остановка запрошена (сигнал, команда quit или исчерпан источник)."""
+        return self._stop_event.is_set()
+
+    def _install_signals(self):
+        """Обработчики сигналов (только из главного потока)."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for name in ("SIGINT", "SIGTERM"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), lambda signum, frame: self._stop_event.set())
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.log_stats())
+        if hasattr(signal, "SIGUSR2"):
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self._cmd_dump_timing())
+
+    def _start_socket(self):
+        if not self.socket_address:
+            return
+        family, target = parse_address(self.socket_address)
+        try:
+            if family == socket.AF_UNIX:
+                if _UnixServer is None:
+                    raise OSError("unix-сокеты недоступны, укажите host:port")
+                if os.path.exists(target):
+                    os.unlink(target)
+                self._server = _UnixServer(target, _CommandHandler)
+            else:
+                self._server = _TcpServer(target, _CommandHandler)
+        except OSError as e:
+            logger.error(f"Управляющий сокет {self.socket_address} не открыт: {e}")
+            return
+        self._server.app = self
+        threading.Thread(target=self._server.serve_forever, name="headless-socket", daemon=True).start()
+        logger.info(f"Управляющий сокет: {self.socket_address}")
+
+    def _console_loop(self):
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            print(json.dumps(self.execute(line), ensure_ascii=False), flush=True)
+            if self._stop_event.is_set():
+                break
+
+    # --- Команды ---
+
+    def execute(self, line):
+        """Выполнение строки команды. Возвращает {"ok": ..., ...} для ответа."""
+        name, *args = line.split()
+        handler = self.commands.get(name.lower())
+        if handler is None:
+            return {"ok": False, "error": f"неизвестная команда: {name}", "commands": sorted(self.commands)}
+        try:
+            result = handler(*args)
+        except TypeError:
+            return {"ok": False, "error": f"неверные аргументы команды {name}: {args}"}
+        except Exception as e:
+            logger.exception(f"Ошибка команды {line.strip()}")
+            return {"ok": False, "error": str(e)}
+        logger.info(f"Команда: {line.strip()}")
+        if isinstance(result, dict):
+            return {"ok": True, **result}
+        return {"ok": result is not False}
+
+    def _servo_command(self, name, *args, coalesce_key="jog", urgent=False):
+        """Метод name сервопривода — в очередь шины Modbus."""
+        if self.servo is None:
+            raise RuntimeError("сервопривод не подключён")
+        func = getattr(self.servo, name)
+        self.servo_worker.submit(name, func, *args, coalesce_key=coalesce_key, urgent=urgent)
+
+    def _rp2040_command(self, name, *args):
+        """Метод name RP2040 — в очередь шины UART."""
+        if self.rp2040 is None:
+            raise RuntimeError("RP2040 не подключён")
+        self.rp2040_worker.submit(name, getattr(self.rp2040, name), *args, coalesce_key="vibro")
+
+    def _cmd_forward(self):
+        self._servo_command("jog_forward")
+
+    def _cmd_reverse(self):
+        self._servo_command("jog_reverse")
+
+    def _cmd_stop(self):
+        # Останов вытесняет ещё не выполненные команды направления и идёт первым
+        self._servo_command("stop", urgent=True)
+
+    def _cmd_speed(self, value):
+        self._set_speed(int(value))
+
+    def _change_speed(self, delta):
+        if self.servo is None:
+            raise RuntimeError("сервопривод не подключён")
+        base = self._speed_target if self._speed_target is not None else self.servo.current_speed
+        self._set_speed(base + delta)
+
+    def _set_speed(self, speed):
+        if self.belt_controller:
+            # Ручное изменение скорости отключает автоматический режим
+            self.belt_controller.set_enabled(False)
+        self._speed_target = max(ServoController.MIN_SPEED, min(ServoController.MAX_SPEED, speed))
+        self._servo_command("set_speed", self._speed_target, coalesce_key="speed")
+        return {"speed": self._speed_target}
+
+    def _cmd_vib_on(self, freq=None, duty=None):
+        args = (int(freq), int(duty)) if freq is not None and duty is not None else ()
+        self._rp2040_command("vib_on", *args)
+
+    def _cmd_vib_off(self):
+        self._rp2040_command("vib_off")
+
+    def _cmd_auto_speed(self, state=None):
+        if self.belt_controller is None:
+            raise RuntimeError("автоматическая скорость ленты не запущена")
+        enabled = not self.belt_controller.enabled if state is None else state.lower() in ("on", "1", "true")
+        self._speed_target = None
+        self.belt_controller.set_enabled(enabled)
+        return {"auto_speed": enabled}
+
+    def _cmd_reset(self):
+        if self.counter is None:
+            raise RuntimeError("подсчёт отключён")
+        self.counter.reset()
+
+    def _cmd_record(self):
+        if self.recorder is None:
+            raise RuntimeError("запись отключена (recorder.enable)")
+        self.recorder.trigger("manual")
+
+    def _cmd_dump_timing(self):
+        if self.pipeline.timing is None:
+            raise RuntimeError("учёт задержек отключён (timing.enable)")
+        return {"path": self.pipeline.timing.dump()}
+
+    def _cmd_quit(self):
+        self._stop_event.set()
+
+    # --- Статистика ---
+
+    def stats(self):
+        """Сводка состояния для команды stats и периодического лога."""
+        pipe_stats = self.pipeline.stats()
+        stats = {
+            "uptime_s": round(time.monotonic() - self._started, 1),
+            "capture_fps": round(self.pipeline.capture.fps(), 1),
+            "capture_alive": pipe_stats["capture"]["alive"],
+            "camera_ready": pipe_stats["capture"]["camera_ready"],
+            "camera_error": pipe_stats["capture"]["camera_error"],
+            "process_alive": pipe_stats["process"]["alive"],
+            "processed": pipe_stats["process"]["processed"],
+            "dropped": {
+                "capture": pipe_stats["capture"]["dropped"],
+                "process": pipe_stats["process"]["dropped"],
+            },
+        }
+        if self.counter is not None:
+            stats["count"] = self.counter.count
+            stats["parts_per_min"] = round(self.counter.rate_per_minute(), 1)
+        if self.telemetry is not None:
+            snapshot = self.telemetry.snapshot
+            stats["servo"] = {
+                "connected": snapshot.connected,
+                "speed": snapshot.speed,
+                "load": snapshot.load,
+                "error_code": snapshot.error_code,
+            }
+        if self.pipeline.timing is not None:
+            stats["latency_p95_ms"] = {
+                name: round(values["p95"], 1) for name, values in self.pipeline.timing.summary().items()
+            }
+        return stats
+
+    def log_stats(self):
+        stats = self.stats()
+        text = (
+            f"Кадров: {stats['processed']} ({stats['capture_fps']} кадр/с), "
+            f"отброшено {stats['dropped']['capture']}/{stats['dropped']['process']}"
+        )
+        if "count" in stats:
+            text = f"Детали: {stats['count']} ({stats['parts_per_min']} шт/мин). " + text
+        if "latency_p95_ms" in stats:
+            text += f". Задержки p95, мс: {stats['latency_p95_ms']}"
+        logger.info(text)
+
+
+def run_headless(config, camera, servo, rp2040, startup_commands=()):
+    """Запуск режима без GUI до сигнала остановки или команды quit. Возвращает код выхода."""
+    app = HeadlessApp(config, camera, servo, rp2040)
+    app.start()
+    try:
+        for command in list(config.get("headless", {}).get("startup", [])) + list(startup_commands):
+            reply = app.execute(command)
+            if not reply["ok"]:
+                logger.warning(f"Команда при запуске '{command}': {reply.get('error')}")
+        app.run()
+    finally:
+        app.stop()
+    return 0
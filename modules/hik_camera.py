@@ -7,12 +7,13 @@
 import logging
 import time
 import ctypes
-import numpy as np
-import cv2
 
 from .MvCameraControl_class import *
 from .PixelType_header import PixelType_Gvsp_Mono8, PixelType_Gvsp_BayerRG8
 from .MvErrorDefine_const import MV_OK, MV_E_GC_TIMEOUT
+from .frame_convert import OUTPUT_MODES, FrameConverter
+from .frame_pool import FramePool, FrameRing
+from .frame_timing import DeviceClock
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,10 @@ class HikCamera:
     - открытие/закрытие камеры
     - настройка разрешения и формата пикселей
     - захват кадров в отдельном потоке
-    - расчёт и отображение FPS на кадре
+    - захват в пул заранее выделенных буферов (без выделения памяти на кадр)
+    - режим callback: SDK сам передаёт кадры, потребитель берёт самый свежий
+    - режимы выхода: полный/половинный BGR, серый, зелёная плоскость, raw
+    - расчёт FPS захвата
     """
 
     SUPPORTED_FORMATS = {
@@ -33,12 +37,31 @@ class HikCamera:
         "BayerRG8": PixelType_Gvsp_BayerRG8,
     }
 
+    ACQUISITION_MODES = ("poll", "callback")
+
+    # Режимы выхода: см. modules/frame_convert.py
+    OUTPUT_MODES = OUTPUT_MODES
+
     def __init__(self, config):
         """Инициализация параметров камеры из конфигурации."""
         self.cam = None
         self.width = config["hikrobot_cam"]["width"]
         self.height = config["hikrobot_cam"]["height"]
         self.pixel_format_name = config["hikrobot_cam"]["pixel_format"]
+        self.buffer_count = config["hikrobot_cam"].get("buffer_count", 4)
+        self.acquisition = config["hikrobot_cam"].get("acquisition", "poll")
+        self.ring_size = config["hikrobot_cam"].get("ring_size", 2)
+        self.output_mode = config["hikrobot_cam"].get("output_mode", "bgr")
+        self.device_index = config["hikrobot_cam"].get("device_index", 0)
+        # Цена тика nDevTimeStamp: задержка sensor в учёте задержек кадра
+        self.device_clock = DeviceClock(config["hikrobot_cam"].get("timestamp_tick_ns", 1))
+
+        self.pool = None  # Пул буферов, создаётся в start()
+        # Кольцо свежих кадров (режим callback): одно на всё время жизни камеры,
+        # чтобы счётчик отброшенных кадров не обнулялся при перезапуске захвата
+        self.ring = FrameRing(self.ring_size) if self.acquisition == "callback" else None
+        self._last_lease = None  # Аренда кадра, выданного через read()
+        self._callback = None  # Ссылка на ctypes-callback (защита от сборщика мусора)
 
         self.running = False
         self.last_frame_time = 0.0
@@ -53,6 +76,23 @@ class HikCamera:
             )
         self.pixel_format_value = self.SUPPORTED_FORMATS[self.pixel_format_name]
 
+        if self.acquisition not in self.ACQUISITION_MODES:
+            raise ValueError(
+                f"Неизвестный режим захвата: {self.acquisition}. "
+                f"Доступны: {list(self.ACQUISITION_MODES)}"
+            )
+        if self.output_mode not in self.OUTPUT_MODES:
+            raise ValueError(
+                f"Неизвестный режим выхода: {self.output_mode}. "
+                f"Доступны: {list(self.OUTPUT_MODES)}"
+            )
+        if self.acquisition == "callback" and self.buffer_count <= self.ring_size:
+            raise ValueError(
+                f"В режиме callback buffer_count ({self.buffer_count}) "
+                f"должен быть больше ring_size ({self.ring_size})"
+            )
+        self.converter = FrameConverter(self.pixel_format_name, self.output_mode)
+
     def open(self):
         """Открытие камеры и применение базовых настроек."""
         try:
@@ -62,10 +102,14 @@ class HikCamera:
 
             if ret != MV_OK or device_list.nDeviceNum == 0:
                 raise RuntimeError(f"Не найдено USB3-камер Hikrobot (ret = {ret:#x})")
+            if self.device_index >= device_list.nDeviceNum:
+                raise RuntimeError(
+                    f"Камера Hikrobot №{self.device_index} не найдена (найдено: {device_list.nDeviceNum})"
+                )
 
-            # Используем первую найденную камеру
+            # Камера с номером device_index в порядке перечисления (по умолчанию первая)
             dev_info = ctypes.cast(
-                device_list.pDeviceInfo[0], ctypes.POINTER(MV_CC_DEVICE_INFO)
+                device_list.pDeviceInfo[self.device_index], ctypes.POINTER(MV_CC_DEVICE_INFO)
             ).contents
             ret = self.cam.MV_CC_CreateHandle(dev_info)
             if ret != MV_OK:
@@ -105,62 +149,208 @@ class HikCamera:
             )
             raise RuntimeError(f"Установка PixelFormat провалилась (ret = {ret:#x})")
 
+    def _payload_size(self):
+        """Размер полезной нагрузки кадра по данным камеры (0, если не удалось узнать)."""
+        st_param = MVCC_INTVALUE()
+        ret = self.cam.MV_CC_GetIntValue("PayloadSize", st_param)
+        if ret != MV_OK:
+            logger.warning(f"Не удалось прочитать PayloadSize (ret = {ret:#x})")
+            return 0
+        return st_param.nCurValue
+
+    def _create_pool(self):
+        """Создание пула буферов под текущие разрешение и формат."""
+        self.pool = FramePool.for_format(
+            self.buffer_count,
+            self.width,
+            self.height,
+            self.pixel_format_name,
+            frame_shape=self._output_shape(self.width, self.height),
+            payload_size=self._payload_size(),
+        )
+        logger.info(
+            f"Пул кадров: {self.buffer_count} буфер(ов) по {self.pool.raw_size} байт, "
+            f"выход {self.output_mode} {self.pool.frame_shape or (self.height, self.width)}"
+        )
+
+    def _register_callback(self):
+        """Регистрация callback-функции SDK для режима callback."""
+        func_type = getattr(ctypes, "WINFUNCTYPE", ctypes.CFUNCTYPE)
+        callback_type = func_type(
+            None,
+            ctypes.POINTER(ctypes.c_ubyte),
+            ctypes.POINTER(MV_FRAME_OUT_INFO_EX),
+            ctypes.c_void_p,
+        )
+        self._callback = callback_type(self._on_image)
+        ret = self.cam.MV_CC_RegisterImageCallBackEx(self._callback, None)
+        if ret != MV_OK:
+            raise RuntimeError(f"MV_CC_RegisterImageCallBackEx failed (ret = {ret:#x})")
+
+    def _on_image(self, pData, pFrameInfo, pUser):
+        """
+        Callback SDK (поток SDK): копирование кадра в буфер пула и помещение в кольцо.
+        Здесь только memcpy — преобразование цвета выполняет потребитель.
+        """
+        try:
+            timestamp = time.monotonic()
+            info = pFrameInfo.contents
+
+            lease = self.pool.acquire(timeout=0)
+            if lease is None:
+                # Пул пуст: переиспользуем буфер самого старого непрочитанного кадра
+                lease = self.ring.steal_oldest()
+                if lease is None:
+                    self.ring.skip()
+                    logger.debug(f"Кадр {info.nFrameNum} отброшен: все буферы у потребителей")
+                    return
+
+            data_len = min(info.nFrameLen, self.pool.raw_size)
+            ctypes.memmove(lease.buffer, pData, data_len)
+            self._fill_info(lease, info, timestamp)
+            self.ring.push(lease)
+        except Exception:
+            logger.exception("Ошибка в callback получения кадра")
+
+    def _fill_info(self, lease, stFrameInfo, timestamp):
+        """Перенос метаданных кадра из MV_FRAME_OUT_INFO_EX в аренду."""
+        lease.frame_num = stFrameInfo.nFrameNum
+        lease.timestamp = timestamp
+        lease.device_timestamp = (stFrameInfo.nDevTimeStampHigh << 32) | stFrameInfo.nDevTimeStampLow
+
+        # Буфер мог быть изъят у непрочитанного кадра: отметки начинаются заново
+        timing = lease.timing
+        timing.reset()
+        timing.received = time.perf_counter()
+        exposed = self.device_clock.transit(lease.device_timestamp, timing.received)
+        if exposed is not None:
+            timing.mark("sensor", exposed, timing.received)
+        lease.info = (
+            stFrameInfo.nWidth,
+            stFrameInfo.nHeight,
+            stFrameInfo.enPixelType,
+            stFrameInfo.nFrameLen,
+        )
+
+    @property
+    def is_open(self):
+        """Камера открыта (open() выполнен, release() ещё нет)."""
+        return self.cam is not None
+
     def start(self):
         """Запуск непрерывного захвата кадров."""
+        if self.pool is None:
+            self._create_pool()
+
+        if self.acquisition == "callback":
+            self._register_callback()
+
         ret = self.cam.MV_CC_StartGrabbing()
         if ret != MV_OK:
             raise RuntimeError(f"MV_CC_StartGrabbing failed (ret = {ret:#x})")
         self.running = True
         self.frame_count = 0
         self.last_frame_time = time.time()
-        logger.info("Захват кадров запущен")
+        logger.info(f"Захват кадров запущен (режим {self.acquisition})")
 
     def read(self):
         """
         Получение одного кадра.
         Возвращает (success: bool, frame: np.ndarray или None)
+
+        Кадр — вид на буфер пула и остаётся действительным до следующего
+        вызова read(). Для явного управления буфером используйте read_lease().
         """
-        if not self.running:
+        if self._last_lease is not None:
+            self._last_lease.release()
+            self._last_lease = None
+
+        lease = self.read_lease()
+        if lease is None:
             return False, None
 
-        stFrameInfo = MV_FRAME_OUT_INFO_EX()
-        MAX_BUFFER_SIZE = 3072 * 2048 * 3  # безопасный максимум
-        pData = (ctypes.c_ubyte * MAX_BUFFER_SIZE)()
+        self._last_lease = lease
+        return True, lease.frame
+
+    def read_lease(self, timeout_ms=1000):
+        """
+        Получение одного кадра в арендованный буфер пула.
+        Возвращает FrameLease или None. Вызывающий обязан вернуть аренду (release()).
+        """
+        if not self.running:
+            return None
+
+        if self.acquisition == "callback":
+            return self._read_latest(timeout_ms)
 
-        ret = self.cam.MV_CC_GetOneFrameTimeout(byref(pData), MAX_BUFFER_SIZE, stFrameInfo, 1000)
+        lease = self.pool.acquire(timeout=timeout_ms / 1000)
+        if lease is None:
+            logger.debug("Нет свободных буферов кадра: потребители не вернули аренду")
+            return None
+
+        stFrameInfo = MV_FRAME_OUT_INFO_EX()
+        ret = self.cam.MV_CC_GetOneFrameTimeout(
+            byref(lease.buffer), self.pool.raw_size, stFrameInfo, timeout_ms
+        )
 
         if ret != MV_OK:
+            lease.release()
             if ret == MV_E_GC_TIMEOUT:
                 logger.debug("Таймаут получения кадра")
             else:
                 logger.warning(f"Ошибка получения кадра (ret = {ret:#x})")
-            return False, None
+            return None
+
+        self._fill_info(lease, stFrameInfo, time.monotonic())
+
+        if not self._convert(lease):
+            lease.release()
+            return None
+
+        return lease
+
+    def _read_latest(self, timeout_ms):
+        """Режим callback: самый свежий кадр из кольца (более старые отбрасываются)."""
+        lease = self.ring.get_latest(timeout=timeout_ms / 1000)
+        if lease is None:
+            logger.debug("Таймаут ожидания кадра от callback")
+            return None
+
+        if not self._convert(lease):
+            lease.release()
+            return None
+
+        logger.debug(f"Кадр {lease.frame_num}: возраст {lease.age * 1000:.1f} мс")
+        return lease
 
+    def _output_shape(self, w, h):
+        """Форма выходного кадра для режима output_mode (None — кадром служит вид на raw)."""
+        return self.converter.output_shape(w, h)
+
+    def _convert(self, lease):
+        """Преобразование сырых данных аренды в кадр режима output_mode."""
         # Реальные параметры кадра из структуры (самый надёжный источник)
-        w = stFrameInfo.nWidth
-        h = stFrameInfo.nHeight
-        pixel_type = stFrameInfo.enPixelType
-        data_len = stFrameInfo.nFrameLen
+        w, h, pixel_type, data_len = lease.info
 
         logger.debug(f"Получен кадр: {w}x{h}, pixel_type={pixel_type:#x}, len={data_len}")
 
-        try:
-            # Берём только реальное количество байт
-            raw_data = np.frombuffer(pData, dtype=np.uint8, count=data_len)
-
-            if pixel_type == PixelType_Gvsp_Mono8:
-                raw = raw_data.reshape((h, w))
-                frame = cv2.cvtColor(raw, cv2.COLOR_GRAY2BGR)
+        if self._output_shape(w, h) != self.pool.frame_shape or w * h > self.pool.raw_size:
+            logger.error(
+                f"Размер кадра {w}x{h} не совпадает с буфером пула "
+                f"({self.width}x{self.height}, режим {self.output_mode})"
+            )
+            return False
 
-            elif pixel_type == PixelType_Gvsp_BayerRG8:
-                raw = raw_data.reshape((h, w))
-                frame = cv2.cvtColor(
-                    raw, cv2.COLOR_BayerBG2BGR
-                )  # или BayerRG2BGR — зависит от камеры
+        try:
+            # Берём только реальное количество байт (вид на буфер, без копирования)
+            raw = lease.raw[:data_len].reshape((h, w))
 
-            else:
+            started = time.perf_counter()
+            if not self.converter.convert(raw, pixel_type, lease):
                 logger.error(f"Неожиданный тип пикселей: {pixel_type:#x}")
-                return False, None
+                return False
+            lease.timing.mark("grab", lease.timing.received, started)
+            lease.timing.mark("demosaic", started)
 
             # Расчёт FPS
             self.frame_count += 1
@@ -171,34 +361,27 @@ class HikCamera:
                 self.frame_count = 0
                 self.last_frame_time = now
 
-            # Отрисовка FPS прямо на кадре
-            cv2.putText(
-                frame,
-                f"FPS: {self.fps:.1f}",
-                (10, 40),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.2,
-                (0, 255, 0),
-                3,
-                cv2.LINE_AA,
-            )
-
-            return True, frame
+            return True
 
         except ValueError as e:
             logger.error(
-                f"Ошибка reshape кадра: {e} " f"(ожидаемый размер: {h*w}, получено: {len(raw_data)})"
+                f"Ошибка reshape кадра: {e} " f"(ожидаемый размер: {h*w}, получено: {data_len})"
             )
-            return False, None
+            return False
         except Exception as e:
             logger.exception("Неожиданная ошибка обработки кадра")
-            return False, None
+            return False
 
     def stop(self):
         """Остановка захвата кадров."""
+        if self._last_lease is not None:
+            self._last_lease.release()
+            self._last_lease = None
         if self.running and self.cam:
             self.cam.MV_CC_StopGrabbing()
             self.running = False
+            if self.ring is not None:
+                self.ring.clear()
             logger.info("Захват остановлен")
 
     def release(self):
@@ -208,12 +391,17 @@ class HikCamera:
             self.cam.MV_CC_CloseDevice()
             self.cam.MV_CC_DestroyHandle()
             self.cam = None
+        self.pool = None
         logger.debug("Ресурсы камеры освобождены")
 
     def get_fps(self):
         """Возвращает текущее значение FPS."""
         return self.fps
 
+    def get_dropped(self):
+        """Количество кадров, отброшенных кольцом в режиме callback (с создания камеры)."""
+        return self.ring.dropped if self.ring is not None else 0
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
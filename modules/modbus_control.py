@@ -2,11 +2,16 @@
 """
 Модуль управления сервоприводом Delta ASDA-AB по Modbus RTU (JOG-режим).
 Поддерживает подключение, команды JOG и регулировку скорости с ограничениями.
+Обмен идёт через RegisterMap: чтения объединяются, повтор той же скорости
+не записывается; команды JOG/STOP отправляются всегда — состояние привода
+(остановка по ошибке, внешний пуск) может не совпадать с кэшем записей.
 """
 
 import logging
 import minimalmodbus
 
+from .modbus_registers import RegisterMap
+
 logger = logging.getLogger(__name__)
 
 JOG_STEP = 25  # Шаг изменения скорости (об/мин)
@@ -34,9 +39,11 @@ class ServoController:
         """Инициализация с конфигурацией Modbus."""
         self.config = config.get("modbus", {})
         self.instrument = None
+        self.registers = None
         self.current_speed = 75  # Начальная скорость
         self.current_direction = None  # None / "forward" / "reverse"
         self.connected = False
+        self._speed_applied = False  # current_speed уже записана в привод
 
     def connect(self):
         """Подключение к сервоприводу через Modbus RTU."""
@@ -50,6 +57,13 @@ class ServoController:
             self.instrument.serial.stopbits = self.config["stopbits"]
             self.instrument.serial.timeout = self.config["timeout"]
 
+            self.registers = RegisterMap(
+                self.instrument,
+                max_gap=self.config.get("max_read_gap", 4),
+                max_block=self.config.get("max_block", 16),
+                multi_write=self.config.get("multi_write", False),
+            )
+
             logger.info(f"Modbus подключён: {self.config['port']} @ {self.config['baudrate']} baud")
             self.connected = True
             return True
@@ -63,7 +77,7 @@ class ServoController:
         if not self.connected:
             return None
         try:
-            return self.instrument.read_register(self.REGISTERS["VERSION"])
+            return self.registers.read(self.REGISTERS["VERSION"])
         except Exception as e:
             logger.warning(f"Не удалось прочитать версию ПО: {e}")
             return None
@@ -73,8 +87,10 @@ class ServoController:
         if not self.connected:
             return False
         try:
-            version = self.instrument.read_register(self.REGISTERS["VERSION"])
-            error = self.instrument.read_register(self.REGISTERS["ERROR"])
+            # P0-00 и P0-01 — соседние регистры: одно блочное чтение
+            values = self.registers.read_block([self.REGISTERS["VERSION"], self.REGISTERS["ERROR"]])
+            version = values[self.REGISTERS["VERSION"]]
+            error = values[self.REGISTERS["ERROR"]]
             logger.info(f"Версия ПО: {version}, код ошибки: {error}")
             return error == 0
         except Exception as e:
@@ -95,7 +111,8 @@ class ServoController:
                 cmd = self.JOG_COMMANDS["STOP"]
                 self.current_direction = None
 
-            self.instrument.write_register(self.REGISTERS["JOG"], cmd)
+            # Без кэша: повторный STOP после внешнего пуска обязан дойти до привода
+            self.registers.write(self.REGISTERS["JOG"], cmd, force=True)
             logger.info(f"JOG → {direction.upper()} | скорость {self.current_speed} об/мин")
             return True
         except Exception as e:
@@ -122,9 +139,16 @@ class ServoController:
                 f"Скорость {speed} вне диапазона [{self.MIN_SPEED}–{self.MAX_SPEED}]. Установлено {clamped_speed}"
             )
 
+        if clamped_speed == self.current_speed and self._speed_applied:
+            logger.debug(f"Скорость {clamped_speed} об/мин уже установлена, запись пропущена")
+            return True
+
         try:
-            self.instrument.write_register(self.REGISTERS["JOG"], clamped_speed)
+            # P4-05 принимает и скорость, и команды JOG: запись скорости прерывает
+            # движение, поэтому активное направление приходится отправить повторно
+            self.registers.write(self.REGISTERS["JOG"], clamped_speed, force=True)
             self.current_speed = clamped_speed
+            self._speed_applied = True
             logger.info(f"Скорость установлена: {clamped_speed} об/мин")
 
             # Перезапуск движения, если активен
@@ -134,6 +158,7 @@ class ServoController:
             return True
         except Exception as e:
             logger.error(f"Ошибка установки скорости: {e}")
+            self._speed_applied = False
             return False
 
     def increase_speed(self):
@@ -148,6 +173,10 @@ class ServoController:
         """Остановка (shortcut для jog)."""
         return self.jog("stop")
 
+    def bus_stats(self):
+        """Статистика транзакций Modbus (None, если не подключено)."""
+        return self.registers.stats() if self.registers else None
+
     def close(self):
         """Завершение работы: остановка и сброс скорости."""
         if self.connected:
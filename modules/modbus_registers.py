@@ -0,0 +1,164 @@
+# modules/modbus_registers.py
+"""
+Слой карты регистров поверх minimalmodbus.
+
+- кэш со сквозной записью: повторная запись того же значения пропускается
+- соседние регистры читаются одним блочным запросом read_registers
+- смежные регистры записываются одной командой write_registers
+  (если привод это поддерживает, modbus.multi_write)
+- время каждой транзакции учитывается в статистике
+
+Все обращения к шине сериализуются блокировкой, поэтому карту могут
+использовать одновременно поток команд и поток телеметрии.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionStats:
+    """Статистика транзакций одного вида (чтение, запись, блочная запись)."""
+
+    __slots__ = ("count", "registers", "errors", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.registers = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "registers": self.registers,
+            "errors": self.errors,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+        }
+
+
+class RegisterMap:
+    """Кэширующий доступ к holding-регистрам одного ведомого устройства."""
+
+    def __init__(self, instrument, max_gap=4, max_block=16, multi_write=False):
+        self.instrument = instrument
+        self.max_gap = max_gap  # Макс. число лишних регистров между объединяемыми чтениями
+        self.max_block = max_block  # Макс. длина блочного чтения
+        self.multi_write = multi_write
+
+        self.cache = {}  # Адрес → последнее записанное/прочитанное значение
+        self.skipped_writes = 0
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def _transaction(self, kind, registers, func, *args):
+        """Выполнение одной транзакции с учётом времени; при ошибке кэш сбрасывается."""
+        stat = self._stats.get(kind)
+        if stat is None:
+            stat = self._stats[kind] = TransactionStats()
+
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception:
+            stat.errors += 1
+            self.cache.clear()  # Состояние привода после сбоя неизвестно
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stat.count += 1
+            stat.registers += registers
+            stat.total_ms += elapsed_ms
+            stat.max_ms = max(stat.max_ms, elapsed_ms)
+
+    def write(self, address, value, force=False):
+        """Запись регистра. Возвращает False, если запись пропущена (значение уже записано)."""
+        with self._lock:
+            if not force and self.cache.get(address) == value:
+                self.skipped_writes += 1
+                return False
+            self._transaction("write", 1, self.instrument.write_register, address, value)
+            self.cache[address] = value
+            return True
+
+    def write_many(self, values, force=False):
+        """
+        Запись нескольких регистров {адрес: значение}. Неизменённые пропускаются,
+        смежные при multi_write объединяются в одну команду. Возвращает число транзакций.
+        """
+        with self._lock:
+            changed = {
+                addr: val
+                for addr, val in values.items()
+                if force or self.cache.get(addr) != val
+            }
+            self.skipped_writes += len(values) - len(changed)
+            if not self.multi_write:
+                for addr, val in sorted(changed.items()):
+                    self.write(addr, val, force=True)
+                return len(changed)
+
+            transactions = 0
+            for start, count in self._spans(sorted(changed), max_gap=0):
+                block = [changed[start + i] for i in range(count)]
+                self._transaction(
+                    "write_multi", count, self.instrument.write_registers, start, block
+                )
+                self.cache.update(zip(range(start, start + count), block))
+                transactions += 1
+            return transactions
+
+    def read(self, address):
+        """Чтение одного регистра."""
+        return self.read_block([address])[address]
+
+    def read_block(self, addresses):
+        """
+        Чтение набора регистров минимальным числом транзакций.
+        Возвращает {адрес: значение}; кэш обновляется прочитанными значениями.
+        """
+        result = {}
+        with self._lock:
+            for start, count in self._spans(sorted(set(addresses)), self.max_gap):
+                if count == 1:
+                    values = [self._transaction("read", 1, self.instrument.read_register, start)]
+                else:
+                    values = self._transaction(
+                        "read", count, self.instrument.read_registers, start, count
+                    )
+                block = dict(zip(range(start, start + count), values))
+                self.cache.update(block)
+                result.update((addr, block[addr]) for addr in addresses if addr in block)
+        return result
+
+    def _spans(self, addresses, max_gap):
+        """Объединение отсортированных адресов в блоки (начало, длина)."""
+        spans = []
+        for addr in addresses:
+            if spans:
+                start, count = spans[-1]
+                end = start + count
+                if addr - end <= max_gap and addr - start + 1 <= self.max_block:
+                    spans[-1] = (start, addr - start + 1)
+                    continue
+            spans.append((addr, 1))
+        return spans
+
+    def invalidate(self, address=None):
+        """Сброс кэша (одного адреса или полностью)."""
+        with self._lock:
+            if address is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(address, None)
+
+    def stats(self):
+        """Статистика транзакций по видам и число пропущенных записей."""
+        with self._lock:
+            stats = {kind: stat.as_dict() for kind, stat in self._stats.items()}
+            stats["skipped_writes"] = self.skipped_writes
+            return stats
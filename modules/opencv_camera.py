@@ -20,6 +20,10 @@ class OpenCVCamera:
         if not self.cap.isOpened():
             raise RuntimeError("Не удалось открыть OpenCV-источник")
 
+    @property
+    def is_open(self):
+        return self.cap is not None and self.cap.isOpened()
+
     def start(self):
         self.running = True
 
@@ -34,4 +38,5 @@ class OpenCVCamera:
 
     def release(self):
         if self.cap:
-            self.cap.release()
\ No newline at end of file
+            self.cap.release()
+            self.cap = None
\ No newline at end of file
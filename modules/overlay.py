@@ -0,0 +1,115 @@
+# modules/overlay.py
+"""
+Отрисовка служебной информации поверх уменьшенного изображения для экрана.
+
+Кадры камеры остаются нетронутыми (их видит детектор); FPS, рамки,
+ID дорожек, ROI, линия и счётчик рисуются только на изображении
+в размере окна, поэтому стоимость отрисовки зависит от размера окна,
+а не от разрешения сенсора. Настройки — раздел display.
+"""
+
+import cv2
+import numpy as np
+
+# Цвета в BGR
+COLOR_BOX = (0, 200, 255)
+COLOR_ROI = (255, 160, 0)
+COLOR_LINE = (0, 0, 255)
+COLOR_TEXT = (0, 255, 0)
+
+
+class OverlayRenderer:
+    """Рисование FPS, рамок, ID дорожек, ROI и счётчика на изображении экрана."""
+
+    def __init__(self, config):
+        """Инициализация из разделов display, roi и counting."""
+        display_config = config.get("display", {})
+        self.show_bbox = display_config.get("show_bbox", True)
+        self.show_count = display_config.get("show_count", True)
+        self.show_fps = display_config.get("show_fps", True)
+        self.font_size = display_config.get("font_size", 1.0)
+
+        coords = config.get("roi", {}).get("coords")
+        self.roi = np.array(coords, dtype=np.float32) if coords else None
+
+        count_config = config.get("counting", {})
+        self.line_axis = 0 if count_config.get("line_axis", "x") == "x" else 1
+        self.line = count_config.get("line_position")
+        if self.line is None and self.roi is not None:
+            self.line = (self.roi[self.line_axis] + self.roi[self.line_axis + 2]) / 2
+
+    def render(self, packet, display_size, fps=None):
+        """
+        Изображение для экрана: кадр пакета, уменьшенный до display_size
+        (с сохранением пропорций, без увеличения), в RGB и с разметкой.
+        Возвращает (массив RGB, масштаб изображения относительно кадра).
+        """
+        frame = packet.frame
+        h, w = frame.shape[:2]
+        target_w, target_h = display_size
+
+        scale = min(target_w / w, target_h / h, 1.0)
+        if scale < 1.0:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            resized = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            resized = frame
+
+        # Преобразование цвета создаёт новый массив — кадр из пула не изменяется
+        code = cv2.COLOR_GRAY2RGB if resized.ndim == 2 else cv2.COLOR_BGR2RGB
+        rgb = cv2.cvtColor(resized, code)
+        self.draw(rgb, packet, scale * packet.scale, fps=fps, rgb=True)
+        return rgb, scale
+
+    def draw(self, image, packet, scale, fps=None, rgb=False):
+        """
+        Отрисовка на image (изменяется на месте).
+        scale — пикселей изображения на пиксель сенсора; rgb — image в порядке RGB.
+        """
+        font_scale = 0.6 * self.font_size
+        thickness = max(1, int(round(2 * self.font_size)))
+        color = (lambda c: c[::-1]) if rgb else (lambda c: c)
+
+        if self.roi is not None:
+            x1, y1, x2, y2 = (self.roi * scale).astype(int)
+            cv2.rectangle(image, (x1, y1), (x2, y2), color(COLOR_ROI), 1)
+            if self.line is not None:
+                pos = int(self.line * scale)
+                if self.line_axis == 0:
+                    cv2.line(image, (pos, y1), (pos, y2), color(COLOR_LINE), thickness)
+                else:
+                    cv2.line(image, (x1, pos), (x2, pos), color(COLOR_LINE), thickness)
+
+        if self.show_bbox:
+            self._draw_boxes(image, packet, scale, font_scale, color)
+
+        lines = []
+        if self.show_fps and fps is not None:
+            lines.append(f"FPS: {fps:.1f}")
+        if self.show_count and packet.count is not None:
+            lines.append(f"Count: {packet.count}")
+
+        y = int(30 * self.font_size)
+        for text in lines:
+            cv2.putText(
+                image, text, (10, y), cv2.FONT_HERSHEY_SIMPLEX,
+                font_scale * 1.5, color(COLOR_TEXT), thickness, cv2.LINE_AA,
+            )
+            y += int(35 * self.font_size)
+
+    def _draw_boxes(self, image, packet, scale, font_scale, color):
+        if packet.tracks is not None:
+            boxes, ids = packet.tracks
+        elif packet.detections is not None:
+            boxes, ids = packet.detections[:, :4], None
+        else:
+            return
+
+        boxes = (np.asarray(boxes)[:, :4] * scale).astype(int)
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            cv2.rectangle(image, (x1, y1), (x2, y2), color(COLOR_BOX), 1)
+            if ids is not None:
+                cv2.putText(
+                    image, str(ids[i]), (x1, max(y1 - 3, 10)), cv2.FONT_HERSHEY_SIMPLEX,
+                    font_scale, color(COLOR_BOX), 1, cv2.LINE_AA,
+                )
@@ -0,0 +1,525 @@
+# modules/pipeline.py
+"""
+Конвейер обработки кадров: захват → обработка → отображение.
+
+Каждая стадия работает в своём потоке, стадии связаны ограниченными
+очередями с настраиваемой политикой переполнения:
+- block: производитель ждёт освобождения места (обратное давление)
+- drop_oldest: самый старый кадр в очереди отбрасывается
+- latest: в очереди хранится только самый свежий кадр
+
+Отброшенные кадры сразу возвращают буфер в пул камеры и учитываются
+в счётчиках стадии, поэтому медленный потребитель не тормозит камеру
+и не увеличивает потребление памяти.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from .frame_pool import FrameLease
+from .frame_timing import create_timing_stats
+from .utils import RateMeter
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+LATEST = "latest"
+
+QUEUE_POLICIES = (BLOCK, DROP_OLDEST, LATEST)
+
+
+class FramePacket:
+    """
+    Кадр, проходящий по конвейеру, вместе с результатами обработки.
+
+    Атрибуты:
+    - lease: FrameLease с буфером кадра
+    - detections: результаты детекции (заполняются стадией обработки)
+    - tracks: (рамки, ID) дорожек трекера после обработки кадра
+    - count: значение счётчика деталей после обработки кадра
+    - meta: словарь для дополнительных данных стадий
+    """
+
+    __slots__ = ("lease", "detections", "tracks", "count", "meta")
+
+    def __init__(self, lease):
+        self.lease = lease
+        self.detections = None
+        self.tracks = None
+        self.count = None
+        self.meta = {}
+
+    @property
+    def frame(self):
+        return self.lease.frame
+
+    @property
+    def scale(self):
+        """Масштаб кадра относительно сенсора (координаты результатов — в пикселях сенсора)."""
+        return self.lease.scale
+
+    @property
+    def frame_num(self):
+        return self.lease.frame_num
+
+    @property
+    def timestamp(self):
+        return self.lease.timestamp
+
+    def release(self):
+        """Возврат буфера кадра в пул."""
+        self.lease.release()
+
+
+class StageQueue:
+    """Ограниченная очередь между стадиями с политикой переполнения."""
+
+    def __init__(self, name, maxsize=2, policy=DROP_OLDEST):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(
+                f"Неизвестная политика очереди '{name}': {policy}. Доступны: {list(QUEUE_POLICIES)}"
+            )
+        self.name = name
+        self.policy = policy
+        self.maxsize = 1 if policy == LATEST else max(1, int(maxsize))
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.put_count = 0  # Принято пакетов
+        self.dropped = 0  # Отброшено пакетов из-за переполнения
+
+    @classmethod
+    def from_config(cls, name, queue_config, default_size=2, default_policy=DROP_OLDEST):
+        """Создание очереди по разделу конфигурации {size, policy}."""
+        queue_config = queue_config or {}
+        return cls(
+            name,
+            queue_config.get("size", default_size),
+            queue_config.get("policy", default_policy),
+        )
+
+    def put(self, packet, timeout=0.1):
+        """
+        Добавление пакета. В режиме block ждёт места не дольше timeout
+        и возвращает False, если место не освободилось (пакет не принят).
+        """
+        evicted = []
+        with self._cond:
+            if self._closed:
+                evicted.append(packet)
+                accepted = False
+            elif self.policy == BLOCK:
+                accepted = self._cond.wait_for(
+                    lambda: self._closed or len(self._items) < self.maxsize, timeout
+                ) and not self._closed
+                if accepted:
+                    self._items.append(packet)
+                    self.put_count += 1
+                    self._cond.notify_all()
+            else:
+                while len(self._items) >= self.maxsize:
+                    evicted.append(self._items.popleft())
+                    self.dropped += 1
+                self._items.append(packet)
+                self.put_count += 1
+                accepted = True
+                self._cond.notify_all()
+
+        for item in evicted:
+            item.release()
+        return accepted
+
+    def get(self, timeout=0.1):
+        """Извлечение одного пакета (или None по таймауту)."""
+        batch = self.get_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def get_batch(self, max_items, timeout=0.1):
+        """
+        Извлечение до max_items пакетов: ждёт первый не дольше timeout,
+        остальные забирает только если они уже в очереди.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self._items, timeout):
+                return []
+            batch = []
+            while self._items and len(batch) < max_items:
+                batch.append(self._items.popleft())
+            self._cond.notify_all()
+            return batch
+
+    def close(self):
+        """Закрытие очереди: ожидающие пробуждаются, оставшиеся кадры освобождаются."""
+        with self._cond:
+            self._closed = True
+            stale = list(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+        for item in stale:
+            item.release()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class PipelineStage(threading.Thread):
+    """
+    Базовая стадия конвейера: берёт пакеты из source, обрабатывает
+    через handle() и передаёт в sink. Без sink пакеты освобождаются.
+    """
+
+    def __init__(self, name, source=None, sink=None, batch_size=1):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.source = source
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+
+        self._stop_event = threading.Event()
+
+        self.processed = 0  # Обработано пакетов
+        self.errors = 0  # Пакетов, потерянных из-за исключений
+        self.rejected = 0  # Пакетов, не принятых следующей очередью (block)
+        self.busy_time = 0.0  # Суммарное время в handle(), сек
+
+    def run(self):
+        logger.debug(f"Стадия '{self.stage_name}' запущена")
+        try:
+            self.on_start()
+            while not self._stop_event.is_set():
+                packets = self.next_packets()
+                if not packets:
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    packets = self.handle(packets)
+                except Exception:
+                    logger.exception(f"Ошибка в стадии '{self.stage_name}'")
+                    self.errors += len(packets)
+                    for packet in packets:
+                        packet.release()
+                    continue
+                finally:
+                    self.busy_time += time.perf_counter() - started
+
+                self.processed += len(packets)
+                for packet in packets:
+                    self.emit(packet)
+        except Exception:
+            logger.exception(f"Стадия '{self.stage_name}' аварийно завершена")
+        finally:
+            self.on_stop()
+            logger.debug(f"Стадия '{self.stage_name}' остановлена")
+
+    def next_packets(self):
+        """Очередная порция пакетов для обработки."""
+        return self.source.get_batch(self.batch_size, timeout=0.1)
+
+    def handle(self, packets):
+        """Обработка порции пакетов. Возвращает список пакетов для передачи дальше."""
+        return packets
+
+    def emit(self, packet):
+        """Передача пакета в следующую очередь (с ожиданием в режиме block)."""
+        if self.sink is None:
+            packet.release()
+            return
+        while not self._stop_event.is_set():
+            if self.sink.put(packet):
+                return
+            if self.sink.policy != BLOCK:
+                return
+        self.rejected += 1
+        packet.release()
+
+    def on_start(self):
+        """Вызывается в потоке стадии перед началом работы."""
+
+    def on_stop(self):
+        """Вызывается в потоке стадии после завершения работы."""
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def stats(self):
+        """Счётчики стадии."""
+        return {
+            "alive": self.is_alive(),
+            "processed": self.processed,
+            "dropped": self.source.dropped if self.source is not None else 0,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "busy_time": self.busy_time,
+        }
+
+
+class CaptureStage(PipelineStage):
+    """
+    Стадия захвата: открывает камеру и читает кадры в виде аренд.
+    Камера, которую не удалось открыть (не подключена, нет файла),
+    открывается повторно раз в retry_interval сек, пока стадия работает.
+    """
+
+    def __init__(self, camera, sink, retry_interval=5.0):
+        super().__init__("capture", sink=sink)
+        self.camera = camera
+        self.retry_interval = retry_interval
+        self.failed_reads = 0
+        self.fps_meter = RateMeter(window=2.0)
+        self.camera_ready = False  # Камера открыта и захват запущен
+        self.camera_error = None  # Последняя ошибка открытия
+        self.open_attempts = 0
+        self._next_open = 0.0
+        self._released_dropped = None  # Отброшено кадров к моменту release() камеры
+
+    def on_start(self):
+        self._ensure_camera()
+
+    def _ensure_camera(self):
+        """Открытие и запуск камеры (не чаще retry_interval). Возвращает True, если камера работает."""
+        if self.camera_ready:
+            return True
+        if time.monotonic() < self._next_open:
+            return False
+        self.open_attempts += 1
+        try:
+            # Камера могла быть открыта заранее (bring_up — параллельно с другими устройствами)
+            if not getattr(self.camera, "is_open", False):
+                self.camera.open()
+            self.camera.start()
+        except Exception as e:
+            if self.camera_error != str(e):
+                logger.error(f"Камера не открыта: {e}. Повтор каждые {self.retry_interval:g} с")
+            self.camera_error = str(e)
+            self._next_open = time.monotonic() + self.retry_interval
+            return False
+        if self.camera_error is not None:
+            logger.info(f"Камера открыта (попытка {self.open_attempts})")
+        self.camera_ready = True
+        self.camera_error = None
+        return True
+
+    def on_stop(self):
+        self.camera.stop()
+        # Счётчик отброшенных кадров хранится в пуле камеры, который освобождает release()
+        self._released_dropped = self._camera_dropped()
+        self.camera.release()
+
+    def next_packets(self):
+        if not self._ensure_camera():
+            self._stop_event.wait(0.1)
+            return []
+        lease = self._read()
+        if lease is None:
+            if getattr(self.camera, "finished", False):
+                # Источник исчерпан (replay, synthetic): ожидание остановки без холостого цикла
+                self._stop_event.wait(0.1)
+            else:
+                self.failed_reads += 1
+            return []
+        if not lease.timing.received:
+            # Камера без собственной отметки: момент получения — здесь
+            lease.timing.received = time.perf_counter()
+        self.fps_meter.add()
+        return [FramePacket(lease)]
+
+    def fps(self):
+        """Частота захвата кадров."""
+        return self.fps_meter.rate()
+
+    def _read(self):
+        """Чтение кадра в виде аренды (для камер без пула — обёртка над read())."""
+        if hasattr(self.camera, "read_lease"):
+            return self.camera.read_lease()
+        ret, frame = self.camera.read()
+        return FrameLease.unpooled(frame) if ret else None
+
+    def stats(self):
+        stats = super().stats()
+        stats["dropped"] = self._camera_dropped() if self._released_dropped is None else self._released_dropped
+        stats["failed_reads"] = self.failed_reads
+        stats["camera_ready"] = self.camera_ready
+        stats["camera_error"] = self.camera_error
+        return stats
+
+    def _camera_dropped(self):
+        """Кадры, не захваченные из-за отсутствия свободных буферов или вытесненные кольцом камеры."""
+        pool = getattr(self.camera, "pool", None)
+        dropped = pool.exhausted if pool is not None else 0
+        if hasattr(self.camera, "get_dropped"):
+            dropped += self.camera.get_dropped()
+        return dropped
+
+
+class ProcessStage(PipelineStage):
+    """
+    Стадия обработки: последовательно применяет обработчики к порции кадров.
+    Обработчик — объект с методом process(packets), изменяющим пакеты на месте.
+    Необязательные методы обработчика: start() — вызывается в потоке стадии
+    до первого кадра (загрузка моделей), stop() — после последнего,
+    stats() — словарь показателей. Атрибут timing_stage ("detect", "count")
+    — этап, к которому относится время обработчика в задержках кадра.
+    """
+
+    # Этапы, которые записывает в гистограммы поток обработки
+    TIMING_STAGES = ("sensor", "grab", "demosaic", "detect", "count")
+
+    def __init__(self, source, sink, processors=None, batch_size=1, timing=None):
+        super().__init__("process", source=source, sink=sink, batch_size=batch_size)
+        self.processors = list(processors or [])
+        self.timing = timing  # FrameTimingStats или None
+
+    def on_start(self):
+        for processor in list(self.processors):
+            if not hasattr(processor, "start"):
+                continue
+            try:
+                processor.start()
+            except Exception:
+                # Видео продолжает идти без неисправного обработчика
+                logger.exception(f"Обработчик {type(processor).__name__} отключён: ошибка запуска")
+                self.processors.remove(processor)
+
+    def on_stop(self):
+        for processor in self.processors:
+            if not hasattr(processor, "stop"):
+                continue
+            try:
+                processor.stop()
+            except Exception:
+                logger.exception(f"Ошибка остановки обработчика {type(processor).__name__}")
+
+    def handle(self, packets):
+        for processor in self.processors:
+            started = time.perf_counter()
+            processor.process(packets)
+            stage = getattr(processor, "timing_stage", None)
+            if stage is not None:
+                # Кадры порции обрабатываются вместе: время порции — задержка каждого
+                finished = time.perf_counter()
+                for packet in packets:
+                    packet.lease.timing.mark(stage, started, finished)
+        if self.timing is not None:
+            for packet in packets:
+                timing = packet.lease.timing
+                self.timing.record(timing, self.TIMING_STAGES)
+                counted = timing.finished("count")
+                if counted:
+                    self.timing.record_age("counted", timing, counted)
+        return packets
+
+    def stats(self):
+        stats = super().stats()
+        for processor in self.processors:
+            if hasattr(processor, "stats"):
+                stats[type(processor).__name__] = processor.stats()
+        return stats
+
+
+class FramePipeline:
+    """
+    Сборка конвейера по конфигурации (раздел pipeline).
+
+    Потребитель (GUI или headless-режим) забирает готовые пакеты
+    из очереди output и обязан освобождать их через release().
+    """
+
+    def __init__(self, camera, config, processors=None):
+        pipe_config = config.get("pipeline", {})
+        self.timing = create_timing_stats(config)  # Задержки кадра по этапам (None — отключено)
+
+        self.process_queue = StageQueue.from_config(
+            "process", pipe_config.get("process_queue"), default_size=2, default_policy=DROP_OLDEST
+        )
+        self.output = StageQueue.from_config(
+            "display", pipe_config.get("display_queue"), default_size=1, default_policy=LATEST
+        )
+
+        self.capture = CaptureStage(
+            camera, sink=self.process_queue, retry_interval=pipe_config.get("camera_retry", 5.0)
+        )
+        self.process = ProcessStage(
+            self.process_queue,
+            self.output,
+            processors,
+            batch_size=pipe_config.get("process_batch", 1),
+            timing=self.timing,
+        )
+        self.stages = [self.capture, self.process]
+        self._update_batch_size()
+
+    def add_processor(self, processor):
+        """Добавление обработчика (до запуска конвейера)."""
+        self.process.processors.append(processor)
+        self._update_batch_size()
+
+    def _update_batch_size(self):
+        """Размер порции стадии обработки — максимум из запрошенных обработчиками."""
+        for processor in self.process.processors:
+            self.process.batch_size = max(
+                self.process.batch_size, getattr(processor, "batch_size", 1)
+            )
+
+    def leases_in_flight(self):
+        """
+        Наибольшее число одновременно занятых буферов пула камеры по частям:
+        очередь к обработке, порция в обработке, очередь к отображению,
+        кадр у потребителя и кадр в захвате, кольцо камеры в режиме callback.
+        """
+        camera = self.capture.camera
+        return {
+            "очередь": self.process_queue.maxsize,
+            "порция": self.process.batch_size,
+            "отображение": self.output.maxsize,
+            "потребитель и захват": 2,
+            "кольцо": camera.ring_size if getattr(camera, "acquisition", None) == "callback" else 0,
+        }
+
+    def _check_pool_size(self):
+        """Предупреждение, если буферов пула меньше, чем может быть занято конвейером."""
+        buffer_count = getattr(self.capture.camera, "buffer_count", None)
+        parts = self.leases_in_flight()
+        required = sum(parts.values())
+        if buffer_count is not None and buffer_count < required:
+            # Пока порция детекции в работе, захват ждёт свободный буфер — медленная
+            # детекция снова тормозит камеру
+            detail = " + ".join(f"{name} {count}" for name, count in parts.items() if count)
+            logger.warning(
+                f"Буферов пула камеры {buffer_count} меньше, чем может быть занято конвейером: "
+                f"{required} ({detail}). Увеличьте buffer_count камеры"
+            )
+
+    def start(self):
+        self._check_pool_size()
+        for stage in reversed(self.stages):
+            stage.start()
+        logger.info("Конвейер кадров запущен")
+
+    def stop(self, timeout=2.0):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            if stage.is_alive():
+                stage.join(timeout)
+        self.process_queue.close()
+        self.output.close()
+        logger.info(f"Конвейер кадров остановлен: {self.stats()}")
+
+    def stats(self):
+        """Счётчики всех стадий, включая отброшенные кадры на выходе."""
+        return {
+            "capture": self.capture.stats(),
+            "process": self.process.stats(),
+            "display": {"dropped": self.output.dropped, "queued": len(self.output)},
+        }
@@ -0,0 +1,57 @@
+# modules/processing.py
+"""
+Сборка обработчиков стадии обработки конвейера по конфигурации.
+Используется и GUI, и режимами без GUI, чтобы состав обработки был одинаковым.
+"""
+
+import logging
+
+from .belt_control import DensityMeter
+from .blob_detector import create_blob_detector
+from .counter import PartCounter
+from .detect_scheduler import DetectionScheduler, ScheduledDetector
+from .detector import create_detector
+from .recorder import create_recorder
+
+logger = logging.getLogger(__name__)
+
+
+def build_processors(config, speed_provider=None):
+    """
+    Список обработчиков для ProcessStage в порядке применения.
+    speed_provider — функция текущей скорости ленты (об/мин) для планирования детекции.
+    """
+    processors = []
+
+    detector = create_detector(config)
+    if detector is not None:
+        logger.info("Детекция YOLO включена")
+    else:
+        detector = create_blob_detector(config)
+        if detector is None:
+            logger.info("Детекция отключена (yolo.enable_detection и blob.enable выключены)")
+            return processors
+        logger.info(f"Детекция без нейросети: метод {detector.method}")
+
+    if speed_provider is not None and config.get("detect_schedule", {}).get("enable", False):
+        detector = ScheduledDetector(detector, DetectionScheduler(config, speed_provider))
+        logger.info("Частота детекции подстраивается под скорость конвейера")
+
+    processors.append(detector)
+
+    counter = PartCounter(config)
+    processors.append(counter)
+
+    if config.get("belt_control", {}).get("enable", False):
+        processors.append(DensityMeter(config, counter))
+
+    # Рекордер последним: в кольцо попадают кадры с итогами подсчёта
+    recorder = create_recorder(config, counter)
+    if recorder is not None:
+        processors.append(recorder)
+    return processors
+
+
+def find_processor(processors, cls):
+    """Первый обработчик заданного класса (или None)."""
+    return next((p for p in processors if isinstance(p, cls)), None)
@@ -0,0 +1,111 @@
+# modules/raw_frames.py
+"""
+Файлы сырых кадров сенсора (Mono8/BayerRG8) с метаданными каждого кадра.
+
+Формат: заголовок HEADER_SIZE байт, затем записи фиксированной длины:
+номер кадра, метка времени хоста, метка времени камеры, длина данных
+и сами данные кадра (выровнены до 64 байт). Фиксированная длина записи
+позволяет читать файл через mmap как массив NumPy без копирования:
+кадр — вид на страницы файла в памяти.
+"""
+
+import logging
+import mmap
+import struct
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RAWFRM01"
+HEADER_SIZE = 64
+# magic, width, height, pixel_type, размер данных кадра
+_HEADER = struct.Struct("<8sIIII")
+# frame_num, timestamp, device_timestamp, data_len
+_META = struct.Struct("<QdQI")
+_ALIGN = 64
+
+
+def record_dtype(frame_size):
+    """Тип записи кадра (структурный dtype NumPy)."""
+    return np.dtype(
+        {
+            "names": ["frame_num", "timestamp", "device_timestamp", "data_len", "data"],
+            "formats": ["<u8", "<f8", "<u8", "<u4", ("u1", frame_size)],
+            "offsets": [0, 8, 16, 24, _ALIGN],
+            "itemsize": -(-(_ALIGN + frame_size) // _ALIGN) * _ALIGN,
+        }
+    )
+
+
+class RawFrameWriter:
+    """Последовательная запись сырых кадров одного размера и формата."""
+
+    def __init__(self, path, width, height, pixel_type):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.pixel_type = pixel_type
+        self.frame_size = width * height
+        self.dtype = record_dtype(self.frame_size)
+        self._file = open(path, "wb")
+        header = _HEADER.pack(MAGIC, width, height, pixel_type, self.frame_size)
+        self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self.frames = 0
+
+    def write(self, raw, frame_num=0, timestamp=0.0, device_timestamp=0):
+        """Запись кадра: raw — массив uint8 из width*height байт (или больше)."""
+        data = np.ascontiguousarray(raw, dtype=np.uint8).reshape(-1)[: self.frame_size]
+        meta = _META.pack(int(frame_num), float(timestamp), int(device_timestamp), data.size)
+        self._file.write(meta.ljust(_ALIGN, b"\0"))
+        # Данные пишутся напрямую из буфера кадра, без промежуточной копии
+        self._file.write(memoryview(data))
+        self._file.write(bytes(self.dtype.itemsize - _ALIGN - data.size))
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RawFrameReader:
+    """
+    Чтение файла сырых кадров через mmap.
+    records — структурный массив-вид на файл; frame(i) — кадр (h, w) без копирования.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+            self._file.close()
+            raise ValueError(f"{path}: не файл сырых кадров")
+        _, self.width, self.height, self.pixel_type, self.frame_size = _HEADER.unpack_from(header)
+
+        self.dtype = record_dtype(self.frame_size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Неполная последняя запись (запись прервана) не учитывается
+        count = (len(self._mmap) - HEADER_SIZE) // self.dtype.itemsize
+        self.records = np.frombuffer(self._mmap, dtype=self.dtype, count=count, offset=HEADER_SIZE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def frame(self, index):
+        """Вид (h, w) на данные кадра index в отображённом файле."""
+        return self.records["data"][index].reshape(self.height, self.width)
+
+    def close(self):
+        # Виды на mmap должны быть освобождены до закрытия отображения
+        self.records = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            logger.debug(f"{self.path}: отображение занято видами кадров, закроется сборщиком мусора")
+        self._file.close()
@@ -0,0 +1,377 @@
+# modules/recorder.py
+"""
+Фоновая запись видео с предзаписью (pre-trigger).
+
+Рекордер — обработчик стадии обработки: копия каждого кадра
+(при необходимости уменьшенная) хранится в кольце, ограниченном
+по памяти и по длительности (pre_seconds). По событию — клавиша,
+аномалия подсчёта, ошибка привода — содержимое кольца и кадры
+следующих post_seconds передаются потоку записи.
+
+Кодирование и запись на диск идут только в потоке записи; стадия
+обработки лишь кладёт кадры в ограниченную очередь. Если диск не
+успевает, кадры отбрасываются и учитываются в счётчике dropped.
+Рядом с роликом сохраняется CSV с номером, временем и счётом каждого кадра.
+
+Форматы: video — cv2.VideoWriter, raw — сырые данные сенсора в полном
+разрешении (modules/raw_frames.py), пригодные для камеры replay.
+"""
+
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+import cv2
+
+from .raw_frames import RawFrameWriter
+
+logger = logging.getLogger(__name__)
+
+# Кадр записи: копия изображения (или сырых данных) и данные пакета
+RecordedFrame = namedtuple(
+    "RecordedFrame", ["image", "frame_num", "timestamp", "count", "device_timestamp", "info"]
+)
+# Начало ролика: путь, частота кадров и кадры предзаписи
+ClipStart = namedtuple("ClipStart", ["path", "fps", "frames"])
+
+_CLOSE = object()  # Маркер конца ролика в очереди записи
+
+FORMATS = ("video", "raw")
+
+
+class PreTriggerRing:
+    """Кольцо последних кадров, ограниченное объёмом памяти и длительностью."""
+
+    def __init__(self, max_bytes, max_seconds):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._items = deque()
+        self.nbytes = 0
+
+    def push(self, item):
+        self._items.append(item)
+        self.nbytes += item.image.nbytes
+        newest = item.timestamp
+        while self._items and (
+            self.nbytes > self.max_bytes or newest - self._items[0].timestamp > self.max_seconds
+        ):
+            self.nbytes -= self._items.popleft().image.nbytes
+
+    def drain(self):
+        """Изъятие всех кадров кольца (от старых к новым)."""
+        items = list(self._items)
+        self._items.clear()
+        self.nbytes = 0
+        return items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ClipWriter:
+    """Запись одного ролика: изображения (в подклассе) и CSV с данными кадров."""
+
+    def __init__(self, path):
+        self.path = path
+        self._csv_file = open(os.path.splitext(path)[0] + ".csv", "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(["frame_num", "timestamp", "count"])
+        self.frames = 0
+
+    def write(self, item):
+        self._write_image(item)
+        self._csv.writerow([item.frame_num, f"{item.timestamp:.6f}", item.count])
+        self.frames += 1
+
+    def _write_image(self, item):
+        raise NotImplementedError
+
+    def close(self):
+        self._csv_file.close()
+
+
+class VideoClipWriter(ClipWriter):
+    """Ролик через cv2.VideoWriter."""
+
+    def __init__(self, path, fps, fourcc):
+        super().__init__(path)
+        self.fps = fps
+        self.fourcc = fourcc
+        self._video = None
+
+    def _write_image(self, item):
+        image = item.image
+        if self._video is None:
+            h, w = image.shape[:2]
+            self._video = cv2.VideoWriter(
+                self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h), image.ndim == 3
+            )
+            if not self._video.isOpened():
+                raise IOError(f"Не удалось открыть запись {self.path} ({self.fourcc})")
+        self._video.write(image)
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+        super().close()
+
+
+class RawClipWriter(ClipWriter):
+    """Ролик из сырых кадров сенсора (RawFrameWriter)."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._raw = None
+
+    def _write_image(self, item):
+        if self._raw is None:
+            w, h, pixel_type, _ = item.info
+            self._raw = RawFrameWriter(self.path, w, h, pixel_type)
+        self._raw.write(item.image, item.frame_num, item.timestamp, item.device_timestamp)
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.close()
+        super().close()
+
+
+class FrameRecorder:
+    """
+    Обработчик конвейера с кольцом предзаписи и потоком записи.
+    trigger(reason) можно вызывать из любого потока.
+    """
+
+    def __init__(self, config, counter=None):
+        rec_config = config.get("recorder", {})
+        self.counter = counter
+        self.output_dir = rec_config.get("output_dir", "recordings")
+        self.format = rec_config.get("format", "video")
+        if self.format not in FORMATS:
+            raise ValueError(f"Неизвестный формат записи: {self.format}. Доступны: {list(FORMATS)}")
+        self.scale = rec_config.get("scale", 0.5)
+        self.every = max(1, int(rec_config.get("every", 1)))
+        self.pre_seconds = rec_config.get("pre_seconds", 10.0)
+        self.post_seconds = rec_config.get("post_seconds", 5.0)
+        self.fps = rec_config.get("fps", 0)  # 0 — по меткам времени кадров
+        self.fourcc = rec_config.get("fourcc", "MJPG")
+        self.extension = rec_config.get("extension") or (".avi" if self.format == "video" else ".raw")
+        self.burst_count = rec_config.get("burst_count", 3)
+        self.on_clump = rec_config.get("on_clump", True)
+        self.min_interval = rec_config.get("min_trigger_interval", 10.0)
+
+        self.ring = PreTriggerRing(rec_config.get("max_memory_mb", 256) * 1024 * 1024, self.pre_seconds)
+        # Очередь без ограничения: маркеры начала и конца ролика не теряются и не ждут места,
+        # а число кадров в ней ограничивает _enqueue (queue_size)
+        self._queue = queue.Queue()
+        self.queue_size = rec_config.get("queue_size", 120)
+        self._frames_queued = 0  # Пишет только поток обработки
+        self._frames_taken = 0  # Пишет только поток записи
+        # Роликов в очереди и в записи не больше max_pending_clips: каждый держит копию предзаписи
+        self.max_pending_clips = max(1, int(rec_config.get("max_pending_clips", 2)))
+        self._clips_closed = 0  # Пишет только поток записи
+        self._writer = None
+
+        self._pending_reason = None  # Устанавливается trigger(), читается в process()
+        self._post_until = None
+        self._last_trigger = float("-inf")
+        self._clumps = counter.clumps if counter is not None else 0
+        self._frame_index = 0
+
+        self.clips = 0
+        self.skipped = 0  # Событий без ролика: предыдущие ещё записываются
+        self.written = 0
+        self.dropped = 0  # Кадров, не записанных из-за переполнения очереди записи
+        self.errors = 0
+
+    def start(self):
+        """Запуск потока записи (вызывается в потоке стадии обработки)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._writer = threading.Thread(target=self._write_loop, name="recorder", daemon=True)
+        self._writer.start()
+        if self.format == "raw" and self.scale < 1.0:
+            logger.info("Рекордер: формат raw пишет кадры в полном разрешении, scale не используется")
+        logger.info(
+            f"Рекордер ({self.format}): предзапись {self.pre_seconds} с, после события {self.post_seconds} с, "
+            f"масштаб {self.scale}, каталог {self.output_dir}"
+        )
+
+    def trigger(self, reason="manual"):
+        """Запрос записи ролика (потокобезопасно: обрабатывается со следующим кадром)."""
+        self._pending_reason = reason
+
+    def process(self, packets):
+        for packet in packets:
+            self._check_anomaly(packet)
+            self._frame_index += 1
+            if self._frame_index % self.every:
+                continue
+            item = self._copy(packet)
+            if item is None:
+                continue
+            reason, self._pending_reason = self._pending_reason, None
+            if reason is not None:
+                self._start_clip(reason, item.timestamp)
+
+            if self._post_until is None:
+                self.ring.push(item)
+            elif item.timestamp <= self._post_until:
+                self._enqueue(item)
+            else:
+                self._enqueue(_CLOSE, force=True)
+                self._post_until = None
+                self.ring.push(item)
+
+    def _copy(self, packet):
+        """Копия кадра (буфер пула после обработки будет переиспользован)."""
+        lease = packet.lease
+        if self.format == "raw":
+            if lease.info is None or lease.raw is None:
+                # Источник без сырых данных (например, OpenCV-камера)
+                self.errors += 1
+                return None
+            image = lease.raw[: lease.info[3]].copy()
+        elif self.scale < 1.0:
+            image = cv2.resize(packet.frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            image = packet.frame.copy()
+        return RecordedFrame(
+            image, packet.frame_num, packet.timestamp, packet.count, lease.device_timestamp, lease.info
+        )
+
+    def _check_anomaly(self, packet):
+        """Аномалии подсчёта: много деталей засчитано за один кадр или обнаружена слипшаяся."""
+        new_counts = packet.meta.get("new_counts", 0)
+        if self.burst_count and new_counts >= self.burst_count:
+            self._auto_trigger(f"burst{new_counts}")
+        if self.counter is not None:
+            clumps = self.counter.clumps
+            if clumps > self._clumps and self.on_clump:
+                self._auto_trigger("clump")
+            self._clumps = clumps
+
+    def _auto_trigger(self, reason):
+        now = time.monotonic()
+        if now - self._last_trigger >= self.min_interval and self._pending_reason is None:
+            self._last_trigger = now
+            self.trigger(reason)
+
+    def _start_clip(self, reason, timestamp):
+        if self._post_until is not None:
+            # Событие во время записи — продлеваем текущий ролик
+            self._post_until = timestamp + self.post_seconds
+            return
+        if self.clips - self._clips_closed >= self.max_pending_clips:
+            # Поток записи не успевает (частые нажатия, повторяющаяся ошибка привода)
+            self.skipped += 1
+            logger.warning(
+                f"Событие {reason} без ролика: записываются ещё {self.clips - self._clips_closed} ролик(а)"
+            )
+            return
+        frames = self.ring.drain()
+        self._post_until = timestamp + self.post_seconds
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.output_dir, f"{stamp}_{reason}{self.extension}")
+        fps = self.fps or self._estimate_fps(frames)
+        # Предзапись передаётся одним элементом: её память уже учтена кольцом
+        self._enqueue(ClipStart(path, fps, frames), force=True)
+        self.clips += 1
+        logger.info(f"Запись ролика ({reason}): {path}, предзапись {len(frames)} кадров")
+
+    def _estimate_fps(self, frames):
+        if len(frames) >= 2:
+            span = frames[-1].timestamp - frames[0].timestamp
+            if span > 0:
+                return (len(frames) - 1) / span
+        return 25.0
+
+    def _enqueue(self, item, force=False):
+        """
+        Передача потоку записи без ожидания. Кадр при queue_size кадров
+        в очереди отбрасывается; маркеры (force=True) передаются всегда.
+        """
+        if not force:
+            if self._frames_queued - self._frames_taken >= self.queue_size:
+                self.dropped += 1
+                return
+            self._frames_queued += 1
+        self._queue.put(item)
+
+    def _write_loop(self):
+        clip = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                if item is _CLOSE or isinstance(item, ClipStart):
+                    clip = self._close_clip(clip)
+                if item is _CLOSE:
+                    self._clips_closed += 1
+                if isinstance(item, ClipStart):
+                    if self.format == "raw":
+                        clip = RawClipWriter(item.path)
+                    else:
+                        clip = VideoClipWriter(item.path, item.fps, self.fourcc)
+                    for frame in item.frames:
+                        clip.write(frame)
+                        self.written += 1
+                elif item is not _CLOSE:
+                    self._frames_taken += 1
+                    if clip is not None:
+                        clip.write(item)
+                        self.written += 1
+            except Exception:
+                self.errors += 1
+                logger.exception("Ошибка записи ролика")
+        self._close_clip(clip)
+
+    def _close_clip(self, clip):
+        """Завершение открытого ролика (если есть). Возвращает None."""
+        if clip is not None:
+            try:
+                clip.close()
+                logger.info(f"Ролик записан: {clip.path}, {clip.frames} кадров")
+            except Exception:
+                self.errors += 1
+                logger.exception(f"Ошибка завершения ролика {clip.path}")
+        return None
+
+    @property
+    def recording(self):
+        return self._post_until is not None
+
+    def stats(self):
+        return {
+            "recording": self.recording,
+            "clips": self.clips,
+            "skipped": self.skipped,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "buffered": len(self.ring),
+            "buffered_mb": self.ring.nbytes / (1024 * 1024),
+            "queued": self._frames_queued - self._frames_taken,
+        }
+
+    def stop(self, timeout=5.0):
+        """Завершение текущего ролика и остановка потока записи."""
+        if self._writer is None:
+            return
+        if self._post_until is not None:
+            self._enqueue(_CLOSE, force=True)
+            self._post_until = None
+        self._enqueue(None, force=True)
+        self._writer.join(timeout)
+        self._writer = None
+
+
+def create_recorder(config, counter=None):
+    """Рекордер, если он включён в конфигурации (иначе None)."""
+    if not config.get("recorder", {}).get("enable", False):
+        return None
+    return FrameRecorder(config, counter)
@@ -0,0 +1,169 @@
+# modules/replay_camera.py
+"""
+Воспроизведение записанных сырых кадров (modules/raw_frames.py) как камеры.
+
+Файл отображается в память (mmap), кадры выдаются видами NumPy без
+копирования и проходят то же преобразование, что и кадры камеры
+Hikrobot (FrameConverter), поэтому производственную сессию можно
+повторно прогнать через подсчёт в полном разрешении сенсора.
+
+Темп воспроизведения (pacing):
+- realtime: с интервалами, как при записи
+- accelerated: то же, но быстрее в speed раз
+- max: без пауз, с максимальной скоростью потребителя
+"""
+
+import logging
+import time
+
+from .frame_convert import PIXEL_FORMATS, FrameConverter
+from .frame_pool import FrameLease, FramePool
+from .raw_frames import RawFrameReader
+
+logger = logging.getLogger(__name__)
+
+PACING_MODES = ("realtime", "accelerated", "max")
+
+
+class ReplayCamera:
+    """Камера-воспроизведение файла сырых кадров с интерфейсом HikCamera."""
+
+    def __init__(self, config):
+        replay_config = config["replay_cam"]
+        self.path = replay_config["path"]
+        self.pacing = replay_config.get("pacing", "realtime")
+        self.speed = replay_config.get("speed", 4.0) if self.pacing == "accelerated" else 1.0
+        self.loop = replay_config.get("loop", False)
+        self.buffer_count = replay_config.get("buffer_count", 4)
+        self.output_mode = replay_config.get("output_mode", "bgr")
+
+        if self.pacing not in PACING_MODES:
+            raise ValueError(
+                f"Неизвестный темп воспроизведения: {self.pacing}. Доступны: {list(PACING_MODES)}"
+            )
+
+        self.reader = None
+        self.converter = None
+        self.pool = None  # Выходные буферы преобразования (None — кадры без копирования)
+        self.running = False
+        self.finished = False  # Файл воспроизведён до конца (без loop)
+        self.index = 0
+        self.frames_read = 0
+
+        self._last_lease = None
+        self._start_wall = 0.0
+        self._start_stamp = 0.0
+        self._fps_count = 0
+        self._fps_time = 0.0
+        self.fps = 0.0
+
+    def open(self):
+        self.reader = RawFrameReader(self.path)
+        pixel_format = next(
+            (name for name, value in PIXEL_FORMATS.items() if value == self.reader.pixel_type), None
+        )
+        if pixel_format is None:
+            self.reader.close()
+            raise ValueError(f"{self.path}: неподдерживаемый формат пикселей {self.reader.pixel_type:#x}")
+        self.converter = FrameConverter(pixel_format, self.output_mode)
+        logger.info(
+            f"Воспроизведение {self.path}: {len(self.reader)} кадров "
+            f"{self.reader.width}x{self.reader.height} {pixel_format}, темп {self.pacing}"
+        )
+
+    @property
+    def is_open(self):
+        return self.reader is not None
+
+    def start(self):
+        shape = self.converter.output_shape(self.reader.width, self.reader.height)
+        if shape is not None and self.pool is None:
+            # Сырые данные остаются в mmap — пулу нужны только выходные буферы
+            self.pool = FramePool(self.buffer_count, 0, shape)
+        self.running = True
+        self.finished = False
+        self._restart()
+
+    def _restart(self):
+        self.index = 0
+        self._start_wall = time.monotonic()
+        self._start_stamp = float(self.reader.records["timestamp"][0]) if len(self.reader) else 0.0
+
+    def read(self):
+        """(success, frame); кадр действителен до следующего вызова read()."""
+        if self._last_lease is not None:
+            self._last_lease.release()
+            self._last_lease = None
+        lease = self.read_lease()
+        if lease is None:
+            return False, None
+        self._last_lease = lease
+        return True, lease.frame
+
+    def read_lease(self, timeout_ms=1000):
+        """Следующий кадр файла в виде аренды (None — конец файла или нет буферов)."""
+        if not self.running or self.finished:
+            return None
+        if self.index >= len(self.reader):
+            if not self.loop or not len(self.reader):
+                self.finished = True
+                logger.info(f"Воспроизведение завершено: {self.frames_read} кадров")
+                return None
+            self._restart()
+
+        record = self.reader.records[self.index]
+        self._wait_until(float(record["timestamp"]))
+
+        if self.pool is not None:
+            lease = self.pool.acquire(timeout=timeout_ms / 1000)
+            if lease is None:
+                return None
+        else:
+            lease = FrameLease()
+
+        raw = self.reader.frame(self.index)
+        lease.raw = raw.reshape(-1)
+        lease.frame_num = int(record["frame_num"])
+        lease.device_timestamp = int(record["device_timestamp"])
+        lease.timestamp = time.monotonic()
+        lease.timing.received = time.perf_counter()
+        lease.info = (self.reader.width, self.reader.height, self.reader.pixel_type, int(record["data_len"]))
+        self.converter.convert(raw, self.reader.pixel_type, lease)
+        lease.timing.mark("demosaic", lease.timing.received)
+
+        self.index += 1
+        self.frames_read += 1
+        self._count_fps(lease.timestamp)
+        return lease
+
+    def _wait_until(self, stamp):
+        """Пауза до момента кадра по шкале записи (с учётом ускорения)."""
+        if self.pacing == "max":
+            return
+        due = self._start_wall + (stamp - self._start_stamp) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _count_fps(self, now):
+        self._fps_count += 1
+        if now - self._fps_time >= 1.0:
+            self.fps = self._fps_count / (now - self._fps_time)
+            self._fps_count = 0
+            self._fps_time = now
+
+    def stop(self):
+        if self._last_lease is not None:
+            self._last_lease.release()
+            self._last_lease = None
+        self.running = False
+
+    def release(self):
+        self.stop()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        self.pool = None
+
+    def get_fps(self):
+        return self.fps
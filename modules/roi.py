@@ -0,0 +1,77 @@
+# modules/roi.py
+"""
+Область интереса (ROI) кадра — участок ленты, где ведётся подсчёт.
+
+Детекция и подсчёт работают только с вырезанной областью (вид на кадр,
+без копирования); координаты результатов переводятся обратно
+в систему координат полного кадра сенсора. Кадр может быть уменьшен
+относительно сенсора (scale < 1) — координаты ROI пересчитываются.
+"""
+
+import numpy as np
+
+
+class Roi:
+    """Прямоугольная область [x1, y1, x2, y2] в координатах полного кадра."""
+
+    def __init__(self, x1, y1, x2, y2, margin=0):
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Некорректная ROI: [{x1}, {y1}, {x2}, {y2}]")
+        self.x1, self.y1, self.x2, self.y2 = int(x1), int(y1), int(x2), int(y2)
+        self.margin = int(margin)
+
+    @classmethod
+    def from_config(cls, config):
+        """ROI из раздела roi (None, если обрезка отключена или coords не заданы)."""
+        roi_config = config.get("roi", {})
+        coords = roi_config.get("coords")
+        if not coords or not roi_config.get("crop", True):
+            return None
+        return cls(*coords, margin=roi_config.get("margin", 0))
+
+    @property
+    def width(self):
+        return self.x2 - self.x1
+
+    @property
+    def height(self):
+        return self.y2 - self.y1
+
+    def bounds(self, frame_shape, scale=1.0):
+        """Границы области с учётом отступа (в пикселях кадра масштаба scale)."""
+        h, w = frame_shape[:2]
+        x1 = min(max(int((self.x1 - self.margin) * scale), 0), w)
+        y1 = min(max(int((self.y1 - self.margin) * scale), 0), h)
+        x2 = min(max(int((self.x2 + self.margin) * scale), x1), w)
+        y2 = min(max(int((self.y2 + self.margin) * scale), y1), h)
+        return x1, y1, x2, y2
+
+    def crop(self, frame, scale=1.0):
+        """Вырезка области из кадра. Возвращает (вид на кадр, (смещение x, смещение y))."""
+        x1, y1, x2, y2 = self.bounds(frame.shape, scale)
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    @staticmethod
+    def to_frame(boxes, offset, scale=1.0):
+        """
+        Перевод рамок [x1, y1, x2, y2, ...] из координат области кадра масштаба scale
+        в координаты полного кадра сенсора.
+        """
+        if len(boxes) == 0 or (offset == (0, 0) and scale == 1.0):
+            return boxes
+        boxes = boxes.copy()
+        boxes[:, [0, 2]] += offset[0]
+        boxes[:, [1, 3]] += offset[1]
+        if scale != 1.0:
+            boxes[:, :4] /= scale
+        return boxes
+
+    def contains(self, points):
+        """Маска точек (N, 2), попадающих в область (без отступа)."""
+        points = np.asarray(points)
+        return (
+            (points[:, 0] >= self.x1)
+            & (points[:, 0] < self.x2)
+            & (points[:, 1] >= self.y1)
+            & (points[:, 1] < self.y2)
+        )
@@ -0,0 +1,123 @@
+# modules/servo_telemetry.py
+"""
+Фоновый опрос состояния сервопривода Delta ASDA.
+
+Отдельный поток с заданным периодом блочно читает регистр ошибки P0-01
+и регистры мониторинга (фактическая скорость, нагрузка) и публикует
+неизменяемый снимок ServoSnapshot. GUI и логика подсчёта читают
+последний снимок, не обращаясь к шине. Доступ к шине идёт через
+RegisterMap сервопривода и сериализуется с командами управления.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Снимок состояния привода. error_code/speed/load — None, если связи нет
+ServoSnapshot = namedtuple(
+    "ServoSnapshot",
+    ["timestamp", "connected", "error_code", "speed", "load", "poll_ms"],
+)
+
+EMPTY_SNAPSHOT = ServoSnapshot(0.0, False, None, None, None, 0.0)
+
+
+def _signed(value):
+    """16-битное значение регистра → знаковое целое."""
+    return value - 0x10000 if value >= 0x8000 else value
+
+
+class ServoTelemetry(threading.Thread):
+    """Поток опроса регистров состояния привода."""
+
+    def __init__(self, servo, config):
+        """Инициализация из раздела modbus.telemetry."""
+        super().__init__(name="servo-telemetry", daemon=True)
+        tele_config = config.get("modbus", {}).get("telemetry", {})
+        self.servo = servo
+        self.period = tele_config.get("period", 0.2)
+        self.speed_scale = tele_config.get("speed_scale", 1.0)
+        self.registers = {
+            "error": servo.REGISTERS["ERROR"],
+            # P0-09/P0-10: регистры мониторинга; отображаемые величины задаются в приводе
+            "speed": tele_config.get("speed_register", 9),
+            "load": tele_config.get("load_register", 10),
+        }
+
+        self.snapshot = EMPTY_SNAPSHOT
+        self.polls = 0
+        self.failures = 0
+        self._fault_listeners = []
+        self._stop_event = threading.Event()
+
+    def add_fault_listener(self, callback):
+        """callback(snapshot) вызывается (в потоке опроса) при появлении ошибки привода."""
+        self._fault_listeners.append(callback)
+
+    def run(self):
+        logger.info(f"Телеметрия привода: опрос каждые {self.period * 1000:.0f} мс")
+        next_poll = time.monotonic()
+        while not self._stop_event.is_set():
+            self._poll()
+            next_poll += self.period
+            delay = next_poll - time.monotonic()
+            if delay < 0:
+                # Шина не успевает: опрос сразу, без накопления отставания
+                next_poll = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def _poll(self):
+        started = time.perf_counter()
+        try:
+            values = self.servo.registers.read_block(self.registers.values())
+        except Exception as e:
+            self.failures += 1
+            if self.snapshot.connected:
+                logger.error(f"Телеметрия: нет ответа привода: {e}")
+            self._publish(ServoSnapshot(time.monotonic(), False, None, None, None, 0.0))
+            return
+
+        poll_ms = (time.perf_counter() - started) * 1000
+        self.polls += 1
+        self._publish(
+            ServoSnapshot(
+                timestamp=time.monotonic(),
+                connected=True,
+                error_code=values[self.registers["error"]],
+                speed=_signed(values[self.registers["speed"]]) * self.speed_scale,
+                load=_signed(values[self.registers["load"]]),
+                poll_ms=poll_ms,
+            )
+        )
+
+    def _publish(self, snapshot):
+        """Публикация снимка (замена ссылки атомарна) и оповещение об ошибке привода."""
+        previous, self.snapshot = self.snapshot, snapshot
+        if snapshot.error_code and snapshot.error_code != previous.error_code:
+            logger.error(f"Ошибка привода: код {snapshot.error_code}")
+            for callback in self._fault_listeners:
+                try:
+                    callback(snapshot)
+                except Exception:
+                    logger.exception("Ошибка обработчика неисправности привода")
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def create_servo_telemetry(config, servo):
+    """Создание и запуск опроса, если он включён и привод подключён (иначе None)."""
+    if not config.get("modbus", {}).get("telemetry", {}).get("enable", False):
+        return None
+    if not (servo and servo.connected):
+        logger.warning("Телеметрия привода не запущена: нет подключения")
+        return None
+    telemetry = ServoTelemetry(servo, config)
+    telemetry.start()
+    return telemetry
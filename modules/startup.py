@@ -0,0 +1,98 @@
+# modules/startup.py
+"""
+Параллельный запуск камеры, сервопривода и RP2040 с отчётом о времени.
+
+Каждое устройство поднимается в своём потоке: импорт реализации
+(SDK камеры), создание объекта, открытие камеры (поиск и подключение)
+или порта и первый обмен. Устройство,
+которое не отвечает, ждёт свой таймаут, не задерживая остальные, —
+холодный старт длится столько, сколько самое медленное устройство,
+а не сумму всех таймаутов.
+"""
+
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .backends import get_servo, get_vibro
+from .camera import get_camera
+
+logger = logging.getLogger(__name__)
+
+# Итог запуска одного устройства: объект (None при ошибке создания), готовность, время, пояснение
+StartupResult = namedtuple("StartupResult", ["name", "device", "ok", "elapsed_ms", "detail"])
+
+
+def _start_camera(config):
+    camera = get_camera(config)
+    try:
+        camera.open()
+    except Exception as e:
+        # Камера не найдена, нет файла — в отчёт; CaptureStage повторяет открытие сам
+        return camera, False, str(e)
+    return camera, True, config["camera"]["type"]
+
+
+def _start_servo(config):
+    servo = get_servo(config)
+    if not servo.connect():
+        return servo, False, "порт недоступен"
+    # Первый обмен: неподключённый привод проявляется таймаутом здесь, а не в GUI
+    version = servo.read_version()
+    if version is None:
+        return servo, False, f"нет ответа ({config['modbus']['port']})"
+    return servo, True, f"{config['modbus']['port']}, версия ПО {version}"
+
+
+def _start_vibro(config):
+    rp2040 = get_vibro(config)
+    if not rp2040.connect():
+        return rp2040, False, "порт недоступен"
+    return rp2040, True, f"{config['uart']['port']}, {rp2040.default_freq} Гц, {rp2040.default_duty}%"
+
+
+STARTUP_TASKS = {
+    "camera": ("Камера", _start_camera),
+    "servo": ("Сервопривод", _start_servo),
+    "rp2040": ("RP2040", _start_vibro),
+}
+
+
+def _timed(name, func, config):
+    started = time.perf_counter()
+    try:
+        device, ok, detail = func(config)
+    except Exception as e:
+        logger.exception(f"{STARTUP_TASKS[name][0]}: ошибка создания")
+        device, ok, detail = None, False, str(e)
+    return StartupResult(name, device, ok, (time.perf_counter() - started) * 1000, detail)
+
+
+def bring_up(config):
+    """
+    Параллельный запуск устройств. Возвращает словарь {имя: StartupResult}.
+    Отказ любого устройства только отмечается в отчёте: приложение
+    запускается с остальными. device равен None, только если объект
+    не удалось создать (например, неизвестный тип или нет SDK камеры).
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(STARTUP_TASKS), thread_name_prefix="startup") as pool:
+        futures = {
+            name: pool.submit(_timed, name, func, config) for name, (_, func) in STARTUP_TASKS.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    total_ms = (time.perf_counter() - started) * 1000
+    log_report(results, total_ms)
+    return results
+
+
+def log_report(results, total_ms):
+    """Отчёт о запуске: время каждого устройства и выигрыш от параллельности."""
+    serial_ms = sum(result.elapsed_ms for result in results.values())
+    for name, result in results.items():
+        title = STARTUP_TASKS[name][0]
+        status = "готов" if result.ok else "НЕ ГОТОВ"
+        log = logger.info if result.ok else logger.warning
+        log(f"{title}: {status} за {result.elapsed_ms:.0f} мс ({result.detail})")
+    logger.info(f"Устройства запущены за {total_ms:.0f} мс (последовательно: {serial_ms:.0f} мс)")
@@ -0,0 +1,525 @@
+# modules/supervisor.py
+"""
+Супервизор нескольких линий: по рабочему процессу на конвейер.
+
+Файл линий (lines.yaml) задаёт общую конфигурацию (base) и для каждой
+линии — дополнения к ней (порты, камера, ROI) и ядра процессора (cpus).
+Каждая линия работает в своём процессе в режиме без GUI (HeadlessApp):
+своя камера, сервопривод и RP2040, свой GIL и свои потоки детекции.
+Процесс закрепляется за ядрами (os.sched_setaffinity, где доступно),
+число потоков OpenCV/OpenMP ограничивается их количеством — всплеск
+нагрузки детекции на одной линии не отнимает процессор у другой.
+
+Рабочие процессы периодически присылают статистику; супервизор сводит
+счёт и состояние линий в общую панель: таблица в логе и локальная
+HTTP-страница (GET / — таблица, GET /status — JSON, POST /command —
+команда "линия команда", линия all — всем). Упавший процесс
+перезапускается.
+
+Запуск: python -m modules.supervisor --lines lines.yaml
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+from .utils import load_config, merge_config, setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Переменные окружения, ограничивающие потоки библиотек вычислений в процессе линии
+THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def available_cpus():
+    """Ядра, доступные процессу (с учётом уже заданного закрепления)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(requested, available):
+    """
+    Ядра для каждой линии: {линия: список ядер или None}.
+    requested — {линия: список | "auto" | None}; явные списки ограничиваются
+    доступными ядрами (если не осталось ни одного — как "auto"),
+    "auto" делят оставшиеся ядра поровну непрерывными блоками,
+    None — без закрепления. Линии с общими ядрами — предупреждение в лог.
+    """
+    requested = dict(requested)
+    assigned = {}
+    for name, cpus in requested.items():
+        if not isinstance(cpus, (list, tuple)):
+            continue
+        present = [cpu for cpu in cpus if cpu in available]
+        if len(present) < len(cpus):
+            missing = sorted(set(cpus) - set(present))
+            logger.warning(f"Линия {name}: ядер {missing} нет среди доступных {list(available)}")
+        if present:
+            assigned[name] = present
+        else:
+            requested[name] = "auto"
+    used = set(itertools.chain.from_iterable(assigned.values()))
+    auto = [name for name, cpus in requested.items() if cpus == "auto"]
+    free = [cpu for cpu in available if cpu not in used] or list(available)
+    if auto:
+        share = max(1, len(free) // len(auto))
+        for i, name in enumerate(auto):
+            block = free[i * share:(i + 1) * share]
+            # Ядер меньше, чем линий: линии делят ядра по кругу
+            assigned[name] = block or [free[i % len(free)]]
+    for name in requested:
+        assigned.setdefault(name, None)
+
+    pinned = [(name, set(cpus)) for name, cpus in assigned.items() if cpus]
+    for i, (name, cpus) in enumerate(pinned):
+        for other, other_cpus in pinned[i + 1:]:
+            shared = cpus & other_cpus
+            if shared:
+                logger.warning(f"Линии {name} и {other} делят ядра {sorted(shared)}: нагрузка одной замедлит другую")
+    return assigned
+
+
+def pin_process(cpus):
+    """Закрепление текущего процесса за ядрами и ограничение числа потоков библиотек."""
+    for name in THREAD_ENV:
+        os.environ[name] = str(len(cpus))
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+        return True
+    logger.warning("Закрепление за ядрами недоступно на этой платформе: ограничено только число потоков")
+    return False
+
+
+def run_line(name, config, cpus, status_queue, command_queue, status_interval, log_dir):
+    """Рабочий процесс линии: устройства, конвейер подсчёта, отчёты супервизору."""
+    os.makedirs(log_dir, exist_ok=True)
+    setup_logging(os.path.join(log_dir, f"{name}.log"), name)
+    if cpus:
+        pin_process(cpus)
+
+    # Тяжёлые модули — только в рабочем процессе, после ограничения потоков
+    import cv2
+
+    from .headless import HeadlessApp
+    from .startup import bring_up
+
+    if cpus:
+        cv2.setNumThreads(len(cpus))
+    status_queue.put(("state", name, {"state": "starting", "pid": os.getpid(), "cpus": cpus}))
+
+    # Неподключённое устройство не мешает запуску: линия работает с остальными (degraded),
+    # камера открывается повторно в CaptureStage
+    devices = bring_up(config)
+    startup = {key: {"ok": result.ok, "ms": round(result.elapsed_ms), "detail": result.detail}
+               for key, result in devices.items()}
+    if devices["camera"].device is None:
+        # Объект камеры не создан (тип, SDK) — перезапуск не поможет
+        logger.error(f"Линия не запущена: камера не создана ({devices['camera'].detail})")
+        status_queue.put(("state", name, {"state": "failed", "error": devices["camera"].detail, "startup": startup}))
+        return
+
+    app = HeadlessApp(config, devices["camera"].device, devices["servo"].device, devices["rp2040"].device)
+    app.start()
+    state = "running" if all(result.ok for result in devices.values()) else "degraded"
+    status_queue.put(("state", name, {"state": state, "startup": startup}))
+
+    reporter = threading.Thread(
+        target=_report_loop, args=(name, app, status_queue, command_queue, status_interval),
+        name="line-reporter", daemon=True,
+    )
+    reporter.start()
+    try:
+        app.run()
+    finally:
+        app.stop()
+        status_queue.put(("stats", name, app.stats()))
+        status_queue.put(("state", name, {"state": "stopped"}))
+
+
+def _report_loop(name, app, status_queue, command_queue, interval):
+    """Поток рабочего процесса: статистика каждые interval сек и выполнение команд супервизора."""
+    next_report = time.monotonic()
+    while not app.stopped:
+        timeout = max(0.0, next_report - time.monotonic())
+        try:
+            request_id, command = command_queue.get(timeout=timeout)
+        except queue.Empty:
+            pass
+        except (EOFError, OSError):
+            break  # Супервизор завершился
+        else:
+            status_queue.put(("reply", name, request_id, app.execute(command)))
+        if time.monotonic() >= next_report:
+            next_report += interval
+            status_queue.put(("stats", name, app.stats()))
+
+
+class LineSupervisor:
+    """Запуск, контроль и перезапуск процессов линий; сводная панель."""
+
+    def __init__(self, lines_path):
+        with open(lines_path, "r", encoding="utf-8") as f:
+            spec = yaml.safe_load(f)
+        base_dir = os.path.dirname(os.path.abspath(lines_path))
+        base = load_config(os.path.join(base_dir, spec.get("base", "config.yaml")))
+        base = merge_config(base, spec.get("common"))
+
+        sup_config = spec.get("supervisor", {})
+        self.status_interval = sup_config.get("status_interval", 2.0)
+        self.dashboard_interval = sup_config.get("dashboard_interval", 10.0)
+        self.stale_after = sup_config.get("stale_after", 3 * self.status_interval)
+        self.restart = sup_config.get("restart", True)
+        self.restart_delay = sup_config.get("restart_delay", 5.0)
+        self.http_address = sup_config.get("http")
+        self.log_dir = sup_config.get("log_dir", "logs")
+        default_cpus = "auto" if sup_config.get("pin_cpus", True) else None
+
+        self.configs = {}
+        requested = {}
+        for name, line in (spec.get("lines") or {}).items():
+            line = dict(line or {})
+            requested[name] = line.pop("cpus", default_cpus)
+            self.configs[name] = self._line_config(name, base, line)
+        if not self.configs:
+            raise ValueError(f"В {lines_path} нет ни одной линии (раздел lines)")
+        self.cpus = assign_cpus(requested, available_cpus())
+
+        # spawn — одинаково на Windows и Linux, без копии потоков супервизора в рабочем процессе
+        self._context = multiprocessing.get_context("spawn")
+        self._status_queue = self._context.Queue()
+        self._processes = {}
+        self._command_queues = {}
+        self._status = {name: {"state": "new", "restarts": 0, "updated": 0.0} for name in self.configs}
+        self._restart_at = {}
+        self._replies = {}
+        self._reply_cond = threading.Condition()
+        self._request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._http = None
+
+    @staticmethod
+    def _line_config(name, base, override):
+        """Конфигурация линии: base + дополнения; каталоги и сокет — свои для каждой линии."""
+        config = merge_config(base, override)
+        separate = {
+            "recorder": {"output_dir": os.path.join(base.get("recorder", {}).get("output_dir", "recordings"), name)},
+            "timing": {"dump_dir": os.path.join(base.get("timing", {}).get("dump_dir", "timing"), name)},
+            # Сокет включается только явно в разделе линии: общий адрес был бы занят первой линией
+            "headless": {"socket": None, "console": False, "stats_interval": 0},
+        }
+        for section, values in separate.items():
+            for key, value in values.items():
+                if key not in (override.get(section) or {}):
+                    config = merge_config(config, {section: {key: value}})
+        return config
+
+    # --- Процессы линий ---
+
+    def start(self):
+        for name in self.configs:
+            self._spawn(name)
+        threading.Thread(target=self._collect, name="supervisor-collect", daemon=True).start()
+        self._start_http()
+        logger.info(f"Супервизор: линий {len(self.configs)}, ядра {self.cpus}")
+
+    def _spawn(self, name):
+        command_queue = self._context.Queue()
+        process = self._context.Process(
+            target=run_line,
+            args=(name, self.configs[name], self.cpus[name], self._status_queue, command_queue,
+                  self.status_interval, self.log_dir),
+            name=f"line-{name}",
+        )
+        process.start()
+        with self._lock:
+            self._processes[name] = process
+            self._command_queues[name] = command_queue
+            self._status[name].update(state="spawned", pid=process.pid, updated=time.monotonic())
+        logger.info(f"Линия {name}: процесс {process.pid}, ядра {self.cpus[name] or 'все'}")
+
+    def _collect(self):
+        """Приём отчётов рабочих процессов."""
+        while not self._stop_event.is_set():
+            try:
+                message = self._status_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            kind, name = message[0], message[1]
+            if kind == "reply":
+                with self._reply_cond:
+                    self._replies[message[2]] = message[3]
+                    self._reply_cond.notify_all()
+                continue
+            with self._lock:
+                status = self._status[name]
+                if kind == "state":
+                    status.update(message[2])
+                    if message[2].get("state") == "failed":
+                        logger.error(f"Линия {name}: ошибка запуска: {message[2].get('error')}")
+                else:
+                    status["stats"] = message[2]
+                status["updated"] = time.monotonic()
+
+    def _check_processes(self):
+        """Обнаружение упавших процессов и перезапуск с задержкой."""
+        now = time.monotonic()
+        for name, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            with self._lock:
+                status = self._status[name]
+                if status["state"] not in ("stopped", "dead", "failed"):
+                    logger.error(f"Линия {name}: процесс {process.pid} завершился с кодом {process.exitcode}")
+                    status["state"] = "dead"
+                # failed — ошибка конфигурации: перезапуск её не исправит
+                if status["state"] in ("stopped", "failed") or not self.restart:
+                    continue
+                restart_at = self._restart_at.setdefault(name, now + self.restart_delay)
+                if now < restart_at:
+                    continue
+                del self._restart_at[name]
+                status["restarts"] += 1
+            logger.warning(f"Линия {name}: перезапуск")
+            self._spawn(name)
+
+    def run(self):
+        """Основной цикл: контроль процессов и сводка в лог до сигнала остановки."""
+        for sig in ("SIGINT", "SIGTERM"):
+            if hasattr(signal, sig):
+                signal.signal(getattr(signal, sig), lambda signum, frame: self._stop_event.set())
+        next_dashboard = time.monotonic() + self.dashboard_interval
+        while not self._stop_event.wait(0.5):
+            self._check_processes()
+            if all(status["state"] in ("stopped", "failed") for status in self._status.values()):
+                logger.info("Все линии остановлены")
+                break
+            if time.monotonic() >= next_dashboard:
+                next_dashboard += self.dashboard_interval
+                self.log_dashboard()
+        self.log_dashboard()
+
+    def stop(self, timeout=10.0):
+        """Остановка линий: команда quit, ожидание, при необходимости — принудительно."""
+        self._stop_event.set()
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        for name, command_queue in self._command_queues.items():
+            if self._processes[name].is_alive():
+                command_queue.put((0, "quit"))
+        deadline = time.monotonic() + timeout
+        for name, process in self._processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Линия {name}: не остановилась за {timeout:.0f} с, процесс завершается принудительно")
+                process.terminate()
+                process.join(2.0)
+        logger.info("Супервизор остановлен")
+
+    def execute(self, line, command, timeout=5.0):
+        """Команда линии (или all — всем линиям). Возвращает {линия: ответ}."""
+        names = list(self.configs) if line == "all" else [line]
+        pending = {}
+        for name in names:
+            command_queue = self._command_queues.get(name)
+            if command_queue is None or not self._processes[name].is_alive():
+                pending[name] = None
+                continue
+            request_id = next(self._request_ids)
+            command_queue.put((request_id, command))
+            pending[name] = request_id
+        replies = {}
+        deadline = time.monotonic() + timeout
+        with self._reply_cond:
+            for name, request_id in pending.items():
+                if request_id is None:
+                    replies[name] = {"ok": False, "error": "линия не работает" if name in self.configs else "нет такой линии"}
+                    continue
+                self._reply_cond.wait_for(lambda: request_id in self._replies, max(0.0, deadline - time.monotonic()))
+                replies[name] = self._replies.pop(request_id, {"ok": False, "error": "нет ответа"})
+        return replies
+
+    # --- Сводная панель ---
+
+    def dashboard(self):
+        """Счёт и состояние всех линий и итог по цеху."""
+        now = time.monotonic()
+        lines = {}
+        total_count, total_rate = 0, 0.0
+        with self._lock:
+            for name, status in self._status.items():
+                stats = status.get("stats") or {}
+                age = now - status["updated"] if status["updated"] else None
+                devices = status.get("startup") or {}
+                servo = stats.get("servo") or {}
+                # Без кадров линия не считает: такие проблемы — down, остальные — warning
+                stalled = []
+                if stats.get("capture_alive") is False:
+                    stalled.append("захват остановлен")
+                elif stats.get("camera_error"):
+                    stalled.append(f"камера: {stats['camera_error']}")
+                elif stats.get("capture_fps") == 0 and stats.get("uptime_s", 0) > self.stale_after:
+                    stalled.append("нет кадров")
+                if stats.get("process_alive") is False:
+                    stalled.append("обработка остановлена")
+                # Состояние камеры после запуска берётся из отчёта (CaptureStage повторяет открытие)
+                problems = stalled + [
+                    key for key, result in devices.items()
+                    if not result["ok"] and not (key == "camera" and "camera_ready" in stats)
+                ]
+                if servo.get("error_code"):
+                    problems.append(f"servo error {servo['error_code']}")
+                live = status["state"] in ("running", "degraded")
+                if live and age is not None and age > self.stale_after:
+                    problems.append("нет отчётов")
+                if not live or stalled:
+                    health = "down"
+                else:
+                    health = "warning" if problems else "ok"
+                lines[name] = {
+                    "state": status["state"],
+                    "health": health,
+                    "problems": problems,
+                    "pid": status.get("pid"),
+                    "cpus": self.cpus[name],
+                    "restarts": status["restarts"],
+                    "report_age_s": round(age, 1) if age is not None else None,
+                    "count": stats.get("count"),
+                    "parts_per_min": stats.get("parts_per_min"),
+                    "capture_fps": stats.get("capture_fps"),
+                    "dropped": stats.get("dropped"),
+                    "latency_p95_ms": (stats.get("latency_p95_ms") or {}).get("counted"),
+                    "startup": devices,
+                }
+                total_count += stats.get("count") or 0
+                total_rate += stats.get("parts_per_min") or 0.0
+        return {
+            "lines": lines,
+            "total": {"count": total_count, "parts_per_min": round(total_rate, 1)},
+        }
+
+    def log_dashboard(self):
+        board = self.dashboard()
+        rows = [f"{'линия':<10}{'сост.':<10}{'здоровье':<10}{'детали':>8}{'шт/мин':>9}{'кадр/с':>8}{'p95 мс':>8}  ядра"]
+        for name, line in board["lines"].items():
+            rows.append(
+                f"{name:<10}{line['state']:<10}{line['health']:<10}"
+                f"{_fmt(line['count']):>8}{_fmt(line['parts_per_min']):>9}{_fmt(line['capture_fps']):>8}"
+                f"{_fmt(line['latency_p95_ms']):>8}  {line['cpus'] or 'все'}"
+                + (f"  ({', '.join(line['problems'])})" if line["problems"] else "")
+            )
+        total = board["total"]
+        rows.append(f"{'итого':<30}{total['count']:>8}{total['parts_per_min']:>9}")
+        logger.info("Сводка линий:\n" + "\n".join(rows))
+
+    def _start_http(self):
+        if not self.http_address:
+            return
+        host, _, port = str(self.http_address).rpartition(":")
+        handler = type("Handler", (_DashboardHandler,), {"supervisor": self})
+        try:
+            self._http = ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+        except OSError as e:
+            logger.error(f"Панель супервизора {self.http_address} не запущена: {e}")
+            return
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, name="supervisor-http", daemon=True).start()
+        logger.info(f"Панель супервизора: http://{host or '127.0.0.1'}:{port}/")
+
+
+def _fmt(value):
+    if value is None:
+        return "—"
+    return f"{value:.1f}" if isinstance(value, float) else str(value)
+
+
+class _DashboardHandler(BaseHTTPRequestHandler):
+    """HTTP-панель: таблица линий, JSON состояния и отправка команд."""
+
+    supervisor = None
+
+    def do_GET(self):
+        if self.path.startswith("/status"):
+            self._send(200, "application/json", json.dumps(self.supervisor.dashboard(), ensure_ascii=False))
+        elif self.path in ("/", "/index.html"):
+            self._send(200, "text/html", self._html())
+        else:
+            self._send(404, "text/plain", "not found")
+
+    def do_POST(self):
+        if not self.path.startswith("/command"):
+            self._send(404, "text/plain", "not found")
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8").strip()
+        line, _, command = body.partition(" ")
+        if not command:
+            self._send(400, "application/json", json.dumps({"ok": False, "error": "формат: <линия|all> <команда>"}))
+            return
+        replies = self.supervisor.execute(line, command)
+        self._send(200, "application/json", json.dumps(replies, ensure_ascii=False))
+
+    def _html(self):
+        board = self.supervisor.dashboard()
+        colors = {"ok": "#c8f7c5", "warning": "#fdf2b3", "down": "#f7c5c5"}
+        rows = "".join(
+            f"<tr style='background:{colors[line['health']]}'><td>{name}</td><td>{line['state']}</td>"
+            f"<td>{_fmt(line['count'])}</td><td>{_fmt(line['parts_per_min'])}</td>"
+            f"<td>{_fmt(line['capture_fps'])}</td><td>{_fmt(line['latency_p95_ms'])}</td>"
+            f"<td>{line['cpus'] or 'все'}</td><td>{line['restarts']}</td><td>{', '.join(line['problems'])}</td></tr>"
+            for name, line in board["lines"].items()
+        )
+        total = board["total"]
+        return (
+            "<html><head><meta charset='utf-8'><meta http-equiv='refresh' content='2'>"
+            "<title>Линии конвейера</title></head><body style='font-family:sans-serif'>"
+            "<h2>Линии конвейера</h2><table border='1' cellpadding='6' style='border-collapse:collapse'>"
+            "<tr><th>Линия</th><th>Состояние</th><th>Детали</th><th>шт/мин</th><th>кадр/с</th>"
+            "<th>p95 подсчёта, мс</th><th>Ядра</th><th>Перезапуски</th><th>Проблемы</th></tr>"
+            f"{rows}<tr><th>Итого</th><td></td><th>{total['count']}</th><th>{total['parts_per_min']}</th>"
+            "<td colspan='5'></td></tr></table></body></html>"
+        )
+
+    def _send(self, code, content_type, text):
+        data = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"HTTP: {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Супервизор линий конвейера (процесс на линию)")
+    parser.add_argument("--lines", default="lines.yaml", help="Файл описания линий")
+    args = parser.parse_args()
+
+    setup_logging("supervisor.log", "supervisor")
+    supervisor = LineSupervisor(args.lines)
+    supervisor.start()
+    try:
+        supervisor.run()
+    finally:
+        supervisor.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# modules/synthetic_camera.py
+"""
+Синтетическая камера: детали, движущиеся по ленте, с истинным счётом.
+
+Сцена задаётся разделом synthetic_cam: скорость ленты, средний
+промежуток между деталями, доля касающихся друг друга пар, размер
+деталей, шум сенсора, неравномерность освещения и мерцание.
+Истинный счёт (ground_truth) — число деталей, центр которых пересёк
+линию подсчёта (counting.line_position), поэтому по нему можно
+проверять точность детекции и подсчёта без камеры и без ленты.
+
+Кадры рисуются в буферы FramePool (без выделения памяти на кадр);
+шум берётся из заранее сгенерированного банка со случайным смещением.
+"""
+
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from .frame_pool import FramePool
+
+logger = logging.getLogger(__name__)
+
+
+class SyntheticCamera:
+    """Генератор кадров конвейера с интерфейсом камеры (open/start/read_lease/stop/release)."""
+
+    def __init__(self, config):
+        syn_config = config.get("synthetic_cam", {})
+        self.width = syn_config.get("width", 1280)
+        self.height = syn_config.get("height", 720)
+        self.color = syn_config.get("color", True)
+        self.fps_limit = syn_config.get("fps", 0)  # 0 — без ограничения
+        self.buffer_count = syn_config.get("buffer_count", 4)
+
+        self.speed = syn_config.get("belt_speed", 12.0)  # px/кадр вдоль оси x
+        self.spacing = syn_config.get("spacing", 120.0)  # Средний промежуток между деталями (px)
+        self.min_gap = syn_config.get("min_gap", 10.0)
+        self.touching = syn_config.get("touching", 0.0)  # Доля деталей, касающихся предыдущей
+        self.part_size = syn_config.get("part_size", [40, 70])  # Мин./макс. размер (px)
+        self.belt_level = syn_config.get("belt_level", 50)
+        self.part_level = syn_config.get("part_level", 200)
+        self.noise = syn_config.get("noise", 6.0)  # СКО шума (уровни яркости)
+        self.lighting = syn_config.get("lighting", 0.3)  # Спад освещённости к краям (0 — равномерно)
+        self.flicker = syn_config.get("flicker", 0.0)  # Амплитуда мерцания (доля яркости)
+        self.total_parts = syn_config.get("total_parts", 0)  # 0 — бесконечно
+
+        roi = config.get("roi", {}).get("coords", [0, 0, self.width, self.height])
+        self.lane = syn_config.get("lane", [roi[1], roi[3]])  # Полоса ленты по y
+        line = config.get("counting", {}).get("line_position")
+        self.line = float(line) if line is not None else (roi[0] + roi[2]) / 2
+
+        self.rng = np.random.default_rng(syn_config.get("seed", 1))
+        self.pool = None
+        self.running = False
+        self.finished = False
+        self.fps = 0.0
+
+        self.parts = np.zeros((0, 4), dtype=np.float32)  # x, y, w, h (левый верхний угол)
+        self.spawned = 0
+        self.ground_truth = 0
+        self.frame_num = 0
+        self._next_spawn = 0.0  # Расстояние, которое должна пройти лента до следующей детали
+        self._background = None
+        self._noise_bank = None
+        self._start_time = 0.0
+
+    def open(self):
+        shape = (self.height, self.width, 3) if self.color else (self.height, self.width)
+        # Неравномерное освещение: яркость спадает к краям кадра
+        xs = np.linspace(-1.0, 1.0, self.width, dtype=np.float32)
+        ys = np.linspace(-1.0, 1.0, self.height, dtype=np.float32)
+        light = 1.0 - self.lighting * 0.5 * (xs[None, :] ** 2 + ys[:, None] ** 2)
+        background = np.clip(self.belt_level * light, 0, 255).astype(np.uint8)
+        self._background = cv2.merge([background] * 3) if self.color else background
+        if self.noise > 0:
+            bank_shape = (self.height * 2,) + shape[1:]
+            noise = self.rng.normal(0, self.noise, bank_shape)
+            # Пара банков (+ и −): шум добавляется насыщающими cv2.add/cv2.subtract
+            self._noise_bank = (
+                np.clip(noise, 0, 255).astype(np.uint8),
+                np.clip(-noise, 0, 255).astype(np.uint8),
+            )
+        self.pool = FramePool(self.buffer_count, 0, shape)
+        logger.info(
+            f"Синтетическая камера: {self.width}x{self.height}, лента {self.speed} px/кадр, "
+            f"промежуток {self.spacing} px, касающихся {self.touching:.0%}"
+        )
+
+    @property
+    def is_open(self):
+        return self.pool is not None
+
+    def start(self):
+        self.running = True
+        self.finished = False
+        self._start_time = time.monotonic()
+
+    def read(self):
+        lease = self.read_lease()
+        if lease is None:
+            return False, None
+        # Кадр копируется: без аренды буфер мог бы быть перезаписан
+        frame = lease.frame.copy()
+        lease.release()
+        return True, frame
+
+    def read_lease(self, timeout_ms=1000):
+        if not self.running or self.finished:
+            return None
+        if self.fps_limit:
+            due = self._start_time + self.frame_num / self.fps_limit
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        lease = self.pool.acquire(timeout=timeout_ms / 1000)
+        if lease is None:
+            return None
+
+        self._advance()
+        self._render(lease.frame)
+        lease.frame_num = self.frame_num
+        lease.timestamp = time.monotonic()
+        lease.scale = 1.0
+        self.frame_num += 1
+        elapsed = lease.timestamp - self._start_time
+        self.fps = self.frame_num / elapsed if elapsed > 0 else 0.0
+
+        if self.total_parts and self.spawned >= self.total_parts and not len(self.parts):
+            self.finished = True
+            logger.info(f"Синтетическая сцена завершена: {self.ground_truth} деталей, {self.frame_num} кадров")
+        return lease
+
+    def _advance(self):
+        """Сдвиг деталей, учёт пересечений линии, удаление ушедших и появление новых."""
+        parts = self.parts
+        if len(parts):
+            before = parts[:, 0] + parts[:, 2] / 2
+            parts[:, 0] += self.speed
+            after = parts[:, 0] + parts[:, 2] / 2
+            self.ground_truth += int(((before < self.line) & (after >= self.line)).sum())
+            self.parts = parts[parts[:, 0] < self.width]
+
+        self._next_spawn -= self.speed
+        while self._next_spawn <= 0 and not (self.total_parts and self.spawned >= self.total_parts):
+            self._spawn()
+
+    def _spawn(self):
+        low, high = self.part_size
+        w, h = self.rng.uniform(low, high, 2)
+        lane_low, lane_high = self.lane
+        y = self.rng.uniform(lane_low, max(lane_low, lane_high - h))
+        # Новая деталь появляется за левым краем с учётом уже пройденного лентой пути
+        x = -w - self._next_spawn
+        self.parts = np.vstack((self.parts, np.array([[x, y, w, h]], dtype=np.float32)))
+        self.spawned += 1
+
+        if self.rng.random() < self.touching:
+            # Следующая деталь вплотную к этой: для детектора это одна связная область
+            gap = -1.0
+        else:
+            gap = max(self.min_gap, self.rng.exponential(self.spacing))
+        self._next_spawn += w + gap
+
+    def _render(self, frame):
+        """Кадр: фон с освещением, детали, мерцание и шум — в буфер пула."""
+        if self.flicker:
+            gain = 1.0 + self.flicker * np.sin(self.frame_num * 0.7)
+            cv2.convertScaleAbs(self._background, frame, alpha=gain)
+        else:
+            np.copyto(frame, self._background)
+
+        color = (self.part_level,) * 3 if self.color else self.part_level
+        for x, y, w, h in self.parts:
+            center = (int(x + w / 2), int(y + h / 2))
+            cv2.ellipse(frame, center, (int(w / 2), int(h / 2)), 0, 0, 360, color, -1)
+
+        if self._noise_bank is not None:
+            plus, minus = self._noise_bank
+            offset = int(self.rng.integers(0, self.height))
+            cv2.add(frame, plus[offset:offset + self.height], dst=frame)
+            offset = int(self.rng.integers(0, self.height))
+            cv2.subtract(frame, minus[offset:offset + self.height], dst=frame)
+
+    def stop(self):
+        self.running = False
+
+    def release(self):
+        self.stop()
+        self.pool = None
+
+    def get_fps(self):
+        return self.fps
@@ -1,7 +1,11 @@
-# modules/utils.py: Вспомогательные функции (чтение YAML, логирование)
+# modules/utils.py: Вспомогательные функции (чтение и правка YAML, логирование, измерение скорости событий)
 
 import yaml
 import logging
+import re
+import threading
+import time
+from collections import deque
 
 def load_config(config_path='config.yaml'):
     """Загружает конфигурацию из YAML-файла."""
@@ -19,13 +23,93 @@ def load_config(config_path='config.yaml'):
         logging.error(f"Ошибка парсинга YAML: {e}")
         raise
 
-def setup_logging():
-    """Настройка логирования с явной поддержкой UTF-8."""
+def update_config_values(section, values, config_path='config.yaml'):
+    """
+    Запись значений {ключ: значение} в раздел section файла конфигурации.
+    Правка построчная: комментарии и порядок ключей сохраняются.
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    in_section = False
+    key_indent = None  # Отступ ключей первого уровня раздела (вложенные не трогаем)
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        if line and not line[0].isspace() and not line.startswith('#'):
+            in_section = line.split(':', 1)[0].strip() == section
+            key_indent = None
+            continue
+        if not in_section:
+            continue
+        match = re.match(r'^(\s+)([\w-]+):(\s*)([^#\n]*?)(\s*#.*)?$', line.rstrip('\n'))
+        if match is None:
+            continue
+        if key_indent is None:
+            key_indent = match.group(1)
+        if match.group(1) == key_indent and match.group(2) in remaining:
+            indent, key, space, _, comment = match.groups()
+            value = yaml.safe_dump(remaining.pop(key), default_flow_style=True).strip()
+            value = value.removesuffix('...').strip()
+            lines[i] = f"{indent}{key}:{space or ' '}{value}{comment or ''}\n"
+
+    if remaining:
+        raise KeyError(f"В разделе '{section}' нет ключей: {list(remaining)}")
+
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+def merge_config(base, override):
+    """Копия base, дополненная значениями override (вложенные разделы объединяются)."""
+    merged = dict(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def setup_logging(log_path='app.log', name=None):
+    """
+    Настройка логирования с явной поддержкой UTF-8.
+    name — метка в каждой строке (например, линия конвейера в рабочем процессе супервизора).
+    """
+    prefix = f'[{name}] ' if name else ''
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
+        format=f'%(asctime)s - %(levelname)s - {prefix}%(message)s',
         handlers=[
-            logging.FileHandler('app.log', encoding='utf-8'),
+            logging.FileHandler(log_path, encoding='utf-8'),
             logging.StreamHandler()
         ]
-    )   
\ No newline at end of file
+    )   
+
+class RateMeter:
+    """Скорость событий (в секунду) по скользящему временному окну."""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self._events = deque()  # (время, количество)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def add(self, count=1, now=None):
+        """Регистрация count событий в момент now (по умолчанию — сейчас)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._events.append((now, count))
+            self._total += count
+            self._trim(now)
+
+    def rate(self, now=None):
+        """Событий в секунду за последнее окно."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            if not self._events:
+                return 0.0
+            span = max(now - self._events[0][0], 1e-6)
+            return self._total / max(span, min(self.window, 1.0))
+
+    def _trim(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            self._total -= self._events.popleft()[1]
@@ -0,0 +1,279 @@
+# modules/vibro_calibration.py
+"""
+Автоматический подбор рабочей точки вибробункера (частота и заполнение ШИМ).
+
+Калибровка без оператора: RP2040 последовательно переводится в точки
+сетки частота × заполнение, после паузы на установление режима счётчик
+деталей измеряет производительность. Критерий — скорость поштучной
+(не слипшейся) подачи при доле слипшихся не выше допустимой.
+
+Режимы поиска:
+- grid: полный перебор сетки
+- coordinate: покоординатный подъём — поочерёдно по заполнению и частоте
+  от текущей точки, пока результат улучшается (меньше измерений)
+
+Результаты сохраняются в CSV, лучшая точка записывается в
+rp2040.default_freq / default_duty файла конфигурации.
+
+Запуск: python -m modules.vibro_calibration [--config config.yaml] [--mode grid]
+"""
+
+import argparse
+import csv
+import logging
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+CalibrationPoint = namedtuple(
+    "CalibrationPoint", ["freq", "duty", "parts_per_min", "singulated_per_min", "clump_rate", "count"]
+)
+
+MODES = ("grid", "coordinate")
+
+
+def _axis(low, high, step):
+    """Значения оси сетки от low до high включительно."""
+    step = max(1, int(step))
+    return list(range(int(low), int(high) + 1, step))
+
+
+class VibroCalibrator:
+    """Перебор рабочих точек вибробункера с измерением по счётчику деталей."""
+
+    def __init__(self, config, counter, rp2040):
+        cal_config = config.get("vibro_calibration", {})
+        self.counter = counter
+        self.rp2040 = rp2040
+
+        self.mode = cal_config.get("mode", "coordinate")
+        if self.mode not in MODES:
+            raise ValueError(f"Неизвестный режим калибровки: {self.mode}. Доступны: {list(MODES)}")
+
+        self.freqs = _axis(
+            cal_config.get("freq_min", 14), cal_config.get("freq_max", 20), cal_config.get("freq_step", 1)
+        )
+        self.duties = _axis(
+            cal_config.get("duty_min", 20), cal_config.get("duty_max", 70), cal_config.get("duty_step", 5)
+        )
+        self.settle_time = cal_config.get("settle_time", 5.0)
+        self.measure_time = cal_config.get("measure_time", 30.0)
+        self.max_clump_rate = cal_config.get("max_clump_rate", 0.05)
+        self.max_rounds = cal_config.get("max_rounds", 3)
+
+        self.results = {}  # (freq, duty) -> CalibrationPoint
+        self._stop_event = threading.Event()
+
+    def measure(self, freq, duty):
+        """Перевод бункера в точку (freq, duty) и измерение производительности."""
+        key = (freq, duty)
+        if key in self.results:
+            return self.results[key]
+
+        self.rp2040.vib_on(freq, duty)
+        if self._stop_event.wait(self.settle_time):
+            return None
+
+        count0, clumps0 = self.counter.count, self.counter.clumps
+        started = time.monotonic()
+        if self._stop_event.wait(self.measure_time):
+            return None
+        elapsed = time.monotonic() - started
+
+        count = self.counter.count - count0
+        clumps = self.counter.clumps - clumps0
+        point = CalibrationPoint(
+            freq=freq,
+            duty=duty,
+            parts_per_min=count / elapsed * 60.0,
+            singulated_per_min=(count - clumps) / elapsed * 60.0,
+            clump_rate=clumps / count if count else 0.0,
+            count=count,
+        )
+        self.results[key] = point
+        logger.info(
+            f"Калибровка {freq} Гц / {duty}%: {point.parts_per_min:.1f} шт/мин, "
+            f"поштучно {point.singulated_per_min:.1f}, слипшихся {point.clump_rate:.1%}"
+        )
+        return point
+
+    def score(self, point):
+        """Оценка точки: поштучная производительность, недопустимые точки — ниже любых допустимых."""
+        if point is None:
+            return float("-inf")
+        if not self.acceptable(point):
+            return point.singulated_per_min - 1e6
+        return point.singulated_per_min
+
+    def acceptable(self, point):
+        """Доля слипшихся в точке не превышает max_clump_rate."""
+        return point.clump_rate <= self.max_clump_rate
+
+    def best(self):
+        """Лучшая из измеренных точек (или None)."""
+        if not self.results:
+            return None
+        return max(self.results.values(), key=self.score)
+
+    def run(self):
+        """Калибровка целиком. Возвращает лучшую точку; бункер после неё выключается."""
+        logger.info(
+            f"Калибровка вибробункера ({self.mode}): частоты {self.freqs[0]}–{self.freqs[-1]} Гц, "
+            f"заполнение {self.duties[0]}–{self.duties[-1]}%"
+        )
+        try:
+            if self.mode == "grid":
+                self._run_grid()
+            else:
+                self._run_coordinate()
+        finally:
+            self.rp2040.vib_off()
+
+        best = self.best()
+        if best is not None and not self.acceptable(best):
+            logger.warning(
+                f"Нет точки со слипшимися не более {self.max_clump_rate:.1%}: лучшая {best.freq} Гц / "
+                f"{best.duty}% — слипшихся {best.clump_rate:.1%}"
+            )
+        elif best is not None:
+            logger.info(
+                f"Лучшая точка: {best.freq} Гц / {best.duty}% — "
+                f"поштучно {best.singulated_per_min:.1f} шт/мин, слипшихся {best.clump_rate:.1%}"
+            )
+        return best
+
+    def _run_grid(self):
+        for freq in self.freqs:
+            for duty in self.duties:
+                if self.measure(freq, duty) is None:
+                    return
+
+    def _run_coordinate(self):
+        """Покоординатный подъём от ближайшей к текущим настройкам точки сетки."""
+        freq = min(self.freqs, key=lambda f: abs(f - self.rp2040.default_freq))
+        duty = min(self.duties, key=lambda d: abs(d - self.rp2040.default_duty))
+        current = self.measure(freq, duty)
+        if current is None:
+            return
+
+        for _ in range(self.max_rounds):
+            moved = False
+            for axis in ("duty", "freq"):
+                values = self.duties if axis == "duty" else self.freqs
+                point = self._climb(values, axis, freq, duty, current)
+                if point is None:
+                    return
+                if point is not current:
+                    current, freq, duty, moved = point, point.freq, point.duty, True
+            if not moved:
+                break
+
+    def _climb(self, values, axis, freq, duty, current):
+        """Шаги по одной оси, пока соседняя точка лучше текущей."""
+        index = values.index(duty if axis == "duty" else freq)
+        for direction in (1, -1):
+            while 0 <= index + direction < len(values):
+                value = values[index + direction]
+                candidate = self.measure(value if axis == "freq" else freq, value if axis == "duty" else duty)
+                if candidate is None:
+                    return None
+                if self.score(candidate) <= self.score(current):
+                    break
+                current, index = candidate, index + direction
+                freq, duty = current.freq, current.duty
+        return current
+
+    def save_csv(self, path):
+        """Таблица всех измеренных точек."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CalibrationPoint._fields)
+            for key in sorted(self.results):
+                writer.writerow(self.results[key])
+        logger.info(f"Результаты калибровки сохранены: {path}")
+
+    def stop(self):
+        """Прерывание калибровки (текущее измерение не учитывается)."""
+        self._stop_event.set()
+
+
+def main():
+    """Калибровка без GUI: камера, конвейер подсчёта, RP2040 и (по желанию) лента."""
+    from .camera import get_camera
+    from .counter import PartCounter
+    from .modbus_control import ServoController
+    from .pipeline import FramePipeline
+    from .processing import build_processors, find_processor
+    from .uart_control import RP2040Controller
+    from .utils import load_config, setup_logging, update_config_values
+
+    parser = argparse.ArgumentParser(description="Подбор частоты и заполнения вибробункера")
+    parser.add_argument("--config", default="config.yaml", help="Файл конфигурации")
+    parser.add_argument("--mode", choices=MODES, help="Режим поиска (по умолчанию из конфигурации)")
+    parser.add_argument("--output", help="CSV с результатами (по умолчанию из конфигурации)")
+    parser.add_argument("--no-write", action="store_true", help="Не записывать лучшую точку в конфигурацию")
+    args = parser.parse_args()
+
+    setup_logging()
+    config = load_config(args.config)
+    cal_config = config.setdefault("vibro_calibration", {})
+    if args.mode:
+        cal_config["mode"] = args.mode
+
+    processors = build_processors(config)
+    counter = find_processor(processors, PartCounter)
+    if counter is None:
+        logger.error("Калибровка невозможна: детекция отключена")
+        return 1
+
+    rp2040 = RP2040Controller(config)
+    if not rp2040.connect():
+        logger.error("Калибровка невозможна: нет связи с RP2040")
+        return 1
+
+    servo = None
+    belt_speed = cal_config.get("belt_speed")
+    if belt_speed:
+        servo = ServoController(config)
+        if servo.connect():
+            servo.set_speed(belt_speed)
+            servo.jog_forward()
+        else:
+            logger.warning("Сервопривод не подключён — лента должна работать независимо")
+            servo = None
+
+    pipeline = FramePipeline(get_camera(config), config, processors)
+    pipeline.start()
+    calibrator = VibroCalibrator(config, counter, rp2040)
+    try:
+        best = calibrator.run()
+    except KeyboardInterrupt:
+        calibrator.stop()
+        best = calibrator.best()
+    finally:
+        pipeline.stop()
+        if servo is not None:
+            servo.stop()
+            servo.close()
+        rp2040.close()
+
+    calibrator.save_csv(args.output or cal_config.get("output", "vibro_calibration.csv"))
+    if best is None or best.count == 0:
+        logger.warning("Калибровка не дала результата: детали не подсчитаны")
+        return 1
+    if not calibrator.acceptable(best):
+        logger.warning(
+            f"Калибровка не дала результата: во всех точках слипшихся больше {calibrator.max_clump_rate:.1%}, "
+            f"{args.config} не изменён"
+        )
+        return 1
+    if not args.no_write and cal_config.get("write_config", True):
+        update_config_values("rp2040", {"default_freq": best.freq, "default_duty": best.duty}, args.config)
+        logger.info(f"В {args.config} записано: {best.freq} Гц, {best.duty}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+# modules/vibro_control.py
+"""
+Замкнутое регулирование вибробункера по фактической скорости подсчёта.
+
+ПИ-регулятор сравнивает измеренную скорость (деталей/мин) с заданной
+и меняет заполнение ШИМ (и, при необходимости, частоту) RP2040
+в безопасных границах. Интегратор не накапливается, пока выход
+упирается в границу (anti-windup); изменение заполнения за шаг
+ограничено, а команды UART отправляются не чаще заданного интервала.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class FeedRateController(threading.Thread):
+    """Регулятор производительности вибробункера (поток с периодом period)."""
+
+    def __init__(self, config, counter, rp2040, submit=None):
+        """
+        submit(name, func, *args) — способ выполнить команду RP2040
+        (например, через DeviceWorker); по умолчанию — прямой вызов.
+        """
+        super().__init__(name="vibro-control", daemon=True)
+        ctl_config = config.get("vibro_control", {})
+        self.counter = counter
+        self.rp2040 = rp2040
+        self.submit = submit or (lambda name, func, *args: func(*args))
+
+        self.target_ppm = ctl_config.get("target_ppm", 60.0)
+        self.kp = ctl_config.get("kp", 0.2)
+        self.ki = ctl_config.get("ki", 0.02)
+        self.period = ctl_config.get("period", 2.0)
+        self.measure_window = ctl_config.get("measure_window", 20.0)
+        self.duty_min = ctl_config.get("duty_min", 20)
+        self.duty_max = ctl_config.get("duty_max", 70)
+        self.max_duty_step = ctl_config.get("max_duty_step", 3)
+        self.min_command_interval = ctl_config.get("min_command_interval", 2.0)
+
+        self.adjust_frequency = ctl_config.get("adjust_frequency", False)
+        self.freq_min = ctl_config.get("freq_min", rp2040.default_freq)
+        self.freq_max = ctl_config.get("freq_max", rp2040.default_freq)
+        self.freq_step = ctl_config.get("freq_step", 1)
+        self.saturation_steps = ctl_config.get("saturation_steps", 5)
+
+        self.integral = 0.0
+        self.base_duty = rp2040.current_duty
+        self.duty = float(rp2040.current_duty)
+        self.measured_ppm = 0.0
+        self.enabled = ctl_config.get("enable", False)
+
+        self._samples = deque()  # (время, показание счётчика)
+        self._last_command_time = 0.0
+        self._saturated_for = 0
+        self._stop_event = threading.Event()
+
+    def set_target(self, ppm):
+        """Новая заданная производительность, деталей/мин."""
+        self.target_ppm = ppm
+        logger.info(f"Вибробункер: цель {ppm:.0f} шт/мин")
+
+    def run(self):
+        logger.info(
+            f"Регулятор вибробункера: цель {self.target_ppm:.0f} шт/мин, "
+            f"заполнение {self.duty_min}–{self.duty_max}%"
+        )
+        while not self._stop_event.wait(self.period):
+            try:
+                self.step()
+            except Exception:
+                logger.exception("Ошибка шага регулятора вибробункера")
+
+    def measure(self, now):
+        """Скорость подсчёта по приращению счётчика за окно measure_window, деталей/мин."""
+        count = self.counter.count
+        if self._samples and count < self._samples[-1][1]:
+            self._samples.clear()  # Счётчик сброшен оператором
+        self._samples.append((now, count))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.measure_window:
+            self._samples.popleft()
+
+        t0, c0 = self._samples[0]
+        if now - t0 <= 0:
+            return None
+        return (count - c0) / (now - t0) * 60.0
+
+    def step(self, now=None):
+        """Один шаг регулирования."""
+        now = time.monotonic() if now is None else now
+        measured = self.measure(now)
+        if measured is None or not self.enabled or not self.rp2040.is_on:
+            # Вибрация выключена оператором — регулятор не вмешивается
+            self.integral = 0.0
+            self.base_duty = self.rp2040.current_duty
+            return
+        self.measured_ppm = measured
+
+        error = self.target_ppm - measured
+        output = self.base_duty + self.kp * error + self.ki * (self.integral + error * self.period)
+        saturated_high = output > self.duty_max
+        saturated_low = output < self.duty_min
+
+        # Anti-windup: интегрируем, только если это не углубляет насыщение
+        if not ((saturated_high and error > 0) or (saturated_low and error < 0)):
+            self.integral += error * self.period
+
+        output = self.base_duty + self.kp * error + self.ki * self.integral
+        output = max(self.duty_min, min(self.duty_max, output))
+        # Ограничение скорости изменения заполнения относительно фактически установленного
+        current = self.rp2040.current_duty
+        output = max(current - self.max_duty_step, min(current + self.max_duty_step, output))
+        self.duty = output
+
+        self._track_saturation(saturated_high, saturated_low)
+        self._apply(now)
+
+    def _track_saturation(self, saturated_high, saturated_low):
+        """Долгое насыщение по заполнению — повод изменить частоту (если разрешено)."""
+        if saturated_high or saturated_low:
+            self._saturated_for += 1
+        else:
+            self._saturated_for = 0
+        if not self.adjust_frequency or self._saturated_for < self.saturation_steps:
+            return
+
+        freq = self.rp2040.current_freq + (self.freq_step if saturated_high else -self.freq_step)
+        freq = max(self.freq_min, min(self.freq_max, freq))
+        if freq != self.rp2040.current_freq:
+            logger.info(f"Вибробункер: частота {self.rp2040.current_freq} → {freq} Гц")
+            self.submit("set_frequency", self.rp2040.set_frequency, freq)
+            self._last_command_time = time.monotonic()
+        self._saturated_for = 0
+
+    def _apply(self, now):
+        """Отправка нового заполнения, если оно изменилось и интервал команд выдержан."""
+        duty = int(round(self.duty))
+        if duty == self.rp2040.current_duty:
+            return
+        if now - self._last_command_time < self.min_command_interval:
+            return
+        self._last_command_time = now
+        logger.debug(
+            f"Вибробункер: {self.measured_ppm:.1f} шт/мин (цель {self.target_ppm:.0f}), "
+            f"заполнение {self.rp2040.current_duty} → {duty}%"
+        )
+        self.submit("set_duty", self.rp2040.set_duty, duty)
+
+    def stats(self):
+        return {
+            "target_ppm": self.target_ppm,
+            "measured_ppm": self.measured_ppm,
+            "duty": self.duty,
+            "integral": self.integral,
+        }
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def create_feed_controller(config, counter, rp2040, submit=None):
+    """Создание и запуск регулятора, если он включён и есть счётчик и RP2040 (иначе None)."""
+    if not config.get("vibro_control", {}).get("enable", False):
+        return None
+    if counter is None or not (rp2040 and rp2040.connected):
+        logger.warning("Регулятор вибробункера не запущен: нужен подсчёт деталей и связь с RP2040")
+        return None
+    controller = FeedRateController(config, counter, rp2040, submit)
+    controller.start()
+    return controller
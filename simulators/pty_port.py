@@ -0,0 +1,76 @@
+# simulators/pty_port.py
+"""
+Псевдотерминал (pty) как замена последовательного порта устройства.
+
+Симулятор работает с ведущей стороной пары, а контроллер (pyserial,
+minimalmodbus) открывает ведомую по пути из конфигурации — так же,
+как COM-порт реального устройства. Путь можно закрепить символической
+ссылкой (link), чтобы указать его в config.yaml заранее.
+Только для POSIX (Linux, macOS). Ядро Linux не принимает для pty
+настройку паритета (tcsetattr → EINVAL), поэтому контроллер подключается
+с parity N, а время символа на линии симулятор считает по своему паритету.
+"""
+
+import logging
+import os
+import select
+import threading
+import tty
+
+logger = logging.getLogger(__name__)
+
+
+def char_time(baudrate, parity="N", stopbits=1, bytesize=8):
+    """Время передачи одного символа по линии (сек): старт + данные + паритет + стоп."""
+    bits = 1 + bytesize + (0 if parity == "N" else 1) + stopbits
+    return bits / baudrate
+
+
+class PtyPort:
+    """Пара pty: master — для симулятора, port — путь ведомой стороны для контроллера."""
+
+    def __init__(self, link=None):
+        self.master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.link = link
+        if link:
+            if os.path.lexists(link):
+                os.unlink(link)
+            os.symlink(self.port, link)
+        self._stop_event = threading.Event()
+
+    @property
+    def path(self):
+        """Путь для конфигурации контроллера (ссылка, если задана)."""
+        return self.link or self.port
+
+    def read(self, timeout=0.1):
+        """Доступные байты (b'' по таймауту)."""
+        ready, _, _ = select.select([self.master], [], [], timeout)
+        if not ready:
+            return b""
+        try:
+            return os.read(self.master, 4096)
+        except OSError:
+            return b""
+
+    def write(self, data):
+        os.write(self.master, data)
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def close(self):
+        self.stop()
+        for fd in (self.master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
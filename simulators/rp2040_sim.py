@@ -0,0 +1,134 @@
+# simulators/rp2040_sim.py
+"""
+Симулятор платы RP2040 (ШИМ вибробункера) на псевдотерминале.
+
+Принимает строки команд RP2040Controller: "1,{freq},{duty}" — включить
+с частотой и заполнением, "0,{freq},{duty}" — выключить. Как и прошивка,
+ничего не отвечает (контроллер порт не читает); некорректные строки
+считаются и пропускаются. Время приёма строки соответствует скорости линии.
+
+Запуск: python -m simulators.rp2040_sim --link /tmp/rp2040 --baudrate 115200
+"""
+
+import argparse
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from .pty_port import PtyPort, char_time
+
+logger = logging.getLogger(__name__)
+
+# Принятая команда: время приёма (monotonic), вкл/выкл, частота, заполнение
+PwmCommand = namedtuple("PwmCommand", ["timestamp", "on", "freq", "duty"])
+
+FREQ_RANGE = (1, 200)  # Допустимая частота (Гц)
+DUTY_RANGE = (0, 100)  # Допустимое заполнение (%)
+
+
+def parse_command(line):
+    """Строка "on,freq,duty" → (on, freq, duty) или None, если формат неверный."""
+    parts = line.strip().split(",")
+    if len(parts) != 3:
+        return None
+    try:
+        on, freq, duty = (int(float(p)) for p in parts)
+    except ValueError:
+        return None
+    if on not in (0, 1):
+        return None
+    if on and not (FREQ_RANGE[0] <= freq <= FREQ_RANGE[1] and DUTY_RANGE[0] <= duty <= DUTY_RANGE[1]):
+        return None
+    return on == 1, freq, duty
+
+
+class RP2040Simulator(threading.Thread):
+    """Поток-симулятор: разбор строк команд ШИМ с pty."""
+
+    def __init__(self, link=None, baudrate=115200, history=1000):
+        super().__init__(name="rp2040-sim", daemon=True)
+        self.pty = PtyPort(link)
+        self.char_time = char_time(baudrate)
+        self.history = history
+        self.commands = []
+        self.on = False
+        self.freq = 0
+        self.duty = 0
+        self.invalid = 0
+
+    @property
+    def port(self):
+        return self.pty.path
+
+    def run(self):
+        logger.info(f"Симулятор RP2040: {self.port}")
+        buffer = b""
+        while not self.pty.stopped:
+            data = self.pty.read(0.05)
+            if not data:
+                continue
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                # Строка принята целиком только после передачи всех её символов
+                time.sleep(self.char_time * (len(line) + 1))
+                self._handle(line.decode("ascii", errors="replace"))
+
+    def _handle(self, line):
+        if not line.strip():
+            return
+        parsed = parse_command(line)
+        if parsed is None:
+            self.invalid += 1
+            logger.warning(f"Симулятор RP2040: неверная команда {line.strip()!r}")
+            return
+        self.on, freq, duty = parsed
+        if self.on:
+            self.freq, self.duty = freq, duty
+        self.commands.append(PwmCommand(time.monotonic(), self.on, freq, duty))
+        del self.commands[:-self.history]
+        logger.debug(f"ШИМ {'вкл' if self.on else 'выкл'}: {self.freq} Гц, {self.duty}%")
+
+    def stats(self):
+        return {
+            "commands": len(self.commands),
+            "invalid": self.invalid,
+            "on": self.on,
+            "freq": self.freq,
+            "duty": self.duty,
+        }
+
+    def stop(self, timeout=1.0):
+        self.pty.stop()
+        if self.is_alive():
+            self.join(timeout)
+        self.pty.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор RP2040 (ШИМ вибробункера)")
+    parser.add_argument("--link", help="Символическая ссылка на порт (для config.yaml)")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--verbose", action="store_true", help="Печатать каждую команду")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    sim = RP2040Simulator(link=args.link, baudrate=args.baudrate)
+    print(sim.port, flush=True)
+    sim.start()
+    try:
+        while sim.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        logger.info(f"Симулятор RP2040 остановлен: {sim.stats()}")
+
+
+if __name__ == "__main__":
+    main()
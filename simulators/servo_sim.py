@@ -0,0 +1,274 @@
+# simulators/servo_sim.py
+"""
+Симулятор сервопривода Delta ASDA-AB (Modbus RTU) на псевдотерминале.
+
+Поддерживаются функции 03 (чтение регистров), 06 (запись регистра)
+и 16 (запись нескольких регистров) с проверкой CRC и ответами-исключениями.
+Карта регистров повторяет используемую ServoController:
+- P0-00 (0) — версия ПО, P0-01 (1) — код ошибки
+- P0-09 (9) / P0-10 (10) — мониторинг: фактическая скорость и нагрузка
+- P4-05 (1029) — JOG: значение 0–4997 задаёт скорость, 4998/4999/5000 — вперёд/назад/стоп
+
+Ответ задерживается на время передачи запроса и ответа на заданной
+скорости линии плюс время обработки в приводе, поэтому задержки
+близки к реальным для RS-485.
+
+Запуск: python -m simulators.servo_sim --link /tmp/servo --baudrate 9600
+"""
+
+import argparse
+import logging
+import random
+import struct
+import threading
+import time
+
+from .pty_port import PtyPort, char_time
+
+logger = logging.getLogger(__name__)
+
+REG_VERSION = 0
+REG_ERROR = 1
+REG_SPEED = 9
+REG_LOAD = 10
+REG_JOG = 1029
+
+JOG_FORWARD = 4998
+JOG_REVERSE = 4999
+JOG_STOP = 5000
+
+REGISTER_COUNT = 2048  # Допустимые адреса 0..REGISTER_COUNT-1
+
+# Коды исключений Modbus
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+
+
+def crc16(data):
+    """CRC-16/Modbus."""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def with_crc(payload):
+    return payload + struct.pack("<H", crc16(payload))
+
+
+class ServoModel:
+    """Состояние привода: регистры, JOG, разгон до заданной скорости."""
+
+    def __init__(self, version=0x0162, acceleration=2000.0):
+        self.registers = [0] * REGISTER_COUNT
+        self.registers[REG_VERSION] = version
+        self.acceleration = acceleration  # об/мин в секунду
+        self.jog_speed = 0
+        self.direction = 0  # -1, 0, 1
+        self.speed = 0.0
+        self._updated = time.monotonic()
+
+    def write(self, address, value):
+        if address == REG_JOG:
+            if value == JOG_FORWARD:
+                self.direction = 1
+            elif value == JOG_REVERSE:
+                self.direction = -1
+            elif value == JOG_STOP:
+                self.direction = 0
+            elif value < JOG_FORWARD:
+                # Запись скорости прерывает движение (как у реального привода)
+                self.jog_speed = value
+                self.direction = 0
+            else:
+                return False
+        elif address == REG_ERROR and value == 0:
+            self.registers[REG_ERROR] = 0  # Сброс ошибки
+        self.registers[address] = value
+        return True
+
+    def read(self, address):
+        self._update()
+        if address == REG_SPEED:
+            return int(round(self.speed)) & 0xFFFF  # Со знаком, дополнительный код
+        if address == REG_LOAD:
+            return int(min(300, 10 + abs(self.speed) / 10))
+        return self.registers[address]
+
+    def fault(self, code):
+        """Имитация аварии: код ошибки в P0-01, двигатель останавливается."""
+        self.registers[REG_ERROR] = code
+        self.direction = 0
+
+    def _update(self):
+        now = time.monotonic()
+        dt, self._updated = now - self._updated, now
+        target = self.direction * self.jog_speed
+        step = self.acceleration * dt
+        if abs(target - self.speed) <= step:
+            self.speed = float(target)
+        else:
+            self.speed += step if target > self.speed else -step
+
+
+class ServoSimulator(threading.Thread):
+    """Поток-симулятор: разбор кадров Modbus RTU с pty и ответы с задержкой линии."""
+
+    def __init__(self, link=None, slave_address=1, baudrate=9600, parity="E", stopbits=1,
+                 response_ms=2.0, drop_rate=0.0, fault_after=None, fault_code=0x13, seed=1):
+        super().__init__(name="servo-sim", daemon=True)
+        self.pty = PtyPort(link)
+        self.model = ServoModel()
+        self.slave_address = slave_address
+        self.char_time = char_time(baudrate, parity, stopbits)
+        self.response_time = response_ms / 1000
+        self.drop_rate = drop_rate
+        self.fault_after = fault_after
+        self.fault_code = fault_code
+        self._random = random.Random(seed)
+
+        self.requests = 0
+        self.responses = 0
+        self.crc_errors = 0
+        self.exceptions = 0
+        self.dropped = 0
+
+    @property
+    def port(self):
+        return self.pty.path
+
+    def run(self):
+        logger.info(f"Симулятор сервопривода: {self.port}, адрес {self.slave_address}")
+        started = time.monotonic()
+        buffer = b""
+        while not self.pty.stopped:
+            if self.fault_after is not None and time.monotonic() - started >= self.fault_after:
+                logger.info(f"Симулятор сервопривода: авария, код {self.fault_code:#x}")
+                self.model.fault(self.fault_code)
+                self.fault_after = None
+            data = self.pty.read(0.05)
+            if not data:
+                buffer = b""  # Пауза на линии завершает кадр
+                continue
+            buffer += data
+            while True:
+                length = self._frame_length(buffer)
+                if length is None or len(buffer) < length:
+                    break
+                frame, buffer = buffer[:length], buffer[length:]
+                self._handle(frame)
+
+    @staticmethod
+    def _frame_length(buffer):
+        """Длина кадра запроса по коду функции (None — нужно больше байт)."""
+        if len(buffer) < 2:
+            return None
+        function = buffer[1]
+        if function in (3, 6):
+            return 8
+        if function == 16:
+            return 9 + buffer[6] if len(buffer) >= 7 else None
+        return len(buffer)  # Неизвестная функция — весь буфер, ответ-исключение
+
+    def _handle(self, frame):
+        self.requests += 1
+        if len(frame) < 4 or crc16(frame[:-2]) != struct.unpack("<H", frame[-2:])[0]:
+            self.crc_errors += 1  # Привод молча игнорирует повреждённый кадр
+            return
+        if frame[0] != self.slave_address:
+            return
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+
+        response = self._respond(frame[1], frame[2:-2])
+        # Время передачи запроса и ответа по линии плюс обработка в приводе
+        time.sleep(self.char_time * (len(frame) + len(response) + 7) + self.response_time)
+        self.pty.write(response)
+        self.responses += 1
+
+    def _respond(self, function, body):
+        address = self.slave_address
+        try:
+            if function == 3:
+                start, count = struct.unpack(">HH", body[:4])
+                if not 1 <= count <= 125 or start + count > REGISTER_COUNT:
+                    return self._exception(function, ILLEGAL_ADDRESS)
+                values = [self.model.read(start + i) for i in range(count)]
+                payload = struct.pack(f">BBB{count}H", address, 3, count * 2, *values)
+                return with_crc(payload)
+            if function == 6:
+                register, value = struct.unpack(">HH", body[:4])
+                if register >= REGISTER_COUNT:
+                    return self._exception(function, ILLEGAL_ADDRESS)
+                if not self.model.write(register, value):
+                    return self._exception(function, ILLEGAL_VALUE)
+                return with_crc(struct.pack(">BBHH", address, 6, register, value))
+            if function == 16:
+                start, count, byte_count = struct.unpack(">HHB", body[:5])
+                if start + count > REGISTER_COUNT or byte_count != count * 2:
+                    return self._exception(function, ILLEGAL_ADDRESS)
+                values = struct.unpack(f">{count}H", body[5:5 + byte_count])
+                for i, value in enumerate(values):
+                    if not self.model.write(start + i, value):
+                        return self._exception(function, ILLEGAL_VALUE)
+                return with_crc(struct.pack(">BBHH", address, 16, start, count))
+        except struct.error:
+            return self._exception(function, ILLEGAL_VALUE)
+        return self._exception(function, ILLEGAL_FUNCTION)
+
+    def _exception(self, function, code):
+        self.exceptions += 1
+        return with_crc(struct.pack(">BBB", self.slave_address, function | 0x80, code))
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "responses": self.responses,
+            "crc_errors": self.crc_errors,
+            "exceptions": self.exceptions,
+            "dropped": self.dropped,
+        }
+
+    def stop(self, timeout=1.0):
+        self.pty.stop()
+        if self.is_alive():
+            self.join(timeout)
+        self.pty.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор сервопривода Delta ASDA (Modbus RTU)")
+    parser.add_argument("--link", help="Символическая ссылка на порт (для config.yaml)")
+    parser.add_argument("--address", type=int, default=1, help="Адрес slave")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--parity", default="E", choices=["N", "E", "O"])
+    parser.add_argument("--response-ms", type=float, default=2.0, help="Время обработки запроса приводом")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Доля запросов без ответа")
+    parser.add_argument("--fault-after", type=float, help="Авария через N секунд")
+    parser.add_argument("--fault-code", type=lambda v: int(v, 0), default=0x13)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    sim = ServoSimulator(
+        link=args.link, slave_address=args.address, baudrate=args.baudrate, parity=args.parity,
+        response_ms=args.response_ms, drop_rate=args.drop_rate,
+        fault_after=args.fault_after, fault_code=args.fault_code,
+    )
+    print(sim.port, flush=True)
+    sim.start()
+    try:
+        while sim.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        logger.info(f"Симулятор сервопривода остановлен: {sim.stats()}")
+
+
+if __name__ == "__main__":
+    main()
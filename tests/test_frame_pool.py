@@ -0,0 +1,59 @@
+# tests/test_frame_pool.py
+"""Кольцо свежих кадров: учёт отброшенных кадров и возврат буферов в пул."""
+
+from modules.frame_pool import FramePool, FrameRing
+
+
+def make_pool(count=4):
+    return FramePool(count, 0, (2, 2))
+
+
+def test_push_over_capacity_evicts_oldest():
+    pool = make_pool()
+    ring = FrameRing(2)
+    for _ in range(3):
+        ring.push(pool.acquire(timeout=0))
+    assert len(ring) == 2
+    assert ring.dropped == 1
+    assert ring.pushed == 3
+    assert pool.available == 2  # Вытесненный кадр вернулся в пул
+
+
+def test_get_latest_drops_stale_frames():
+    pool = make_pool()
+    ring = FrameRing(3)
+    leases = [pool.acquire(timeout=0) for _ in range(3)]
+    for lease in leases:
+        ring.push(lease)
+    latest = ring.get_latest(timeout=0)
+    assert latest is leases[-1]
+    assert ring.dropped == 2
+    assert len(ring) == 0
+    latest.release()
+    assert pool.available == 4
+
+
+def test_steal_oldest_and_skip_count_as_dropped():
+    pool = make_pool(2)
+    ring = FrameRing(2)
+    first = pool.acquire(timeout=0)
+    ring.push(first)
+    ring.push(pool.acquire(timeout=0))
+    assert ring.steal_oldest() is first
+    ring.skip()
+    assert ring.dropped == 2
+
+
+def test_clear_keeps_drop_counter():
+    pool = make_pool()
+    ring = FrameRing(1)
+    ring.push(pool.acquire(timeout=0))
+    ring.push(pool.acquire(timeout=0))
+    ring.clear()
+    assert len(ring) == 0
+    assert ring.dropped == 1  # Счётчик накопительный: clear() только возвращает кадры
+    assert pool.available == 4
+
+
+def test_get_latest_timeout_on_empty_ring():
+    assert FrameRing(2).get_latest(timeout=0.01) is None
@@ -0,0 +1,43 @@
+# tests/test_supervisor.py
+"""Распределение ядер между линиями супервизора."""
+
+import logging
+
+from modules.supervisor import assign_cpus
+
+
+def test_explicit_kept_and_auto_split_remaining():
+    cpus = assign_cpus({"a": [0, 1, 2, 3], "b": "auto", "c": "auto", "d": None}, list(range(8)))
+    assert cpus == {"a": [0, 1, 2, 3], "b": [4, 5], "c": [6, 7], "d": None}
+
+
+def test_explicit_clamped_to_available(caplog):
+    with caplog.at_level(logging.WARNING, logger="modules.supervisor"):
+        cpus = assign_cpus({"a": [0, 1, 2, 3]}, [0, 1])
+    assert cpus == {"a": [0, 1]}
+    assert "[2, 3]" in caplog.text
+
+
+def test_unavailable_explicit_falls_back_to_auto():
+    cpus = assign_cpus({"a": [5, 6], "b": "auto"}, [0, 1])
+    assert cpus == {"a": [0], "b": [1]}
+
+
+def test_more_lines_than_cores_share_with_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger="modules.supervisor"):
+        cpus = assign_cpus({"a": "auto", "b": "auto", "c": "auto"}, [0, 1])
+    assert cpus == {"a": [0], "b": [1], "c": [0]}
+    assert "делят ядра [0]" in caplog.text
+
+
+def test_shipped_lines_on_single_core(caplog):
+    with caplog.at_level(logging.WARNING, logger="modules.supervisor"):
+        cpus = assign_cpus({"line1": [0, 1, 2, 3], "line2": "auto"}, [0])
+    assert cpus == {"line1": [0], "line2": [0]}
+    assert "Линии line1 и line2 делят ядра [0]" in caplog.text
+
+
+def test_no_warning_without_overlap(caplog):
+    with caplog.at_level(logging.WARNING, logger="modules.supervisor"):
+        assign_cpus({"a": [0, 1], "b": [2, 3]}, list(range(4)))
+    assert caplog.text == ""
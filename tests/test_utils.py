@@ -0,0 +1,64 @@
+# tests/test_utils.py
+"""Правка config.yaml на месте: значения меняются, комментарии и порядок сохраняются."""
+
+import pytest
+import yaml
+
+from modules.utils import merge_config, update_config_values
+
+CONFIG = """\
+# Заголовок
+camera:
+  type: synthetic  # Тип камеры
+
+rp2040:
+  type: rp2040  # Реализация
+  default_freq: 16  # Частота ШИМ (Гц)
+  default_duty: 40  # Заполнение (%)
+  commands:
+    default_freq: 99  # Вложенный ключ с тем же именем
+  ratio: 0.5
+
+vibro_control:
+  default_freq: 1
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG, encoding="utf-8")
+    return path
+
+
+def test_values_replaced_comments_kept(config_path):
+    update_config_values("rp2040", {"default_freq": 21, "default_duty": 55}, str(config_path))
+    text = config_path.read_text(encoding="utf-8")
+    assert "  default_freq: 21  # Частота ШИМ (Гц)\n" in text
+    assert "  default_duty: 55  # Заполнение (%)\n" in text
+    assert text.startswith("# Заголовок\n")
+
+
+def test_only_top_level_keys_of_section_changed(config_path):
+    update_config_values("rp2040", {"default_freq": 21}, str(config_path))
+    config = yaml.safe_load(config_path.read_text(encoding="utf-8"))
+    assert config["rp2040"]["commands"]["default_freq"] == 99
+    assert config["vibro_control"]["default_freq"] == 1
+
+
+def test_line_without_comment_and_float(config_path):
+    update_config_values("rp2040", {"ratio": 0.25}, str(config_path))
+    assert yaml.safe_load(config_path.read_text(encoding="utf-8"))["rp2040"]["ratio"] == 0.25
+
+
+def test_missing_key_raises_and_keeps_file(config_path):
+    with pytest.raises(KeyError):
+        update_config_values("rp2040", {"no_such_key": 1}, str(config_path))
+    assert config_path.read_text(encoding="utf-8") == CONFIG
+
+
+def test_merge_config_nested():
+    base = {"a": {"x": 1, "y": 2}, "b": 1}
+    merged = merge_config(base, {"a": {"y": 3}, "c": None})
+    assert merged == {"a": {"x": 1, "y": 3}, "b": 1, "c": None}
+    assert base == {"a": {"x": 1, "y": 2}, "b": 1}